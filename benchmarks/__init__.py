@@ -0,0 +1,9 @@
+"""
+Offline benchmarks for the trading system: synthetic market data, a stubbed forecasting
+agent and timings of each pipeline stage. Run with `python -m benchmarks.run`.
+"""
+import sys
+import os
+# The agents import their siblings by bare module name (e.g. `import curl_request`)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'trading_system')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
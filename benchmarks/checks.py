@@ -0,0 +1,158 @@
+import io
+import json
+import sys
+import argparse
+import contextlib
+import traceback
+from datetime import timedelta
+from typing import Callable, List
+
+import numpy as np
+import pandas as pd
+
+import benchmarks # sets up sys.path for the trading_system modules
+from benchmarks.synthetic import generate_ohlcv, synthetic_tickers
+from benchmarks.run import offline_environment
+
+# Correctness checks on synthetic data, run with `python -m benchmarks.checks`. Each
+# check raises AssertionError on a failure.
+CHECKS: List[Callable[[], None]] = []
+
+def check(fn: Callable[[], None]) -> Callable[[], None]:
+    CHECKS.append(fn)
+    return fn
+
+@check
+def indicator_parity():
+    """
+    The Phase-1 parameters precomputed once over the whole download equal a per-slice
+    recalculation on the data before each backtest day.
+    """
+    from trading_system.main import calculate_systematic_parameters, parameters_as_of
+
+    for ticker, full_data in generate_ohlcv(synthetic_tickers(3), 400).items():
+        params_full = calculate_systematic_parameters(ticker, data=full_data)
+        mismatches = []
+        for current_date in full_data.index[100:]:
+            sliced = calculate_systematic_parameters(ticker, data=full_data[full_data.index < current_date])
+            precomputed = parameters_as_of(params_full, current_date)
+            if sliced.empty or precomputed.empty:
+                if sliced.empty != precomputed.empty:
+                    mismatches.append(current_date)
+                continue
+            expected, actual = sliced.iloc[-1], precomputed.iloc[-1]
+            if sliced.index[-1] != precomputed.index[-1] or not np.allclose(
+                expected.astype(float).values, actual[expected.index].astype(float).values, rtol=0.0, atol=1e-9, equal_nan=True
+            ):
+                mismatches.append(current_date)
+        assert not mismatches, f"{ticker}: {len(mismatches)} days differ, first {mismatches[0].date()}"
+
+@check
+def online_indicators_match_batch():
+    """
+    `OnlineSystematicParameters` fed bar by bar, with a snapshot/restore (through JSON)
+    halfway, yields the rows of `calculate_systematic_parameters` on the same series.
+    """
+    from trading_system.main import calculate_systematic_parameters
+    from trading_system.online_indicators import OnlineSystematicParameters
+
+    for options in ({}, {'lookback_L': 10, 'rsi_L': 7, 'ewma_span': 20}):
+        for ticker, data in generate_ohlcv(synthetic_tickers(3), 400).items():
+            expected = calculate_systematic_parameters(ticker, data=data, **options)
+            online = OnlineSystematicParameters(ticker, **options)
+            rows = {}
+            for position, date in enumerate(data.index):
+                if position == len(data) // 2:
+                    online = OnlineSystematicParameters.restore(json.loads(json.dumps(online.snapshot())))
+                bar = [data[(field, ticker)].iloc[position] for field in ('Open', 'High', 'Low', 'Close', 'Volume')]
+                values = online.update(date, *bar)
+                if values is not None:
+                    rows[date] = dict(values)
+
+            assert list(rows) == list(expected.index), f"{ticker} {options}: online rows on different days"
+            for column in expected.columns:
+                actual = np.array([rows[date][column] for date in expected.index], dtype=np.float64)
+                batch = expected[column].to_numpy(dtype=np.float64)
+                close = np.isclose(actual, batch, rtol=1e-9, atol=1e-12)
+                assert close.all(), (
+                    f"{ticker} {options} {column}: {(~close).sum()} rows differ, "
+                    f"first on {expected.index[~close][0].date()}: {actual[~close][0]} != {batch[~close][0]}"
+                )
+
+@check
+def backtest_modes_agree():
+    """
+    The loop backtest on precomputed indicators, on per-slice indicators and the
+    vectorized backtest make the same trades and equity curve.
+    """
+    frames = generate_ohlcv(synthetic_tickers(3), 400)
+    with offline_environment(frames), contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        import trading_system.backtester as backtester
+        for ticker, df in frames.items():
+            start_date = df.index[100].strftime("%Y-%m-%d")
+            end_date = (df.index[-1] + timedelta(days=1)).strftime("%Y-%m-%d")
+            reports = {
+                'precomputed': backtester.run_trading_backtest(ticker, start_date, end_date),
+                'per-slice': backtester.run_trading_backtest(ticker, start_date, end_date, precompute_indicators=False),
+                'vectorized': backtester.run_vectorized_backtest(ticker, start_date, end_date),
+            }
+            expected = reports['precomputed']
+            keys = ('entry_date', 'exit_date', 'size', 'entry_price', 'exit_price', 'exit_reason')
+            for mode, report in reports.items():
+                assert [tuple(trade[key] for key in keys) for trade in report['trades']] == \
+                       [tuple(trade[key] for key in keys) for trade in expected['trades']], f"{ticker}: {mode} trades differ"
+                assert np.allclose([point['equity'] for point in report['equity_curve']],
+                                   [point['equity'] for point in expected['equity_curve']], rtol=0.0, atol=1e-6), f"{ticker}: {mode} equity differs"
+
+@check
+def streaming_bar_on_last_warm_up_day():
+    """
+    A streamed bar dated on the last warm-up day replaces that day's bar: the scanner
+    ends up as if it had warmed up on the days before and then received the bar.
+    """
+    from trading_system.scanner import StreamingScanner
+
+    ticker = synthetic_tickers(1)[0]
+    frames = generate_ohlcv([ticker], 300)
+    df = frames[ticker]
+    last_day = df.index[-1]
+    bar = {'ticker': ticker, 'date': last_day, 'open': float(df[('Open', ticker)].iloc[-1]),
+           'high': float(df[('High', ticker)].iloc[-1]) * 1.01, 'low': float(df[('Low', ticker)].iloc[-1]),
+           'close': float(df[('Close', ticker)].iloc[-1]) * 1.01, 'volume': float(df[('Volume', ticker)].iloc[-1])}
+
+    with offline_environment(frames), contextlib.redirect_stdout(io.StringIO()):
+        warmed_to_last_day = StreamingScanner([ticker], forecaster='rules')
+        warmed_to_last_day.warm_up(start=df.index[0].strftime("%Y-%m-%d"), end=(last_day + timedelta(days=1)).strftime("%Y-%m-%d"))
+        warmed_to_last_day.process_bar(bar)
+
+        warmed_before = StreamingScanner([ticker], forecaster='rules')
+        warmed_before.warm_up(start=df.index[0].strftime("%Y-%m-%d"), end=last_day.strftime("%Y-%m-%d"))
+        warmed_before.process_bar(bar)
+
+    actual, expected = warmed_to_last_day.indicators[ticker].row().to_dict(), warmed_before.indicators[ticker].row().to_dict()
+    assert actual.keys() == expected.keys(), "Different Phase-1 columns"
+    for key in expected:
+        assert np.isclose(actual[key], expected[key], rtol=0.0, atol=1e-9, equal_nan=True), f"{key}: {actual[key]} != {expected[key]}"
+    assert warmed_to_last_day.results[ticker] == warmed_before.results[ticker], "Different Phase 2-4 results"
+
+def run_checks(names: List[str] = None) -> List[str]:
+    """
+    Runs the checks (default: all) and returns the names of those that failed.
+    """
+    failed = []
+    for fn in CHECKS:
+        if names and fn.__name__ not in names:
+            continue
+        try:
+            fn()
+            print(f"ok      {fn.__name__}")
+        except Exception:
+            failed.append(fn.__name__)
+            print(f"FAILED  {fn.__name__}\n{traceback.format_exc()}")
+    return failed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the correctness checks on synthetic data.")
+    parser.add_argument("names", nargs="*", help="checks to run (default: all)")
+    args = parser.parse_args()
+    sys.exit(1 if run_checks(args.names) else 0)
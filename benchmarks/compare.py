@@ -0,0 +1,34 @@
+import sys
+import json
+import argparse
+
+def _key(record):
+    return record["stage"], json.dumps(record["size"], sort_keys=True)
+
+def compare(baseline_path: str, current_path: str, threshold: float = 0.2) -> list:
+    """
+    Compares the median timings of two `benchmarks.run` result files and returns the
+    stages that got slower by more than `threshold` (e.g. 0.2 = 20%).
+    """
+    with open(baseline_path) as f:
+        baseline = {_key(r): r for r in json.load(f)["results"]}
+    with open(current_path) as f:
+        current = {_key(r): r for r in json.load(f)["results"]}
+
+    regressions = []
+    for key in sorted(baseline.keys() & current.keys()):
+        before, after = baseline[key]["median_s"], current[key]["median_s"]
+        change = (after - before) / before if before > 0 else 0.0
+        flag = "REGRESSION" if change > threshold else ""
+        print(f"{key[0]:<22} {key[1]:<32} {before * 1000:10.2f} ms -> {after * 1000:10.2f} ms ({change:+.1%}) {flag}")
+        if change > threshold:
+            regressions.append({"stage": key[0], "size": json.loads(key[1]), "change": change})
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args()
+    sys.exit(1 if compare(args.baseline, args.current, args.threshold) else 0)
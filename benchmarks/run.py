@@ -0,0 +1,211 @@
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+import contextlib
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+import benchmarks # sets up sys.path for the trading_system modules
+from benchmarks.synthetic import generate_ohlcv, synthetic_stream_response, synthetic_tickers
+from benchmarks.stub_agent import stub_forecasting_agent
+
+@contextlib.contextmanager
+def offline_environment(frames: Dict[str, pd.DataFrame]):
+    """
+    Runs the pipeline against synthetic data only: a temporary working directory, an
+    offline price store seeded with `frames`, a fresh forecast cache and learning
+    store, an unlimited rate limiter and the stub forecasting agent.
+    """
+    import trading_system.main as main
+    import trading_system.async_agents as async_agents
+    import trading_system.price_store as price_store
+    import trading_system.forecast_cache as forecast_cache
+    import trading_system.rate_limit as rate_limit
+    import trading_system.learning_store as learning_store
+
+    saved = (main.stock_forecasting_agent, async_agents.stock_forecasting_agent,
+             price_store._default_store, forecast_cache._default_cache, rate_limit._agent_limiter)
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="bench_")
+    saved_learnings_path = os.environ.get("LEARNING_STORE_PATH")
+    # Records go to a store in the temporary directory, opened on first use
+    learning_store.reset_learning_store()
+    os.environ["LEARNING_STORE_PATH"] = os.path.join(workdir, "learnings")
+    os.chdir(workdir)
+    try:
+        store = price_store.PriceStore(offline=True)
+        for ticker, df in frames.items():
+            start = df.index[0].strftime("%Y-%m-%d")
+            end = (df.index[-1] + timedelta(days=1)).strftime("%Y-%m-%d")
+            store.save(ticker, df.droplevel(1, axis=1), start, end)
+        price_store._default_store = store
+        forecast_cache._default_cache = None
+        rate_limit._agent_limiter = rate_limit.TokenBucket(rate=1e9, burst=10**9)
+        main.stock_forecasting_agent = stub_forecasting_agent
+        async_agents.stock_forecasting_agent = stub_forecasting_agent
+        yield workdir
+    finally:
+        (main.stock_forecasting_agent, async_agents.stock_forecasting_agent,
+         price_store._default_store, forecast_cache._default_cache, rate_limit._agent_limiter) = saved
+        learning_store.reset_learning_store()
+        if saved_learnings_path is None:
+            os.environ.pop("LEARNING_STORE_PATH", None)
+        else:
+            os.environ["LEARNING_STORE_PATH"] = saved_learnings_path
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def time_stage(fn: Callable, repeat: int) -> List[float]:
+    """
+    Calls `fn` `repeat` times with console output discarded and returns the durations.
+    """
+    durations = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            started = time.perf_counter()
+            fn()
+            durations.append(time.perf_counter() - started)
+    return durations
+
+def _record(stage: str, size: Dict[str, int], durations: List[float]) -> Dict:
+    record = {
+        "stage": stage,
+        "size": size,
+        "repeat": len(durations),
+        "min_s": min(durations),
+        "median_s": statistics.median(durations),
+        "mean_s": statistics.fmean(durations),
+    }
+    print(f"{stage:<22} {json.dumps(size):<32} median {record['median_s'] * 1000:10.2f} ms")
+    return record
+
+def _synthetic_results(frames: Dict[str, pd.DataFrame], seed: int = 0) -> List[Dict]:
+    """
+    Backtest results in the shape returned by `run_trading_backtest`, for timing the
+    report functions without running the backtests.
+    """
+    rng = np.random.default_rng(seed)
+    results = []
+    for ticker, df in frames.items():
+        equity = 100000.0 * np.exp(np.cumsum(rng.normal(0, 0.005, len(df))))
+        n_trades = max(1, len(df) // 10)
+        entries = np.sort(rng.integers(0, len(df), n_trades))
+        exits = np.minimum(entries + rng.integers(1, 10, n_trades), len(df) - 1)
+        close = df[('Close', ticker)].to_numpy()
+        size = rng.choice([-1, 1], n_trades) * rng.integers(1, 100, n_trades)
+        results.append({
+            "ticker": ticker,
+            "initial_capital": 100000.0,
+            "final_equity": float(equity[-1]),
+            "max_drawdown": float(np.max(1 - equity / np.maximum.accumulate(equity))),
+            "trades": [{
+                "entry_date": df.index[entry], "exit_date": df.index[exit_], "size": int(units),
+                "entry_price": float(close[entry]), "exit_price": float(close[exit_]),
+                "pnl": float(units * (close[exit_] - close[entry])),
+            } for entry, exit_, units in zip(entries, exits, size)],
+            "equity_curve": [{'date': date, 'equity': value} for date, value in zip(df.index, equity)],
+        })
+    return results
+
+def run_benchmarks(day_sizes: List[int], ticker_sizes: List[int], answer_sizes: List[int], repeat: int) -> List[Dict]:
+    from trading_system.main import calculate_systematic_parameters
+    from trading_system.backtest_engine import simulate_stop_target_trades
+    from curl_request import parse_google_ai_response, parse_streaming_forecast
+    with contextlib.redirect_stdout(io.StringIO()):
+        import trading_system.backtester as backtester
+
+    records = []
+    for days in day_sizes:
+        ticker = synthetic_tickers(1)[0]
+        frames = generate_ohlcv([ticker], days)
+        df = frames[ticker]
+        start_date = df.index[min(70, days - 1)].strftime("%Y-%m-%d")
+        end_date = (df.index[-1] + timedelta(days=1)).strftime("%Y-%m-%d")
+
+        records.append(_record("phase1_indicators", {"days": days},
+                               time_stage(lambda: calculate_systematic_parameters(ticker, data=df), repeat)))
+
+        rng = np.random.default_rng(days)
+        close = df[('Close', ticker)].to_numpy()
+        signal = rng.choice([-10, 0, 10], days)
+        stop = np.where(signal > 0, close * 0.97, close * 1.03)
+        target = np.where(signal > 0, close * 1.04, close * 0.96)
+        records.append(_record("engine_simulation", {"days": days}, time_stage(
+            lambda: simulate_stop_target_trades(df[('Open', ticker)].to_numpy(), df[('High', ticker)].to_numpy(),
+                                                df[('Low', ticker)].to_numpy(), close, signal, stop, target), repeat)))
+
+        # Each backtest run gets a fresh environment so the forecast cache starts cold
+        def backtest_loop():
+            with offline_environment(frames):
+                backtester.run_trading_backtest(ticker, start_date, end_date)
+
+        def backtest_vectorized():
+            with offline_environment(frames):
+                backtester.run_vectorized_backtest(ticker, start_date, end_date)
+
+        records.append(_record("backtest_loop", {"days": days}, time_stage(backtest_loop, repeat)))
+        records.append(_record("backtest_vectorized", {"days": days}, time_stage(backtest_vectorized, repeat)))
+
+    for tickers in ticker_sizes:
+        for days in day_sizes:
+            results = _synthetic_results(generate_ohlcv(synthetic_tickers(tickers), days))
+
+            def summary_report():
+                with offline_environment({}):
+                    backtester.generate_summary_report(results)
+
+            records.append(_record("summary_report", {"tickers": tickers, "days": days},
+                                   time_stage(summary_report, repeat)))
+
+    for chars in answer_sizes:
+        answer = {"P_up": 0.6, "P_down": 0.2, "P_side": 0.2, "trend": "uptrend", "reasoning": "x" * chars}
+        response_text = synthetic_stream_response(answer)
+        records.append(_record("parse_response", {"answer_chars": chars},
+                               time_stage(lambda: parse_google_ai_response(response_text), repeat)))
+        lines = response_text.split("\n")
+        records.append(_record("parse_streaming", {"answer_chars": chars},
+                               time_stage(lambda: parse_streaming_forecast(iter(lines)), repeat)))
+
+    return records
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _sizes(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time each pipeline stage on synthetic data.")
+    parser.add_argument("--days", type=_sizes, default=[250, 1000], help="comma-separated history lengths")
+    parser.add_argument("--tickers", type=_sizes, default=[10, 50], help="comma-separated universe sizes for the reports")
+    parser.add_argument("--answer-chars", type=_sizes, default=[500, 4000], help="comma-separated agent answer lengths")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args()
+
+    records = run_benchmarks(args.days, args.tickers, args.answer_chars, args.repeat)
+    output = {
+        "commit": _git_commit(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "results": records,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(output, f, indent=2)
+    print(f"\nBenchmark results saved to {args.output}")
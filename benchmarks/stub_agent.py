@@ -0,0 +1,27 @@
+from typing import Any, Dict
+
+def stub_forecasting_agent(
+    ticker: str,
+    technical_metrics: Dict[str, float],
+    date_str: str,
+    rate_limited: bool = True
+) -> Dict[str, Any]:
+    """
+    Deterministic stand-in for `stock_forecasting_agent` with the same signature and
+    return shape: mean reversion on RSI, so backtests make a realistic number of trades.
+    """
+    rsi = next((value for key, value in technical_metrics.items() if str(key).startswith("('RSI_")), 50.0)
+    if rsi < 40:
+        probabilities = (0.6, 0.2, 0.2)
+    elif rsi > 60:
+        probabilities = (0.2, 0.6, 0.2)
+    else:
+        probabilities = (0.25, 0.25, 0.5)
+    trend = ('uptrend', 'downtrend', 'sideways')[probabilities.index(max(probabilities))]
+    return {
+        'P_up': probabilities[0],
+        'P_down': probabilities[1],
+        'P_side': probabilities[2],
+        'trend': trend,
+        'reasoning': f"Stub forecast from RSI {rsi:.1f}",
+    }
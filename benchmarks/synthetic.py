@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List
+
+def synthetic_tickers(count: int) -> List[str]:
+    return [f"SYN{i:03d}.NS" for i in range(count)]
+
+def generate_ohlcv(
+    tickers: List[str],
+    days: int,
+    start: str = "2015-01-01",
+    seed: int = 0,
+    daily_volatility: float = 0.015
+) -> Dict[str, pd.DataFrame]:
+    """
+    Generates deterministic daily OHLCV frames (geometric random walks) in the shape of
+    `yf.download`: a business-day index and (Price, Ticker) column MultiIndex.
+    """
+    index = pd.bdate_range(start, periods=days, name='Date')
+    frames = {}
+    for i, ticker in enumerate(tickers):
+        rng = np.random.default_rng(seed + i)
+        close = 100.0 * np.exp(np.cumsum(rng.normal(0.0002, daily_volatility, days)))
+        open_ = close * np.exp(rng.normal(0.0, daily_volatility / 3, days))
+        high = np.maximum(open_, close) * np.exp(np.abs(rng.normal(0.0, daily_volatility / 2, days)))
+        low = np.minimum(open_, close) * np.exp(-np.abs(rng.normal(0.0, daily_volatility / 2, days)))
+        volume = rng.integers(100_000, 5_000_000, days).astype(float)
+
+        df = pd.DataFrame({'Close': close, 'High': high, 'Low': low, 'Open': open_, 'Volume': volume}, index=index)
+        df.columns = pd.MultiIndex.from_product([df.columns, [ticker]], names=['Price', 'Ticker'])
+        frames[ticker] = df
+    return frames
+
+def synthetic_stream_response(answer: dict, step: int = 20) -> str:
+    """
+    Builds a response in the chunked format of the Gemini web endpoint, where every
+    frame repeats the whole answer so far, for `parse_google_ai_response`.
+    """
+    import json
+    text = json.dumps(answer, indent=1)
+    lines = ['[["di",3802],["af.httprm",3802,"0",60]]']
+    for end in list(range(step, len(text), step)) + [len(text)]:
+        inner = [None, ["c_0", "r_0"], None, None, [["rc_0", [text[:end]], [], None]]]
+        frame = json.dumps([["wrb.fr", None, json.dumps(inner)]])
+        lines.append(str(len(frame)))
+        lines.append(frame)
+    lines.append('[["e",20,null,null,21932]]')
+    return "\n".join(lines)
@@ -2,36 +2,78 @@ import os
 import json
 import numpy as np
 import google.generativeai as genai
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple
 import time
+import threading
 
 import curl_request
+from trading_system.forecast_cache import get_forecast_cache
+from trading_system.rate_limit import get_agent_rate_limiter
+from trading_system.single_flight import get_flight
+from trading_system.instrumentation import AGENT_ERRORS, console, get_metrics, time_phase
+from trading_system.tracing import span
 # No longer configure API key at the module level
 
-def news_sentiment_agent(ticker: str) -> float:
-    return curl_request.make_curl_requestForSentimentAnalysis(ticker)
+# Forecasts answered with the sideways fallback instead of a model forecast, and
+# batched requests (see `batch_forecasting_agent`) with the tickers they left out
+agent_stats = {'degraded_forecasts': 0, 'batch_requests': 0, 'batch_fallbacks': 0}
+_agent_stats_lock = threading.Lock()
+get_metrics().collector(
+    "agent_events_total", "counter", "Degraded (fallback) forecasts, batched requests and tickers left out of a batch.",
+    ("event",), lambda: {(event,): count for event, count in agent_stats.items()}
+)
+
+def news_sentiment_agent(ticker: str, news_items: List[Dict[str, Any]] = None) -> float:
+    """
+    Scores the sentiment of `ticker`, on the given news items if any (see
+    `news.score_news_sentiment`, which removes duplicates first). Concurrent calls for
+    the same ticker and items share one request (see `single_flight`).
+    """
+    key = (ticker, tuple(item.get('id') for item in news_items)) if news_items else ticker
+    with span('agent.sentiment', 'agent', ticker=ticker):
+        return get_flight('sentiment').do(key, curl_request.make_curl_requestForSentimentAnalysis, ticker, news_items)
 
 def financial_report_agent(ticker: str) -> Dict[str, Any]:
     """
     Placeholder for the Financial-Report Agent.
+    Concurrent calls for the same ticker share one request (see `single_flight`).
     """
-    return curl_request.make_curl_requestForFinancialReportAnalysis(ticker)
+    with span('agent.financial_report', 'agent', ticker=ticker):
+        return get_flight('financial_report').do(ticker, curl_request.make_curl_requestForFinancialReportAnalysis, ticker)
 
-def stock_forecasting_agent(ticker: str, technical_metrics: Dict[str, float], date_str: str) -> Dict[str, Any]:
+def stock_forecasting_agent(
+    ticker: str,
+    technical_metrics: Dict[str, float],
+    date_str: str,
+    rate_limited: bool = True
+) -> Dict[str, Any]:
     """
     Analyzes stock data using a generative AI model to forecast the next day's trend.
-    Includes file-based caching to avoid redundant API calls.
+    Includes caching (see `forecast_cache`) to avoid redundant API calls.
+    API calls wait for the shared rate limiter unless `rate_limited` is False, i.e.
+    the caller has already taken a token (see `async_agents`). Concurrent calls for
+    the same ticker and date wait for one request instead of each making their own
+    (see `single_flight`).
     """
-    # Caching setup
-    cache_dir = "forecast_cache"
-    os.makedirs(cache_dir, exist_ok=True)
-    analysis_cache_file = os.path.join(cache_dir, f"{ticker}_{date_str}_analysis.json")
-    matrix_cache_file = os.path.join(cache_dir, f"{ticker}_{date_str}_matrix.json")
+    # Check if forecast is in cache, then join or start the request for this key
+    cache = get_forecast_cache()
+    with span('agent.forecast', 'agent', ticker=ticker, date=date_str):
+        return get_flight('forecast').do(
+            (ticker, date_str), _request_forecast, ticker, technical_metrics, date_str, rate_limited,
+            lookup=lambda: cache.get_analysis(ticker, date_str)
+        )
 
-    # Check if forecast is in cache
-    if os.path.exists(analysis_cache_file):
-        with open(analysis_cache_file, 'r') as f:
-            return json.load(f)
+def _request_forecast(
+    ticker: str,
+    technical_metrics: Dict[str, float],
+    date_str: str,
+    rate_limited: bool
+) -> Dict[str, Any]:
+    """
+    Requests a forecast from the model and caches it; returns the sideways fallback if
+    the request fails.
+    """
+    cache = get_forecast_cache()
 
 #     # Configure the Gemini API key, checking each time
 #     try:
@@ -64,11 +106,10 @@ def stock_forecasting_agent(ticker: str, technical_metrics: Dict[str, float], da
     
     
     metrics_json = json.dumps(metrics_for_json, indent=2)
-    print(f"[{ticker}] Technical Metrics JSON:\n{metrics_json}")
+    console(f"[{ticker}] Technical Metrics JSON:\n{metrics_json}")
     
-    with open(matrix_cache_file, 'w') as f:
-        json.dump(metrics_json, f)
-        print(f"[{ticker}] Technical Metrics JSON saved to cache file {matrix_cache_file}.")
+    cache.put_metrics(ticker, date_str, metrics_json)
+    console(f"[{ticker}] Technical Metrics JSON saved to cache {cache.path}.")
 
 #     prompt = f"""
 # You are a sophisticated Stock-Forecasting Agent. Your role is to analyze a set of technical indicators for a given stock and predict the most likely trend for the next trading day.
@@ -107,16 +148,23 @@ def stock_forecasting_agent(ticker: str, technical_metrics: Dict[str, float], da
 #         with open(cache_file, 'w') as f:
 #             json.dump(forecast, f, indent=4)
 #         return forecast
-        time.sleep(7)
+        if rate_limited:
+            with time_phase('rate_limit_wait'):
+                get_agent_rate_limiter().acquire()
         forecast = curl_request.make_curl_request(ticker, metrics_json)
-        print(f"[{ticker}] Stock-Forecasting Agent: Forecast received: {forecast}")
+        if 'error' in forecast:
+            # Request failed even after retries: use the fallback and do not cache it
+            raise RuntimeError(forecast['error'])
+        console(f"[{ticker}] Stock-Forecasting Agent: Forecast received: {forecast}")
         # Save the successful forecast to cache
-        with open(analysis_cache_file, 'w') as f:
-            json.dump(forecast, f, indent=4)
+        cache.put_analysis(ticker, date_str, forecast)
         return forecast
 
     except Exception as e:
         print(f"[{ticker}] Stock-Forecasting Agent: Error during generation: {e}")
+        AGENT_ERRORS.inc(agent='forecast')
+        with _agent_stats_lock:
+            agent_stats['degraded_forecasts'] += 1
         return {
             'P_up': 0.33, 'P_down': 0.33, 'P_side': 0.34, 'trend': 'sideways',
             'reasoning': f"Error during generation: {e}"
@@ -126,18 +174,118 @@ def stock_forecasting_agent(ticker: str, technical_metrics: Dict[str, float], da
         
 
 
+def default_batch_size() -> int:
+    """
+    Tickers per batched forecast request, from AGENT_BATCH_SIZE (default 10).
+    """
+    return max(1, int(os.getenv("AGENT_BATCH_SIZE", 10)))
+
+def batch_forecasting_agent(
+    requests: List[Tuple[str, Dict[str, float], str]],
+    batch_size: int = None
+) -> List[Dict[str, Any]]:
+    """
+    Batched version of `stock_forecasting_agent` for many (ticker, technical_metrics,
+    date_str) requests: cache misses for the same date are packed `batch_size` tickers
+    per prompt (see `curl_request.make_batch_curl_request`), so one rate-limited request
+    covers e.g. a whole sector. Returns the forecasts in request order. Tickers missing
+    from or invalid in a reply, and all tickers of a failed batch, fall back to
+    per-ticker calls. Tickers another caller is already requesting are not packed but
+    wait for that request, and concurrent callers of `stock_forecasting_agent` wait for
+    the batch (see `single_flight`).
+    """
+    batch_size = batch_size or default_batch_size()
+    cache = get_forecast_cache()
+    flight = get_flight('forecast')
+    results: List[Dict[str, Any]] = [None] * len(requests)
+
+    # Cache hits first; misses grouped by date so each prompt holds distinct tickers
+    misses_by_date: Dict[str, Dict[str, int]] = {}
+    for i, (ticker, technical_metrics, date_str) in enumerate(requests):
+        cached_forecast = cache.get_analysis(ticker, date_str)
+        if cached_forecast is not None:
+            flight.record_hit()
+            results[i] = cached_forecast
+        else:
+            misses_by_date.setdefault(date_str, {}).setdefault(ticker, i)
+
+    for date_str, positions in misses_by_date.items():
+        # Lead the tickers no other caller is requesting; the others are joined below
+        led = [ticker for ticker, _ in flight.lead((ticker, date_str) for ticker in positions)]
+        tickers = []
+        for ticker in led:
+            cached_forecast = cache.get_analysis(ticker, date_str)
+            if cached_forecast is not None:
+                # Finished by another caller since the first lookup
+                flight.record_hit()
+                results[positions[ticker]] = cached_forecast
+                flight.finish((ticker, date_str), cached_forecast)
+            else:
+                tickers.append(ticker)
+        flight.record_miss(len(tickers))
+
+        finished = set()
+        try:
+            for start in range(0, len(tickers), batch_size):
+                chunk = tickers[start:start + batch_size]
+                forecasts = {}
+                if len(chunk) > 1:
+                    metrics_by_ticker = {}
+                    for ticker in chunk:
+                        metrics_json = json.dumps({str(k): v for k, v in requests[positions[ticker]][1].items()}, indent=2)
+                        cache.put_metrics(ticker, date_str, metrics_json)
+                        metrics_by_ticker[ticker] = metrics_json
+                    with time_phase('rate_limit_wait'):
+                        get_agent_rate_limiter().acquire()
+                    with span('agent.batch_forecast', 'agent', date=date_str, tickers=chunk):
+                        forecasts = curl_request.make_batch_curl_request(metrics_by_ticker)
+                    if 'error' in forecasts:
+                        print(f"Batched forecast for {len(chunk)} tickers on {date_str} failed: {forecasts['error']}")
+                        AGENT_ERRORS.inc(agent='batch_forecast')
+                        forecasts = {}
+                    with _agent_stats_lock:
+                        agent_stats['batch_requests'] += 1
+                        agent_stats['batch_fallbacks'] += len(chunk) - len(forecasts)
+
+                for ticker in chunk:
+                    if ticker in forecasts:
+                        forecast = forecasts[ticker]
+                        cache.put_analysis(ticker, date_str, forecast)
+                    else:
+                        # Not through stock_forecasting_agent: it would wait for this very call
+                        with span('agent.forecast', 'agent', ticker=ticker, date=date_str):
+                            forecast = _request_forecast(ticker, requests[positions[ticker]][1], date_str, True)
+                    results[positions[ticker]] = forecast
+                    flight.finish((ticker, date_str), forecast)
+                    finished.add(ticker)
+        except BaseException as e:
+            for ticker in tickers:
+                if ticker not in finished:
+                    flight.finish((ticker, date_str), error=e)
+            raise
+
+        for ticker, i in positions.items():
+            if results[i] is None:
+                results[i] = stock_forecasting_agent(ticker, requests[i][1], date_str)
+
+    # Duplicate requests share the forecast of their first occurrence
+    for i, (ticker, _, date_str) in enumerate(requests):
+        if results[i] is None:
+            results[i] = results[misses_by_date[date_str][ticker]]
+    return results
+
 def style_preference_agent() -> str:
     """
     Placeholder for the Style-Preference Agent.
     """
-    print("Style-Preference Agent: Determining style... (mock)")
+    console("Style-Preference Agent: Determining style... (mock)")
     return "conservative"
 
 def trading_decision_agent(signals: Dict[str, Any], style: str) -> str:
     """
     Placeholder for the Trading-Decision Agent.
     """
-    print("Trading-Decision Agent: Making final decision... (mock)")
+    console("Trading-Decision Agent: Making final decision... (mock)")
     if signals.get('trend') == 'uptrend':
         return "Buy"
     elif signals.get('trend') == 'downtrend':
@@ -0,0 +1,69 @@
+import asyncio
+from typing import Any, Dict, List, Tuple
+
+from trading_system.agents import stock_forecasting_agent
+from trading_system.forecast_cache import get_forecast_cache
+from trading_system.rate_limit import TokenBucket, get_agent_rate_limiter
+from trading_system.single_flight import get_flight
+from trading_system.instrumentation import PHASE_SECONDS
+from trading_system.tracing import async_span
+
+# (ticker, technical_metrics, date_str), the arguments of `stock_forecasting_agent`
+ForecastRequest = Tuple[str, Dict[str, Any], str]
+
+class AsyncForecastClient:
+    """
+    Asyncio front end for `stock_forecasting_agent` that keeps several forecasts in
+    flight at once. Cache hits return immediately; misses take a token from the shared
+    rate limiter and run the blocking HTTP call in a worker thread, with at most
+    `max_concurrency` calls outstanding. `requests_per_minute` and `burst` configure
+    the shared limiter.
+    """
+    def __init__(
+        self,
+        requests_per_minute: float = None,
+        burst: int = None,
+        max_concurrency: int = 4,
+        limiter: TokenBucket = None
+    ):
+        if limiter is None:
+            limiter = get_agent_rate_limiter()
+            if requests_per_minute is not None or burst is not None:
+                # Reconfigures the shared budget rather than opening a second one
+                limiter.configure(rate=(requests_per_minute / 60) if requests_per_minute else None, burst=burst)
+        self.limiter = limiter
+        self.max_concurrency = max_concurrency
+        self._semaphore = None
+
+    async def forecast(self, ticker: str, technical_metrics: Dict[str, Any], date_str: str) -> Dict[str, Any]:
+        cached_forecast = get_forecast_cache().get_analysis(ticker, date_str)
+        if cached_forecast is not None:
+            get_flight('forecast').record_hit()
+            return cached_forecast
+
+        # Every miss takes a token, even one that ends up joining a call in flight:
+        # checking for a flight first would race with the leader finishing
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            with async_span('rate_limit_wait', 'phase', ticker=ticker):
+                PHASE_SECONDS.observe(await self.limiter.acquire_async(), phase='rate_limit_wait')
+            return await asyncio.to_thread(
+                stock_forecasting_agent, ticker, technical_metrics, date_str, rate_limited=False
+            )
+
+    async def forecast_many(self, requests: List[ForecastRequest]) -> List[Dict[str, Any]]:
+        """
+        Forecasts all requests concurrently and returns the results in request order.
+        """
+        return await asyncio.gather(*(self.forecast(*request) for request in requests))
+
+def forecast_batch(requests: List[ForecastRequest], **client_options) -> List[Dict[str, Any]]:
+    """
+    Synchronous entry point for the scanner and backtester: runs `forecast_many` on a
+    fresh event loop. `client_options` are passed to `AsyncForecastClient`.
+    """
+    if not requests:
+        return []
+    client = AsyncForecastClient(**client_options)
+    return asyncio.run(client.forecast_many(requests))
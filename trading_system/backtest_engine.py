@@ -0,0 +1,140 @@
+import numpy as np
+from typing import Dict, Tuple
+
+from trading_system.performance import max_drawdown
+
+EXIT_STOP_LOSS = 1
+EXIT_TAKE_PROFIT = 2
+EXIT_REASONS = {EXIT_STOP_LOSS: "Stop-Loss", EXIT_TAKE_PROFIT: "Take-Profit"}
+
+
+def _find_exit(
+    high: np.ndarray,
+    low: np.ndarray,
+    position: float,
+    stop_loss: float,
+    take_profit: float,
+    start: int
+) -> Tuple[int, int]:
+    """
+    Returns the first bar at or after `start` that touches the stop or the target, and
+    the exit reason. The stop is checked first, as in the day loop. Returns (-1, 0) if
+    the trade is still open at the end of the data.
+
+    The bars are scanned in doubling windows so a short trade does not pay for the rest
+    of the history.
+    """
+    n = len(high)
+    window = 32
+    while start < n:
+        end = min(n, start + window)
+        if position > 0:
+            stop_hit = low[start:end] <= stop_loss
+            target_hit = high[start:end] >= take_profit
+        else:
+            stop_hit = high[start:end] >= stop_loss
+            target_hit = low[start:end] <= take_profit
+
+        hit = stop_hit | target_hit
+        if hit.any():
+            k = int(hit.argmax())
+            return start + k, EXIT_STOP_LOSS if stop_hit[k] else EXIT_TAKE_PROFIT
+        start = end
+        window *= 2
+    return -1, 0
+
+
+def simulate_stop_target_trades(
+    open_: np.ndarray,
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    signal: np.ndarray,
+    stop_loss: np.ndarray,
+    take_profit: np.ndarray,
+    initial_capital: float = 100000.0
+) -> Dict[str, np.ndarray]:
+    """
+    Simulates the stop-loss/take-profit strategy of `run_trading_backtest` on arrays.
+
+    `signal[i]` is the target position decided for bar i (0 for no trade) and is entered
+    at `open_[i]` when flat; `stop_loss[i]`/`take_profit[i]` are its thresholds (NaN
+    means no trade). An open trade is checked for its stop, then its target, from the bar
+    after entry, and a new trade can be entered on the bar of an exit.
+
+    Returns the trades (entry/exit bar indices, prices, sizes, reasons and P&L), the
+    per-bar position, cash and equity, and the maximum drawdown.
+    """
+    open_ = np.ascontiguousarray(open_, dtype=np.float64)
+    high = np.ascontiguousarray(high, dtype=np.float64)
+    low = np.ascontiguousarray(low, dtype=np.float64)
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    signal = np.asarray(signal)
+    stop_loss = np.asarray(stop_loss, dtype=np.float64)
+    take_profit = np.asarray(take_profit, dtype=np.float64)
+    n = len(close)
+
+    valid = (signal != 0) & np.isfinite(stop_loss) & np.isfinite(take_profit)
+    entry_candidates = np.flatnonzero(valid)
+
+    entries, exits, reasons, exit_prices = [], [], [], []
+    event_bars, event_capital = [], []
+    capital = initial_capital
+    position = np.zeros(n, dtype=np.int64)
+
+    bar = 0
+    while True:
+        k = np.searchsorted(entry_candidates, bar)
+        if k == len(entry_candidates):
+            break
+        entry = int(entry_candidates[k])
+        size = int(signal[entry])
+        capital -= size * open_[entry]
+        event_bars.append(entry)
+        event_capital.append(capital)
+
+        exit_bar, reason = _find_exit(high, low, size, stop_loss[entry], take_profit[entry], entry + 1)
+        entries.append(entry)
+        exits.append(exit_bar)
+        reasons.append(reason)
+        if exit_bar == -1:
+            exit_prices.append(np.nan)
+            position[entry:] = size
+            break
+
+        exit_price = stop_loss[entry] if reason == EXIT_STOP_LOSS else take_profit[entry]
+        exit_prices.append(exit_price)
+        capital += size * exit_price
+        event_bars.append(exit_bar)
+        event_capital.append(capital)
+        position[entry:exit_bar] = size
+        bar = exit_bar
+
+    # Cash only changes on entry/exit bars: forward-fill the capital after each event.
+    last_event = np.full(n, -1, dtype=np.int64)
+    last_event[np.asarray(event_bars, dtype=np.int64)] = np.arange(len(event_bars))
+    last_event = np.maximum.accumulate(last_event)
+    cash = np.where(last_event >= 0, np.asarray(event_capital + [initial_capital])[last_event], initial_capital)
+
+    equity = np.where(position != 0, cash + position * close, cash)
+
+    entries = np.asarray(entries, dtype=np.int64)
+    sizes = signal[entries].astype(np.int64) if len(entries) else np.zeros(0, dtype=np.int64)
+    entry_prices = open_[entries]
+    exit_prices = np.asarray(exit_prices, dtype=np.float64)
+
+    return {
+        "entry_index": entries,
+        "exit_index": np.asarray(exits, dtype=np.int64),
+        "size": sizes,
+        "entry_price": entry_prices,
+        "exit_price": exit_prices,
+        "stop_loss": stop_loss[entries],
+        "take_profit": take_profit[entries],
+        "exit_reason": np.asarray(reasons, dtype=np.int8),
+        "pnl": sizes * (exit_prices - entry_prices),
+        "position": position,
+        "cash": cash,
+        "equity": equity,
+        "max_drawdown": max_drawdown(equity, initial_capital),
+    }
@@ -5,11 +5,13 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 
         
-import yfinance as yf
 import pandas as pd
 import numpy as np
 import json
 import os
+import time
+import queue
+import multiprocessing
 from datetime import datetime, timedelta
 
 
@@ -17,27 +19,43 @@ import os
 from dotenv import load_dotenv, find_dotenv
 from pathlib import Path
 load_dotenv(Path("./.env"))
-print(os.getenv("GEMINI_API_KEY"))
 
 
-from trading_system.main import calculate_systematic_parameters, run_system_for_ticker
+from trading_system.main import calculate_systematic_parameters, run_system_for_ticker, run_system_for_row
+from trading_system.indicator_frame import IndicatorFrame
 from trading_system.agents import stock_forecasting_agent
 from trading_system.execution import run_phase3_execution
 from trading_system.risk_management import run_phase4_risk_management
 from trading_system.nifty50 import NIFTY_50_SYMBOLS
+from trading_system.price_store import download_prices, get_price_store
+from trading_system.forecast_cache import get_forecast_cache
+from trading_system.async_agents import forecast_batch
+from trading_system.backtest_engine import EXIT_REASONS, simulate_stop_target_trades
+from trading_system.forecasters import get_forecaster, is_agent
+from trading_system.learning_store import get_learning_store
+from trading_system.rate_limit import get_agent_rate_limiter, set_agent_rate_limiter
+from trading_system.performance import max_drawdown, results_metrics
+from trading_system.instrumentation import export_metrics, format_phase_summary, get_metrics
+from trading_system.tracing import clock, complete_span, flush_trace, merge_traces, reset_trace, traced, tracing_enabled
+
+BACKTEST_SECONDS = get_metrics().histogram("backtest_seconds", "Wall time of one ticker's backtest.", ("engine",))
+BACKTEST_TRADES = get_metrics().counter("backtest_trades_total", "Closed trades of finished backtests.", ("engine",))
 
 from tqdm import tqdm
 
-def run_trading_backtest(ticker: str, start_date: str, end_date: str, initial_capital: float = 100000.0):
+def warmup_start_date(start_date: str) -> str:
     """
-    Runs a comprehensive trading backtest for a single ticker, simulating trades and tracking P&L.
+    We need extra data before the start date for initial calculations.
     """
-    print(f"\n--- Running Trading Backtest for {ticker} ---")
+    return (datetime.strptime(start_date, "%Y-%m-%d") - timedelta(days=60)).strftime("%Y-%m-%d")
 
-    # 1. Data Fetching
-    # We need extra data before the start date for initial calculations
-    extended_start_date = (datetime.strptime(start_date, "%Y-%m-%d") - timedelta(days=60)).strftime("%Y-%m-%d")
-    full_data = yf.download(ticker, start=extended_start_date, end=end_date, progress=False, auto_adjust=True)
+def download_backtest_data(ticker: str, start_date: str, end_date: str) -> pd.DataFrame:
+    """
+    Downloads the price history for a backtest, including a warm-up period before
+    `start_date` for the indicators. Returns None if no data is available.
+    """
+    extended_start_date = warmup_start_date(start_date)
+    full_data = download_prices(ticker, start=extended_start_date, end=end_date)
     if full_data.empty:
         print(f"Could not download data for {ticker}.")
         return None
@@ -47,28 +65,66 @@ def run_trading_backtest(ticker: str, start_date: str, end_date: str, initial_ca
         full_data.columns = pd.MultiIndex.from_product([full_data.columns, [ticker]])
 
     print(f"Downloaded {len(full_data)} rows of data for {ticker} from {extended_start_date} to {end_date}." )
+    return full_data
+
+@BACKTEST_SECONDS.time(engine='loop')
+@traced('ticker')
+def run_trading_backtest(
+    ticker: str,
+    start_date: str,
+    end_date: str,
+    initial_capital: float = 100000.0,
+    precompute_indicators: bool = True,
+    forecaster: str = None
+):
+    """
+    Runs a comprehensive trading backtest for a single ticker, simulating trades and tracking P&L.
+
+    With `precompute_indicators` the Phase-1 parameters are calculated once over the
+    whole download and each day reads its row as of the previous close. Otherwise they
+    are recalculated from the historical slice every day (the original, O(n^2) mode).
+    `forecaster` selects the Phase-2 forecaster by name (see `forecasters`); a local
+    one such as "rules" runs at CPU speed without the LLM.
+    """
+    print(f"\n--- Running Trading Backtest for {ticker} ---")
+
+    # 1. Data Fetching
+    full_data = download_backtest_data(ticker, start_date, end_date)
+    if full_data is None:
+        return None
+
+    # Phase-1 parameters are causal (rolling/EWMA/RSI only look back), so one pass over
+    # the full download gives every day the same values as recomputing on its slice.
+    indicators = None
+    if precompute_indicators:
+        indicators = IndicatorFrame.from_dataframe(calculate_systematic_parameters(ticker, data=full_data))
+
+    # Load every cached forecast the backtest can ask for in one query
+    backtest_data = full_data[full_data.index >= pd.to_datetime(start_date)]
+    prefetched = []
+    if is_agent(forecaster):
+        prefetched = [(ticker, date.strftime("%Y-%m-%d")) for date in backtest_data.index]
+        get_forecast_cache().prefetch(prefetched)
+
     # 2. Initialization
     capital = initial_capital
     position = 0
     open_trade = None
     trades = []
     equity_curve = []
-    peak_equity = initial_capital
-    max_drawdown = 0
 
     # 3. Main Backtesting Loop
     # We iterate from the requested start_date, using the earlier data for indicators
-    backtest_data = full_data[full_data.index >= pd.to_datetime(start_date)]
-
     for i in tqdm(range(1, len(backtest_data)), desc=f"Backtesting {ticker}"):
         # Define current and previous day's data for analysis
         current_date = backtest_data.index[i]
+        day_started = clock()
 
-        # The historical slice should include all data up to the day *before* the current day
+        # The historical data should include everything up to the day *before* the current day
         # to prevent lookahead bias.
-        historical_slice = full_data[full_data.index < current_date]
+        history_length = full_data.index.searchsorted(current_date, side='left')
 
-        if len(historical_slice) < 50: # Ensure enough data for indicators
+        if history_length < 50: # Ensure enough data for indicators
             equity_curve.append({'date': current_date, 'equity': capital})
             continue
 
@@ -119,7 +175,12 @@ def run_trading_backtest(ticker: str, start_date: str, end_date: str, initial_ca
         if position == 0:
             # Get the signal, passing the date for caching purposes
             date_str = current_date.strftime("%Y-%m-%d")
-            signal = run_system_for_ticker(ticker, data=historical_slice, date_str=date_str)
+            if precompute_indicators:
+                row_position = indicators.position_as_of(current_date)
+                signal = run_system_for_row(ticker, indicators.row(row_position), date_str=date_str, forecaster=forecaster) if row_position >= 0 else None
+            else:
+                historical_slice = full_data.iloc[:history_length]
+                signal = run_system_for_ticker(ticker, data=historical_slice, date_str=date_str, forecaster=forecaster)
 
             if signal and signal.get('target_position') != 0 and signal.get('stop_loss') is not None and signal.get('take_profit') is not None:
                 target_pos = signal['target_position']
@@ -149,22 +210,17 @@ def run_trading_backtest(ticker: str, start_date: str, end_date: str, initial_ca
             current_equity += position * close_price
 
         equity_curve.append({'date': current_date, 'equity': current_equity})
+        complete_span(current_date.date(), 'day', day_started, position=position)
 
-        # Update peak equity and max drawdown
-        if current_equity > peak_equity:
-            peak_equity = current_equity
-
-        drawdown = (peak_equity - current_equity) / peak_equity
-        if drawdown > max_drawdown:
-            max_drawdown = drawdown
-
+    get_forecast_cache().release(prefetched)
 
     # 4. Performance Calculation
+    BACKTEST_TRADES.inc(len(trades), engine='loop')
     report = {
         "ticker": ticker,
         "initial_capital": initial_capital,
         "final_equity": current_equity, # Use the last calculated equity
-        "max_drawdown": max_drawdown,
+        "max_drawdown": max_drawdown([point['equity'] for point in equity_curve], initial_capital),
         "trades": trades,
         "equity_curve": equity_curve
     }
@@ -172,6 +228,237 @@ def run_trading_backtest(ticker: str, start_date: str, end_date: str, initial_ca
     return report
 
 
+def build_signal_arrays(ticker: str, full_data: pd.DataFrame, backtest_index: pd.DatetimeIndex, forecaster: str = None) -> dict:
+    """
+    Evaluates the trading system for every day of `backtest_index` (as of the previous
+    close) and returns the target position, stop-loss, take-profit and reasoning arrays
+    expected by `backtest_engine.simulate_stop_target_trades`.
+
+    Unlike the day loop, which only asks for a signal while flat, every day is evaluated,
+    and the agent's forecasts are requested as one concurrent batch (a local
+    `forecaster` is simply called per day).
+    """
+    n = len(backtest_index)
+    signal = np.zeros(n, dtype=np.int64)
+    stop_loss = np.full(n, np.nan)
+    take_profit = np.full(n, np.nan)
+    reasoning = [None] * n
+
+    indicators = IndicatorFrame.from_dataframe(calculate_systematic_parameters(ticker, data=full_data))
+    history_lengths = full_data.index.searchsorted(backtest_index, side='left')
+    row_positions = indicators.index.searchsorted(backtest_index, side='left') - 1
+
+    days = [
+        i for i in range(1, n)
+        if history_lengths[i] >= 50 and row_positions[i] >= 0 # Ensure enough data for indicators
+    ]
+    requests = [
+        (ticker, indicators.row(row_positions[i]).to_dict(), backtest_index[i].strftime("%Y-%m-%d"))
+        for i in days
+    ]
+    if is_agent(forecaster):
+        # Request the forecasts of all days as one concurrent batch
+        prefetched = [(ticker, date.strftime("%Y-%m-%d")) for date in backtest_index]
+        get_forecast_cache().prefetch(prefetched)
+        forecasts = forecast_batch(requests)
+        get_forecast_cache().release(prefetched)
+    else:
+        forecast_fn = get_forecaster(forecaster)
+        forecasts = [forecast_fn(*request) for request in requests]
+
+    for i, agent_forecast in tqdm(zip(days, forecasts), total=len(days), desc=f"Signals {ticker}"):
+        result = run_system_for_row(
+            ticker,
+            indicators.row(row_positions[i]),
+            date_str=backtest_index[i].strftime("%Y-%m-%d"),
+            agent_forecast=agent_forecast
+        )
+        if result and result.get('target_position') != 0 and result.get('stop_loss') is not None and result.get('take_profit') is not None:
+            signal[i] = result['target_position']
+            stop_loss[i] = result['stop_loss']
+            take_profit[i] = result['take_profit']
+            reasoning[i] = result.get('reasoning', 'N/A')
+
+    return {"signal": signal, "stop_loss": stop_loss, "take_profit": take_profit, "reasoning": reasoning}
+
+
+@BACKTEST_SECONDS.time(engine='vectorized')
+@traced('ticker')
+def run_vectorized_backtest(ticker: str, start_date: str, end_date: str, initial_capital: float = 100000.0, forecaster: str = None):
+    """
+    Runs the same backtest as `run_trading_backtest`, but simulates the trades with the
+    array engine in `backtest_engine` on precomputed signals. Returns a report of the
+    same shape.
+    """
+    print(f"\n--- Running Vectorized Backtest for {ticker} ---")
+
+    full_data = download_backtest_data(ticker, start_date, end_date)
+    if full_data is None:
+        return None
+
+    backtest_data = full_data[full_data.index >= pd.to_datetime(start_date)]
+    signals = build_signal_arrays(ticker, full_data, backtest_data.index, forecaster=forecaster)
+
+    # The day loop starts at the second backtest day; bar 0 only seeds the index.
+    sim = simulate_stop_target_trades(
+        open_=backtest_data[('Open', ticker)].to_numpy()[1:],
+        high=backtest_data[('High', ticker)].to_numpy()[1:],
+        low=backtest_data[('Low', ticker)].to_numpy()[1:],
+        close=backtest_data[('Close', ticker)].to_numpy()[1:],
+        signal=signals['signal'][1:],
+        stop_loss=signals['stop_loss'][1:],
+        take_profit=signals['take_profit'][1:],
+        initial_capital=initial_capital
+    )
+    dates = backtest_data.index[1:]
+    reasoning = signals['reasoning'][1:]
+
+    trades = []
+    for k in range(len(sim['entry_index'])):
+        exit_index = sim['exit_index'][k]
+        if exit_index < 0: # Still open at the end of the backtest
+            continue
+        entry_index = sim['entry_index'][k]
+        size = int(sim['size'][k])
+        trades.append({
+            "entry_date": dates[entry_index].strftime("%Y-%m-%d"),
+            "ticker": ticker,
+            "direction": "long" if size > 0 else "short",
+            "entry_price": sim['entry_price'][k],
+            "size": size,
+            "stop_loss": sim['stop_loss'][k],
+            "take_profit": sim['take_profit'][k],
+            "reasoning": reasoning[entry_index],
+            "exit_date": dates[exit_index].strftime("%Y-%m-%d"),
+            "exit_price": sim['exit_price'][k],
+            "pnl": sim['pnl'][k],
+            "exit_reason": EXIT_REASONS[int(sim['exit_reason'][k])]
+        })
+
+    equity = sim['equity']
+    BACKTEST_TRADES.inc(len(trades), engine='vectorized')
+    return {
+        "ticker": ticker,
+        "initial_capital": initial_capital,
+        "final_equity": equity[-1] if len(equity) else initial_capital,
+        "max_drawdown": sim['max_drawdown'],
+        "trades": trades,
+        "equity_curve": [{'date': date, 'equity': value} for date, value in zip(dates, equity)]
+    }
+
+
+def save_trade_log(results: dict, output_dir: str = "backtest_results"):
+    """
+    Saves the detailed trade log of one ticker's backtest, if it made any trades.
+    """
+    if results['trades']:
+        trades_df = pd.DataFrame(results['trades'])
+        trades_df.to_csv(f"{output_dir}/trade_log_{results['ticker']}.csv", index=False)
+
+
+def _backtest_worker(result_queue, limiter, ticker: str, start_date: str, end_date: str, initial_capital: float, forecaster: str = None):
+    """
+    Runs one ticker's backtest in its own process and puts (ticker, results, error)
+    on `result_queue`. Errors are reported, not raised.
+    """
+    set_agent_rate_limiter(limiter)
+    # Forked workers start with a copy of the parent's metrics and trace buffer
+    get_metrics().reset()
+    reset_trace()
+    try:
+        result = (ticker, run_trading_backtest(ticker, start_date, end_date, initial_capital, forecaster=forecaster), None)
+    except Exception as e:
+        result = (ticker, None, f"{type(e).__name__}: {e}")
+    finally:
+        # Worker processes exit without running atexit handlers
+        get_learning_store().flush()
+        export_metrics(per_process=True)
+        flush_trace()
+    result_queue.put(result)
+
+@traced('run')
+def run_parallel_backtests(
+    tickers: list,
+    start_date: str,
+    end_date: str,
+    initial_capital: float = 100000.0,
+    max_workers: int = None,
+    ticker_timeout: float = None,
+    output_dir: str = "backtest_results",
+    poll_interval: float = 0.5,
+    forecaster: str = None
+):
+    """
+    Runs `run_trading_backtest` for each ticker in its own process, at most
+    `max_workers` (default: CPU count) at a time, and saves each ticker's trade log as
+    soon as it finishes.
+
+    A ticker that raises, returns no data, dies or runs longer than `ticker_timeout`
+    seconds is reported in the failures and does not stop the others; a timed-out
+    ticker's process is killed, so the queued tickers never wait on it. Returns the
+    results in the order of `tickers`, so the summary report matches a serial run, and
+    a dict of ticker -> failure reason. The workers share this process's agent rate
+    limit (see `get_agent_rate_limiter`).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    max_workers = max_workers or os.cpu_count() or 1
+
+    # Fill the price store for the whole universe in a few batched downloads up front,
+    # so the workers read their data from disk instead of each making a request.
+    get_price_store().top_up_many(tickers, warmup_start_date(start_date), end_date)
+
+    result_queue = multiprocessing.Queue()
+    limiter = get_agent_rate_limiter()
+    queued = list(tickers)
+    running = {} # ticker -> (process, start time)
+    results_by_ticker = {}
+    failures = {}
+
+    def finish(ticker, results, error):
+        process, _ = running.pop(ticker)
+        process.join()
+        if results:
+            results_by_ticker[ticker] = results
+            save_trade_log(results, output_dir)
+            print(f"[{ticker}] Backtest finished ({len(results_by_ticker)}/{len(tickers)}).")
+        else:
+            failures[ticker] = error or "No data"
+
+    while queued or running:
+        while queued and len(running) < max_workers:
+            ticker = queued.pop(0)
+            process = multiprocessing.Process(
+                target=_backtest_worker, args=(result_queue, limiter, ticker, start_date, end_date, initial_capital, forecaster),
+                name=f"backtest-{ticker}", daemon=True
+            )
+            process.start()
+            running[ticker] = (process, time.time())
+
+        # Read the results before joining, since a worker exits only once its result
+        # has been taken off the queue
+        deadline = time.time() + poll_interval
+        while running:
+            try:
+                ticker, results, error = result_queue.get(timeout=max(deadline - time.time(), 0))
+            except queue.Empty:
+                break
+            except Exception as e: # e.g. the result could not be unpickled
+                print(f"Could not read a backtest result: {type(e).__name__}: {e}")
+                continue
+            if ticker in running:
+                finish(ticker, results, error)
+
+        for ticker, (process, started_at) in list(running.items()):
+            if ticker_timeout is not None and time.time() - started_at > ticker_timeout:
+                process.kill()
+                finish(ticker, None, f"Timed out after {ticker_timeout}s")
+            elif not process.is_alive() and result_queue.empty():
+                finish(ticker, None, f"Worker exited with code {process.exitcode}")
+
+    all_results = [results_by_ticker[ticker] for ticker in tickers if ticker in results_by_ticker]
+    return all_results, failures
+
+
 def generate_full_report(results: dict):
     """
     Generates and prints a comprehensive report from the backtest results.
@@ -184,47 +471,31 @@ def generate_full_report(results: dict):
         print(f"Final Equity: ${results.get('final_equity', 0):,.2f}")
         return
 
-    trades = results['trades']
+    metrics = results_metrics([results])[0]
     initial_capital = results['initial_capital']
     final_equity = results['final_equity']
-    max_drawdown = results['max_drawdown']
-
-    # Key Metrics
-    total_trades = len(trades)
-    winning_trades = [t for t in trades if t['pnl'] > 0]
-    losing_trades = [t for t in trades if t['pnl'] <= 0]
-
-    win_rate = (len(winning_trades) / total_trades) * 100 if total_trades > 0 else 0
     total_pnl = final_equity - initial_capital
 
-    avg_win_pnl = sum(t['pnl'] for t in winning_trades) / len(winning_trades) if winning_trades else 0
-    avg_loss_pnl = sum(t['pnl'] for t in losing_trades) / len(losing_trades) if losing_trades else 0
-
-    # Sharpe Ratio Calculation
-    equity_df = pd.DataFrame(results['equity_curve'])
-    equity_df['date'] = pd.to_datetime(equity_df['date'])
-    equity_df.set_index('date', inplace=True)
-    equity_df['daily_return'] = equity_df['equity'].pct_change().fillna(0)
-
-    if equity_df['daily_return'].std() > 0:
-        sharpe_ratio = (equity_df['daily_return'].mean() / equity_df['daily_return'].std()) * np.sqrt(252)
-    else:
-        sharpe_ratio = 0.0
-
     # Print Report
     print(f"Stock:                  {results['ticker']}")
     print("--- P&L ---")
     print(f"Starting Capital:       ${initial_capital:,.2f}")
     print(f"Ending Equity:          ${final_equity:,.2f}")
     print(f"Total P&L:              ${total_pnl:,.2f}")
-    print(f"Max Drawdown:           {max_drawdown:.2%}")
+    print(f"CAGR:                   {metrics['cagr']:.2%}")
+    print(f"Max Drawdown:           {metrics['max_drawdown']:.2%}")
+    print(f"Max Drawdown Duration:  {metrics['max_drawdown_duration']} days")
     print("\n--- Trades ---")
-    print(f"Total Trades:           {total_trades}")
-    print(f"Win Rate:               {win_rate:.2f}%")
-    print(f"Avg. Win P&L:           ${avg_win_pnl:,.2f}")
-    print(f"Avg. Loss P&L:          ${avg_loss_pnl:,.2f}")
+    print(f"Total Trades:           {metrics['trades']}")
+    print(f"Win Rate:               {metrics['win_rate']:.2f}%")
+    print(f"Avg. Win P&L:           ${metrics['avg_win_pnl']:,.2f}")
+    print(f"Avg. Loss P&L:          ${metrics['avg_loss_pnl']:,.2f}")
+    print(f"Profit Factor:          {metrics['profit_factor']:.2f}")
+    print(f"Exposure:               {metrics['exposure']:.2%}")
+    print(f"Annual Turnover:        {metrics['turnover']:.2f}x")
     print("\n--- Risk ---")
-    print(f"Annualized Sharpe Ratio:{sharpe_ratio:.2f}")
+    print(f"Annualized Sharpe Ratio:{metrics['sharpe']:.2f}")
+    print(f"Annualized Sortino:     {metrics['sortino']:.2f}")
 
 
 def generate_summary_report(all_results: list):
@@ -236,29 +507,18 @@ def generate_summary_report(all_results: list):
         return
 
     summary_data = []
-    for results in all_results:
-        trades = results['trades']
-        total_trades = len(trades)
-        winning_trades = [t for t in trades if t['pnl'] > 0]
-        win_rate = (len(winning_trades) / total_trades) * 100 if total_trades > 0 else 0
-        total_pnl = results['final_equity'] - results['initial_capital']
-
-        equity_df = pd.DataFrame(results['equity_curve'])
-        if not equity_df.empty:
-            equity_df['date'] = pd.to_datetime(equity_df['date'])
-            equity_df.set_index('date', inplace=True)
-            equity_df['daily_return'] = equity_df['equity'].pct_change().fillna(0)
-            sharpe_ratio = (equity_df['daily_return'].mean() / equity_df['daily_return'].std()) * np.sqrt(252) if equity_df['daily_return'].std() > 0 else 0.0
-        else:
-            sharpe_ratio = 0.0
-
+    for results, metrics in zip(all_results, results_metrics(all_results)):
         summary_data.append({
             "Ticker": results['ticker'],
-            "Total P&L": total_pnl,
-            "Win Rate (%)": win_rate,
-            "Max Drawdown (%)": results['max_drawdown'] * 100,
-            "Sharpe Ratio": sharpe_ratio,
-            "Total Trades": total_trades,
+            "Total P&L": results['final_equity'] - results['initial_capital'],
+            "Win Rate (%)": metrics['win_rate'],
+            "Max Drawdown (%)": metrics['max_drawdown'] * 100,
+            "Sharpe Ratio": metrics['sharpe'],
+            "Sortino Ratio": metrics['sortino'],
+            "CAGR (%)": metrics['cagr'] * 100,
+            "Profit Factor": metrics['profit_factor'],
+            "Exposure (%)": metrics['exposure'] * 100,
+            "Total Trades": metrics['trades'],
         })
 
     summary_df = pd.DataFrame(summary_data)
@@ -286,24 +546,27 @@ if __name__ == "__main__":
     output_dir = "backtest_results"
     os.makedirs(output_dir, exist_ok=True)
 
-    all_results = []
-
     # Use a smaller list for testing the orchestration
     # symbols_to_run = NIFTY_50_SYMBOLS[:5]
     symbols_to_run = NIFTY_50_SYMBOLS
 
     START_DATE = "2025-05-01"
     END_DATE = "2025-09-22"
+    MAX_WORKERS = int(os.getenv("BACKTEST_WORKERS", os.cpu_count() or 1))
+    TICKER_TIMEOUT = None # Seconds per ticker, None to wait indefinitely
 
-    for ticker in symbols_to_run:
-        results = run_trading_backtest(ticker, START_DATE, END_DATE)
-        if results:
-            all_results.append(results)
-
-            # Save detailed trade log for the ticker
-            if results['trades']:
-                trades_df = pd.DataFrame(results['trades'])
-                trades_df.to_csv(f"{output_dir}/trade_log_{ticker}.csv", index=False)
+    all_results, failures = run_parallel_backtests(
+        symbols_to_run, START_DATE, END_DATE,
+        max_workers=MAX_WORKERS, ticker_timeout=TICKER_TIMEOUT, output_dir=output_dir
+    )
+    for ticker, reason in failures.items():
+        print(f"!!! Backtest for {ticker} did not complete: {reason} !!!")
 
     if all_results:
         generate_summary_report(all_results)
+    phase_summary = format_phase_summary()
+    if phase_summary:
+        print(f"\nTime per phase (main process):\n{phase_summary}")
+    export_metrics()
+    if tracing_enabled():
+        merge_traces()
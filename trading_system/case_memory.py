@@ -0,0 +1,358 @@
+import os
+import sys
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from trading_system.main import calculate_systematic_parameters
+from trading_system.price_store import download_universe
+from trading_system.learning_store import read_learnings
+from trading_system.forecasters import _metric
+
+# Indicator vector of a setup: Phase-1 columns by name prefix (so lookbacks do not
+# matter), plus the close's position in the lookback high/low channel
+FEATURE_PREFIXES = ('HV_', 'Simplified_ATR_', 'EWMA_Volatility_', 'Distance_to_SMA_', 'RSI_')
+FEATURES = FEATURE_PREFIXES + ('channel_position',)
+OUTCOMES = ('success', 'failure', 'open')
+DEFAULT_HORIZON = 20
+
+def _channel_position(close: np.ndarray, high: np.ndarray, low: np.ndarray) -> np.ndarray:
+    width = high - low
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(width > 0, (close - low) / width, 0.5)
+
+def case_vector(technical_metrics: Dict[Any, Any]) -> np.ndarray:
+    """
+    Indicator vector of one Phase-1 row (the dict passed to the forecasting agent).
+    """
+    values = [_metric(technical_metrics, prefix, np.nan) for prefix in FEATURE_PREFIXES]
+    close = _metric(technical_metrics, 'Close', np.nan)
+    high = _metric(technical_metrics, 'High_', np.nan)
+    low = _metric(technical_metrics, 'Low_', np.nan)
+    values.append(float(_channel_position(np.array(close), np.array(high), np.array(low))))
+    return np.array(values, dtype=np.float64)
+
+def _first_column(params_df: pd.DataFrame, prefix: str) -> np.ndarray:
+    for column in params_df.columns:
+        name = column[0] if isinstance(column, tuple) else str(column)
+        if name.startswith(prefix):
+            return params_df[column].to_numpy(dtype=np.float64)
+    return np.full(len(params_df), np.nan)
+
+def feature_matrix(params_df: pd.DataFrame, ticker: str) -> np.ndarray:
+    """
+    Indicator vectors of every row of a Phase-1 frame, in the order of `case_vector`.
+    """
+    columns = [_first_column(params_df, prefix) for prefix in FEATURE_PREFIXES]
+    columns.append(_channel_position(
+        params_df[('Close', ticker)].to_numpy(dtype=np.float64),
+        _first_column(params_df, 'High_'),
+        _first_column(params_df, 'Low_')
+    ))
+    return np.column_stack(columns)
+
+def label_outcome(
+    record: Dict[str, Any],
+    open_: np.ndarray,
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    dates: pd.DatetimeIndex,
+    position: int,
+    volatility_pct: float,
+    horizon: int = DEFAULT_HORIZON
+) -> Dict[str, Any]:
+    """
+    Realized outcome of the decision taken at the close of bar `position`.
+
+    A trade enters at the next open and exits at its stop-loss (checked first) or
+    take-profit, like the backtester, or at the close `horizon` bars later; it is a
+    success if its P&L is positive. A decision not to trade is judged on its trend call
+    over `horizon` bars: up or down as forecast, or for 'sideways' a move smaller than
+    the EWMA volatility scaled to the horizon. Returns outcome 'open' while the
+    horizon has not fully played out.
+    """
+    size = int(record.get('target_position') or 0)
+    stop_loss, take_profit = record.get('stop_loss'), record.get('take_profit')
+    last = min(position + horizon, len(close) - 1)
+    label = {'outcome': 'open', 'exit_reason': None, 'pnl': 0.0, 'return_pct': np.nan, 'resolved_date': pd.NaT}
+
+    if size != 0 and stop_loss is not None and take_profit is not None:
+        if position + 1 >= len(open_):
+            return label
+        entry = open_[position + 1]
+        exit_price = exit_reason = None
+        for j in range(position + 1, last + 1):
+            if (size > 0 and low[j] <= stop_loss) or (size < 0 and high[j] >= stop_loss):
+                exit_price, exit_reason = stop_loss, "Stop-Loss"
+            elif (size > 0 and high[j] >= take_profit) or (size < 0 and low[j] <= take_profit):
+                exit_price, exit_reason = take_profit, "Take-Profit"
+            if exit_price is not None:
+                break
+        if exit_price is None:
+            if last < position + horizon:
+                return label
+            exit_price, exit_reason, j = close[last], "Horizon", last
+        pnl = size * (exit_price - entry)
+        return {
+            'outcome': 'success' if pnl > 0 else 'failure',
+            'exit_reason': exit_reason,
+            'pnl': float(pnl),
+            'return_pct': float((exit_price / entry - 1) * 100 * np.sign(size)),
+            'resolved_date': dates[j],
+        }
+
+    if last < position + horizon:
+        return label
+    move = close[last] / close[position] - 1
+    trend = record.get('trend')
+    if trend == 'uptrend':
+        success = move > 0
+    elif trend == 'downtrend':
+        success = move < 0
+    else:
+        success = abs(move) < volatility_pct / 100 * np.sqrt(horizon)
+    return {
+        'outcome': 'success' if success else 'failure',
+        'exit_reason': None,
+        'pnl': 0.0,
+        'return_pct': float(move * 100),
+        'resolved_date': dates[last],
+    }
+
+class CaseMemory:
+    """
+    Past decisions joined with their realized outcomes, indexed for the Self-Reflection
+    step of the outline (1.4, 2.3): `select` filters by ticker, trend, outcome and date
+    range, and `nearest` returns the k past setups closest to an indicator vector.
+
+    Vectors are z-scored per feature and kept as one float32 matrix with precomputed
+    squared norms, so a query is one matrix-vector product and a partial sort
+    (squared distance = |x|^2 - 2 x.q + |q|^2). Filtered subsets are cached, and
+    queries can be restricted to cases resolved before a date to avoid lookahead in
+    backtests.
+    """
+    def __init__(self, cases: pd.DataFrame, vectors: np.ndarray):
+        order = np.lexsort((cases['ticker'].to_numpy(), cases['date'].to_numpy()))
+        self.cases = cases.iloc[order].reset_index(drop=True)
+        vectors = np.asarray(vectors, dtype=np.float64)[order] if len(order) else np.zeros((0, len(FEATURES)))
+        self.tickers = self.cases['ticker'].to_numpy()
+        self.dates = self.cases['date'].to_numpy(dtype='datetime64[ns]')
+        self.trends = self.cases['trend'].to_numpy()
+        self.outcomes = self.cases['outcome'].to_numpy()
+        self.resolved = self.cases['resolved_date'].to_numpy(dtype='datetime64[ns]')
+        self._open = self.outcomes == 'open'
+        self._success = self.outcomes == 'success'
+        self._pnl = self.cases['pnl'].to_numpy(dtype=np.float64) if 'pnl' in self.cases else np.zeros(len(self.cases))
+        self._return_pct = self.cases['return_pct'].to_numpy(dtype=np.float64) if 'return_pct' in self.cases else np.zeros(len(self.cases))
+
+        finite = np.where(np.isfinite(vectors), vectors, np.nan)
+        self.mean = np.nan_to_num(np.nanmean(finite, axis=0)) if len(finite) else np.zeros(len(FEATURES))
+        std = np.nanstd(finite, axis=0) if len(finite) else np.ones(len(FEATURES))
+        self.std = np.where(np.nan_to_num(std) > 0, std, 1.0)
+        self.vectors = np.nan_to_num((finite - self.mean) / self.std).astype(np.float32)
+        self.norms = np.einsum('ij,ij->i', self.vectors, self.vectors)
+
+        self._by = {
+            'ticker': self._group(self.tickers),
+            'trend': self._group(self.trends),
+            'outcome': self._group(self.outcomes),
+        }
+        self._subsets: Dict[Tuple, Tuple[np.ndarray, ...]] = {}
+
+    @staticmethod
+    def _group(values: np.ndarray) -> Dict[Any, np.ndarray]:
+        groups: Dict[Any, List[int]] = {}
+        for i, value in enumerate(values):
+            groups.setdefault(value, []).append(i)
+        return {value: np.array(ids, dtype=np.int64) for value, ids in groups.items()}
+
+    def __len__(self) -> int:
+        return len(self.cases)
+
+    @classmethod
+    def build(cls, records: Iterable[Dict[str, Any]] = None, horizon: int = DEFAULT_HORIZON, **indicator_options) -> "CaseMemory":
+        """
+        Builds the memory from stored decisions (default: `read_learnings()`, the store
+        under LEARNING_STORE_PATH). Prices come from the price store in one batched read;
+        Phase 1 runs once per ticker to get each decision's indicator vector as of its
+        date. The latest record per ticker and date wins.
+        """
+        latest: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for record in (read_learnings() if records is None else records):
+            if record.get('ticker') and record.get('date'):
+                latest[(record['ticker'], record['date'])] = record
+        if not latest:
+            return cls(pd.DataFrame(columns=['ticker', 'date', 'trend', 'outcome', 'resolved_date']), np.zeros((0, len(FEATURES))))
+
+        decision_dates = pd.to_datetime([date for _, date in latest])
+        start = (decision_dates.min() - pd.Timedelta(days=180)).strftime("%Y-%m-%d")
+        end = min(decision_dates.max() + pd.Timedelta(days=horizon * 2 + 10), pd.Timestamp.now() + pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+        tickers = sorted({ticker for ticker, _ in latest})
+        price_frames, failed = download_universe(tickers, start=start, end=end)
+        for ticker in failed:
+            print(f"Case memory: no price data for {ticker}, its decisions are skipped.")
+
+        rows, vectors = [], []
+        for ticker in tickers:
+            if ticker not in price_frames:
+                continue
+            params_df = calculate_systematic_parameters(ticker, data=price_frames[ticker], **indicator_options)
+            if params_df.empty:
+                continue
+            features = feature_matrix(params_df, ticker)
+            dates = params_df.index
+            arrays = [params_df[(field, ticker)].to_numpy(dtype=np.float64) for field in ('Open', 'High', 'Low', 'Close')]
+            volatility = _first_column(params_df, 'EWMA_Volatility_')
+
+            for (record_ticker, date_str), record in latest.items():
+                if record_ticker != ticker:
+                    continue
+                position = dates.searchsorted(pd.Timestamp(date_str), side='right') - 1
+                if position < 0:
+                    continue
+                label = label_outcome(record, *arrays, dates, position, volatility[position], horizon)
+                rows.append({
+                    'ticker': ticker,
+                    'date': pd.Timestamp(date_str),
+                    'trend': record.get('trend'),
+                    'P_up': record.get('P_up'),
+                    'P_down': record.get('P_down'),
+                    'target_position': int(record.get('target_position') or 0),
+                    'instrument_price': record.get('instrument_price'),
+                    'stop_loss': record.get('stop_loss'),
+                    'take_profit': record.get('take_profit'),
+                    'reasoning': record.get('reasoning'),
+                    **label,
+                })
+                vectors.append(features[position])
+
+        cases = pd.DataFrame(rows, columns=['ticker', 'date', 'trend', 'P_up', 'P_down', 'target_position', 'instrument_price',
+                                            'stop_loss', 'take_profit', 'reasoning', 'outcome', 'exit_reason', 'pnl',
+                                            'return_pct', 'resolved_date'])
+        return cls(cases, np.array(vectors).reshape(-1, len(FEATURES)))
+
+    def select(self, ticker: str = None, trend: str = None, outcome: str = None, start=None, end=None) -> np.ndarray:
+        """
+        Ids of the cases matching every given filter, in date order; `end` is exclusive.
+        """
+        ids = self._subset(ticker, trend, outcome)[0]
+        if start is not None or end is not None:
+            dates = self.dates[ids]
+            first = dates.searchsorted(np.datetime64(pd.Timestamp(start)), side='left') if start is not None else 0
+            last = dates.searchsorted(np.datetime64(pd.Timestamp(end)), side='left') if end is not None else len(ids)
+            ids = ids[first:last]
+        return ids
+
+    def _subset(self, ticker: str = None, trend: str = None, outcome: str = None, include_open: bool = True) -> Tuple[np.ndarray, ...]:
+        # ids, vectors, squared norms, decision and resolution dates of one filter combination
+        key = (ticker, trend, outcome, include_open)
+        subset = self._subsets.get(key)
+        if subset is None:
+            ids = np.arange(len(self), dtype=np.int64)
+            for field, value in zip(('ticker', 'trend', 'outcome'), key):
+                if value is not None:
+                    ids = np.intersect1d(ids, self._by[field].get(value, np.zeros(0, dtype=np.int64)), assume_unique=True)
+            if not include_open:
+                ids = ids[~self._open[ids]]
+            subset = self._subsets[key] = (ids, self.vectors[ids], self.norms[ids], self.dates[ids], self.resolved[ids])
+        return subset
+
+    def nearest_ids(
+        self,
+        query,
+        k: int = 10,
+        ticker: str = None,
+        trend: str = None,
+        outcome: str = None,
+        resolved_before=None,
+        include_open: bool = False
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Ids and distances of the `k` nearest cases, closest first; see `nearest`.
+        """
+        vector = query if isinstance(query, np.ndarray) else case_vector(query)
+        q = np.nan_to_num((vector - self.mean) / self.std).astype(np.float32)
+        ids, vectors, norms, dates, resolved = self._subset(ticker, trend, outcome, include_open or outcome is not None)
+        if resolved_before is not None:
+            # Resolved before the date implies decided before it: only that prefix is scanned
+            cutoff = np.datetime64(pd.Timestamp(resolved_before), 'ns')
+            end = dates.searchsorted(cutoff, side='left')
+            ids, vectors, norms, resolved = ids[:end], vectors[:end], norms[:end], resolved[:end]
+        if len(ids) == 0:
+            return ids, np.zeros(0)
+
+        distances = norms - 2 * (vectors @ q) + float(q @ q)
+        if resolved_before is not None:
+            distances[~(resolved < cutoff)] = np.inf
+
+        k = min(k, len(ids))
+        best = np.argpartition(distances, k - 1)[:k]
+        best = best[np.argsort(distances[best], kind='stable')]
+        best = best[np.isfinite(distances[best])]
+        return ids[best], np.sqrt(np.maximum(distances[best], 0))
+
+    def nearest(self, query, k: int = 10, **filters) -> pd.DataFrame:
+        """
+        The `k` past cases whose indicator vectors are closest to `query` (a Phase-1 row
+        dict or a `case_vector`). Filters: `ticker`, `trend`, `outcome`, and
+        `resolved_before` a date, for cases whose outcome was known by then. Cases still
+        'open' are left out unless `include_open`. Returns their rows with a `distance`
+        column.
+        """
+        ids, distances = self.nearest_ids(query, k=k, **filters)
+        result = self.cases.iloc[ids].copy()
+        result['distance'] = distances
+        return result
+
+    def experience_summary(self, query, k: int = 20, **filters) -> Dict[str, Any]:
+        """
+        Success rate, mean P&L and mean return of the `k` most similar resolved cases, as
+        input for the decision agent's self-reflection.
+        """
+        ids, _ = self.nearest_ids(query, k=k, **filters)
+        if len(ids) == 0:
+            return {'cases': 0, 'success_rate': None, 'mean_pnl': None, 'mean_return_pct': None, 'by_trend': {}}
+        success = self._success[ids]
+        trends = self.trends[ids]
+        return {
+            'cases': len(ids),
+            'success_rate': float(success.mean()),
+            'mean_pnl': float(self._pnl[ids].mean()),
+            'mean_return_pct': float(np.nanmean(self._return_pct[ids])) if np.isfinite(self._return_pct[ids]).any() else None,
+            'by_trend': {trend: float(success[trends == trend].mean()) for trend in dict.fromkeys(trends)},
+        }
+
+    def outcome_counts(self) -> pd.DataFrame:
+        """
+        Cases per trend and outcome.
+        """
+        return self.cases.groupby(['trend', 'outcome']).size().unstack(fill_value=0)
+
+_memory = None
+
+def get_case_memory(rebuild: bool = False) -> CaseMemory:
+    """
+    Returns the case memory of this process, built on first use from the learning store
+    under LEARNING_STORE_PATH.
+    """
+    global _memory
+    if _memory is None or rebuild:
+        _memory = CaseMemory.build()
+    return _memory
+
+if __name__ == "__main__":
+    started = time.perf_counter()
+    memory = get_case_memory()
+    print(f"Built a case memory of {len(memory)} decisions in {time.perf_counter() - started:.2f}s")
+    if len(memory):
+        print(memory.outcome_counts().to_string())
+        query = memory.vectors[-1] * memory.std + memory.mean
+        started = time.perf_counter()
+        for _ in range(1000):
+            memory.nearest_ids(query, k=10)
+        print(f"Nearest-10 query: {(time.perf_counter() - started):.3f} ms on average")
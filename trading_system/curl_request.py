@@ -1,6 +1,13 @@
+import sys
+import os
+# Add the parent directory of your package to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
 import traceback
 import requests
 from urllib.parse import parse_qsl
+from trading_system.http_client import get_transport
+from trading_system.instrumentation import AGENT_ERRORS, console, time_phase
 
 import urllib.parse
 
@@ -125,6 +132,177 @@ def parse_google_ai_response(response_text):
 
 
 
+REQUIRED_FORECAST_KEYS = ["P_up", "P_down", "P_side", "trend", "reasoning"]
+
+def extract_answer_fragments(line):
+    """
+    Returns the answer text of one frame of the streaming response, or None for length
+    prefixes, control frames and frames without answer text.
+    """
+    # Cheap pre-check so only answer frames pay for JSON decoding
+    if '"wrb.fr"' not in line:
+        return None
+    start = line.find('[[')
+    if start < 0:
+        return None
+    try:
+        parsed_data = json.loads(line[start:])
+        payload = parsed_data[0][2]
+        if not isinstance(payload, str):
+            return None
+        inner_data = json.loads(payload)
+        string_fragments = inner_data[4][0][1]
+    except (json.JSONDecodeError, IndexError, TypeError):
+        return None
+    if not isinstance(string_fragments, list):
+        return None
+    return "".join(remove_markdown_fences(s) for s in string_fragments)
+
+class StreamingForecastParser:
+    """
+    Incremental parser for the streaming response. Every frame repeats the whole answer
+    so far, so only the newest answer is kept, and it is decoded only once it looks
+    complete. `feed_line` returns the forecast as soon as a valid JSON object with all
+    `required_keys` has arrived, so the caller can stop reading the stream.
+    """
+    def __init__(self, required_keys=REQUIRED_FORECAST_KEYS):
+        self.required_keys = required_keys
+        self.latest_answer = ""
+
+    def feed_line(self, line):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        answer = extract_answer_fragments(line.strip())
+        if answer is None:
+            return None
+        self.latest_answer = answer
+        if not answer.endswith('}'):
+            return None
+        try:
+            forecast = json.loads(answer)
+        except json.JSONDecodeError:
+            return None
+        if isinstance(forecast, dict) and all(key in forecast for key in self.required_keys):
+            return forecast
+        return None
+
+    def finish(self):
+        """
+        Called when the stream ends without a complete forecast: parses the last answer
+        like `parse_google_ai_response` would.
+        """
+        if not self.latest_answer:
+            raise ValueError("No parsable JSON content found in the response.")
+        try:
+            return json.loads(self.latest_answer)
+        except json.JSONDecodeError:
+            raise ValueError("Failed to parse the final JSON object.")
+
+def parse_streaming_forecast(lines, required_keys=REQUIRED_FORECAST_KEYS):
+    """
+    Consumes response lines (e.g. `response.iter_lines()`) until a complete forecast has
+    appeared and returns it without reading the rest of the stream.
+    """
+    parser = StreamingForecastParser(required_keys)
+    for line in lines:
+        forecast = parser.feed_line(line)
+        if forecast is not None:
+            return forecast
+    return parser.finish()
+
+FORECAST_TRENDS = ("uptrend", "downtrend", "sideways")
+
+def is_valid_forecast(forecast, required_keys=REQUIRED_FORECAST_KEYS):
+    """
+    True for a forecast dict with all `required_keys`, probabilities in [0, 1] and a
+    known trend.
+    """
+    if not isinstance(forecast, dict) or not all(key in forecast for key in required_keys):
+        return False
+    try:
+        if not all(0.0 <= float(forecast[key]) <= 1.0 for key in ("P_up", "P_down", "P_side") if key in required_keys):
+            return False
+    except (TypeError, ValueError):
+        return False
+    return "trend" not in required_keys or forecast["trend"] in FORECAST_TRENDS
+
+def split_batch_forecast(answer, tickers, required_keys=REQUIRED_FORECAST_KEYS):
+    """
+    Splits a batched reply into per-ticker forecasts. The reply is a JSON array of
+    forecast objects with a "ticker" key (an object keyed by ticker is accepted too).
+    Malformed entries and tickers that were not asked for are dropped.
+    """
+    if isinstance(answer, str):
+        answer = json.loads(remove_markdown_fences(answer))
+    if isinstance(answer, dict):
+        answer = [dict(forecast, ticker=ticker) for ticker, forecast in answer.items() if isinstance(forecast, dict)]
+    if not isinstance(answer, list):
+        raise ValueError("Batched forecast is not a JSON array.")
+
+    wanted = set(tickers)
+    forecasts = {}
+    for entry in answer:
+        if not isinstance(entry, dict) or entry.get("ticker") not in wanted:
+            continue
+        forecast = {key: value for key, value in entry.items() if key != "ticker"}
+        if is_valid_forecast(forecast, required_keys):
+            forecasts[entry["ticker"]] = forecast
+    return forecasts
+
+class StreamingBatchForecastParser(StreamingForecastParser):
+    """
+    Streaming parser for a batched reply: `feed_line` returns the per-ticker forecasts
+    as soon as the array is complete and covers every ticker; `finish` returns whatever
+    valid forecasts the last answer holds.
+    """
+    def __init__(self, tickers, required_keys=REQUIRED_FORECAST_KEYS):
+        super().__init__(required_keys)
+        self.tickers = list(tickers)
+
+    def feed_line(self, line):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        answer = extract_answer_fragments(line.strip())
+        if answer is None:
+            return None
+        self.latest_answer = answer
+        if not answer.endswith((']', '}')):
+            return None
+        try:
+            forecasts = split_batch_forecast(answer, self.tickers, self.required_keys)
+        except ValueError: # includes JSONDecodeError
+            return None
+        return forecasts if len(forecasts) == len(set(self.tickers)) else None
+
+    def finish(self):
+        if not self.latest_answer:
+            raise ValueError("No parsable JSON content found in the response.")
+        try:
+            return split_batch_forecast(self.latest_answer, self.tickers, self.required_keys)
+        except ValueError:
+            raise ValueError("Failed to parse the batched JSON array.")
+
+def build_batch_forecast_prompt(metrics_by_ticker):
+    """
+    One prompt for several tickers: `metrics_by_ticker` maps each ticker to its metrics
+    JSON (as sent by `stock_forecasting_agent`); the reply must be a JSON array with one
+    forecast object per ticker.
+    """
+    metrics = {ticker: json.loads(metrics_json) for ticker, metrics_json in metrics_by_ticker.items()}
+    return (
+        "You are a sophisticated Stock-Forecasting Agent. Your role is to analyze a set of technical indicators "
+        "for each of the following stocks and predict the most likely trend for the next trading day. "
+        f"Technical metrics by ticker: {json.dumps(metrics, separators=(',', ':'))} "
+        "Reply with a JSON array containing exactly one object per ticker, in this format: "
+        '[{"ticker": "<ticker>", "P_up": <probability of uptrend, float between 0.0 and 1.0>, '
+        '"P_down": <probability of downtrend, float between 0.0 and 1.0>, '
+        '"P_side": <probability of sideways movement, float between 0.0 and 1.0>, '
+        '"trend": "<uptrend, downtrend, or sideways>", "reasoning": "<a brief explanation of your reasoning>"}] '
+        "For each ticker the probabilities must sum to 1.0 and the trend must be the one with the highest probability. "
+        "The output must be only the JSON array, without any markdown formatting."
+    )
+
+
 def parse_google_ai_stream(raw_response_chunks: str) -> dict:
     """
     Parses a fragmented Google AI streaming response to extract the final output,
@@ -219,33 +397,53 @@ def extract_from_bard_response(response_text):
 
 
 
-def make_curl_request(ticker, metrics_json):
+# Endpoint, headers and form payload of the cURL command replicated by the requests below
+BARD_URL = 'https://gemini.google.com/_/BardChatUi/data/assistant.lamda.BardFrontendService/StreamGenerate?bl=boq_assistant-bard-web-server_20250917.05_p4&f.sid=-456639814663206703&hl=en-GB&_reqid=6379513&rt=c'
+BARD_HEADERS = {
+    'sec-ch-ua-full-version-list': '',
+    'sec-ch-ua-platform': '"Windows"',
+    'sec-ch-ua': '"Google Chrome";v="135", "Chromium";v="135", "Not_A Brand";v="24"',
+    'sec-ch-ua-bitness': '""',
+    'sec-ch-ua-model': '""',
+    'sec-ch-ua-mobile': '?0',
+    'X-Same-Domain': '1',
+    'sec-ch-ua-wow64': '?0',
+    'sec-ch-ua-form-factors': '',
+    'sec-ch-ua-arch': '""',
+    'x-goog-ext-73010989-jspb': '[0]',
+    'sec-ch-ua-full-version': '""',
+    'Content-Type': 'application/x-www-form-urlencoded;charset=UTF-8',
+    'x-goog-ext-525001261-jspb': '[1,null,null,null,"9ec249fc9ad08861",null,null,0,[4]]',
+    'Referer': 'https://gemini.google.com/',
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/135.0.7049.115 Safari/537.36',
+    'sec-ch-ua-platform-version': '""',
+}
+
+def encode_prompt(prompt):
+    """
+    URL-encodes a prompt for `bard_form_raw`. The prompt sits in a JSON string nested in
+    another JSON string, so quotes and backslashes are escaped twice first.
+    """
+    escaped = json.dumps(json.dumps(prompt)[1:-1])[1:-1]
+    return url_encode_sentence(escaped)
+
+def bard_form_raw(encoded_prompt):
+    """
+    Returns the raw `f.req` form body of a StreamGenerate request for a URL-encoded prompt.
+    """
+    return "f.req=%5Bnull%2C%22%5B%5B%5C%22" + encoded_prompt + "%5C%22%2C0%2Cnull%2Cnull%2Cnull%2Cnull%2C0%5D%2C%5B%5C%22en-GB%5C%22%5D%2C%5B%5C%22c_ebdcb1c6664b8d20%5C%22%2C%5C%22r_0a8e02235760bdcc%5C%22%2C%5C%22rc_20544167fb2fa1c6%5C%22%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2C%5C%22AwAAAAAAAAAQ4DUFz3Xz2P5_USnPlhk%5C%22%5D%2C%5C%22!OTqlOmLNAAa-BNTXngRCYhc77f6S-7A7ADQBEArZ1EKPRtNIAqiZ1tu84LgbIZsYApNN6bpszvXM530wwYMj-WWW3Kz5J_Tv_oerOBTBAgAAAH5SAAAAB2gBB34AQYxEiVnF2XdfRYXgl2c4fvrwfqB8UvPXDdoPcpc1z_-zPgN9ciqklx4xXS9ZWx3qrqBWHhm2W8KpF7gvJYMyelqymQOC0JZQadqj6CgXAkcrMaSkL8quaSVcZlQXdSwpoJjk9S0RImZGkt7Fa0kYGC3O9rRaBn1HBu4TelJvfvF633CTWdmy3ecGwnLHF65Rw-5tSIByo7R9rKJ_9MIutZbjOixjN4K-NhScSc1wdPdDbIshz5RXNRRWtbRFjSdLTw_b5ITXsQh7uZtFGtkzh1Sgt0E6sJVOIv8sTOHjlaZ1fLPTnwz8fKTw7g05UUgKXgyNJVRKEvr0x92AA7QLnYHJhY7q1lVJlyeip4oQ_NGuHzofin9O3nyzwj4xCNBJ68fovojSdRrnMoeaNklS3KYMdUx332LoZLD550SZvGghYkCRmPkav5JuaFrejLm-HQNudoimkbWR6WY2jMNEiAHBqWfmTSBMsSotCzX-quU1oiRqnybDNdKDQ4ba--4KJQ77qpBjj1YFqK5LWrmTIDOBNQcwY81IGb_JIgtE0dj3PNuZHxuFyKPlzUf70x87wDPBlIxC-MrV9PbkZYZGr_Y_d_FY4Kj6HKo2gz9lK_ETUaI151jqcsbiLMySMJyoicghac551fUEuaVRu0Xj8q50UbXXX3OtWIooEvHPJz5wpOB3F9za3792p623ewcTg-Rei29N-IRnyPmFUtlnDMaxlzjLNaEFhTWco2XrU-oJWdYVB_zh2XgX_buP3OLWb8a2cS_BWql77a9fBIds-5aGf7Eyb-hvtMolf5wdBuUnisl-TDIQz1oxdkB7UShofMkSV8NJfiIMSAYsGXu9TdsSQbTMrZGyH97PZvUY65xGFXU7SZLKHtjjTs8EogfCTKQYTHKtDox605BLPgZqPGLm4ZESYSJ2wZqDZVvGGrQWS-rk5e5clEuEw2Ui5nKXzHYGpXthROulzpe_BB5NufzfNiL7cmKc1mjxuoV6d4tA75JL_RkzoIUztMlXB1W8nScOrUgsa3g1mLvZ2ulOPFoIwZbzZHVjDYGfQTq_bcPktF7REhZdMApExq72we09J1sLSGonob-lkorwzztRjMqIGH77kRkZI6nD8C-OS2QgrlxLJtd8h45eWlvsFk3LTg8EL-Rf_PcoF1jyvopYqH3sEfBi6S5-FJ7s-00HQTzaWBsGTlTTFXhwQO5S6qq_EKohIJl818-hRac0b8XbHjUnd5SZnzuDC7RQeh7KfeBEpYmATgM-U_Bz798tFerWShjmydFSVA%5C%22%2C%5C%22517cfe4d26dd2de09eaf707174605cd7%5C%22%2Cnull%2C%5B0%5D%2C1%2Cnull%2Cnull%2C1%2C0%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2C%5B%5B6%5D%5D%2C0%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2C1%2Cnull%2Cnull%2C%5B4%5D%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2C%5B1%5D%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2C0%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2C%5B%5D%5D%22%5D&at=AJoiUyMApCx3L84IzB-LGRCWYdO9%3A1758466656691&"
+
+def make_curl_request(ticker, metrics_json, stream=True):
     """
     Replicates the provided cURL command to Google's Bard/Gemini service.
+    With `stream`, the response is parsed while it arrives and the connection is closed
+    as soon as a complete forecast has been received.
     """
     # 1. Define the URL from the cURL command
-    url = 'https://gemini.google.com/_/BardChatUi/data/assistant.lamda.BardFrontendService/StreamGenerate?bl=boq_assistant-bard-web-server_20250917.05_p4&f.sid=-456639814663206703&hl=en-GB&_reqid=6379513&rt=c'
+    url = BARD_URL
     # 2. Define the Headers from the -H arguments
     # Note: Trailing semicolons from the cURL command are removed for correctness.
-    headers = {
-        'sec-ch-ua-full-version-list': '',
-        'sec-ch-ua-platform': '"Windows"',
-        'sec-ch-ua': '"Google Chrome";v="135", "Chromium";v="135", "Not_A Brand";v="24"',
-        'sec-ch-ua-bitness': '""',
-        'sec-ch-ua-model': '""',
-        'sec-ch-ua-mobile': '?0',
-        'X-Same-Domain': '1',
-        'sec-ch-ua-wow64': '?0',
-        'sec-ch-ua-form-factors': '',
-        'sec-ch-ua-arch': '""',
-        'x-goog-ext-73010989-jspb': '[0]',
-        'sec-ch-ua-full-version': '""',
-        'Content-Type': 'application/x-www-form-urlencoded;charset=UTF-8',
-        'x-goog-ext-525001261-jspb': '[1,null,null,null,"9ec249fc9ad08861",null,null,0,[4]]',
-        'Referer': 'https://gemini.google.com/',
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/135.0.7049.115 Safari/537.36',
-        'sec-ch-ua-platform-version': '""',
-    }
+    headers = BARD_HEADERS
 
     # 3. Define the data payload from the --data-raw argument.
     # The raw data string is parsed into a dictionary, which is the
@@ -280,24 +478,41 @@ def make_curl_request(ticker, metrics_json):
     promptText = promptText +"Please provide your forecast in the following JSON format:{{P_up: <probability of uptrend, float between 0.0 and 1.0>, P_down: <probability of downtrend, float between 0.0 and 1.0>,P_side: <probability of sideways movement, float between 0.0 and 1.0>,trend: <'uptrend', 'downtrend', or 'sideways'>,reasoning: <a brief explanation of your reasoning for the forecast>}}The probabilities (P_up, P_down, P_side) must sum to 1.0. The 'trend' should be the one with the highest probability.The output must be only the JSON object."
     promptText=url_encode_sentence(promptText)
 
-    RAWDATA = "f.req=%5Bnull%2C%22%5B%5B%5C%22"+promptText+"%5C%22%2C0%2Cnull%2Cnull%2Cnull%2Cnull%2C0%5D%2C%5B%5C%22en-GB%5C%22%5D%2C%5B%5C%22c_ebdcb1c6664b8d20%5C%22%2C%5C%22r_0a8e02235760bdcc%5C%22%2C%5C%22rc_20544167fb2fa1c6%5C%22%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2C%5C%22AwAAAAAAAAAQ4DUFz3Xz2P5_USnPlhk%5C%22%5D%2C%5C%22!OTqlOmLNAAa-BNTXngRCYhc77f6S-7A7ADQBEArZ1EKPRtNIAqiZ1tu84LgbIZsYApNN6bpszvXM530wwYMj-WWW3Kz5J_Tv_oerOBTBAgAAAH5SAAAAB2gBB34AQYxEiVnF2XdfRYXgl2c4fvrwfqB8UvPXDdoPcpc1z_-zPgN9ciqklx4xXS9ZWx3qrqBWHhm2W8KpF7gvJYMyelqymQOC0JZQadqj6CgXAkcrMaSkL8quaSVcZlQXdSwpoJjk9S0RImZGkt7Fa0kYGC3O9rRaBn1HBu4TelJvfvF633CTWdmy3ecGwnLHF65Rw-5tSIByo7R9rKJ_9MIutZbjOixjN4K-NhScSc1wdPdDbIshz5RXNRRWtbRFjSdLTw_b5ITXsQh7uZtFGtkzh1Sgt0E6sJVOIv8sTOHjlaZ1fLPTnwz8fKTw7g05UUgKXgyNJVRKEvr0x92AA7QLnYHJhY7q1lVJlyeip4oQ_NGuHzofin9O3nyzwj4xCNBJ68fovojSdRrnMoeaNklS3KYMdUx332LoZLD550SZvGghYkCRmPkav5JuaFrejLm-HQNudoimkbWR6WY2jMNEiAHBqWfmTSBMsSotCzX-quU1oiRqnybDNdKDQ4ba--4KJQ77qpBjj1YFqK5LWrmTIDOBNQcwY81IGb_JIgtE0dj3PNuZHxuFyKPlzUf70x87wDPBlIxC-MrV9PbkZYZGr_Y_d_FY4Kj6HKo2gz9lK_ETUaI151jqcsbiLMySMJyoicghac551fUEuaVRu0Xj8q50UbXXX3OtWIooEvHPJz5wpOB3F9za3792p623ewcTg-Rei29N-IRnyPmFUtlnDMaxlzjLNaEFhTWco2XrU-oJWdYVB_zh2XgX_buP3OLWb8a2cS_BWql77a9fBIds-5aGf7Eyb-hvtMolf5wdBuUnisl-TDIQz1oxdkB7UShofMkSV8NJfiIMSAYsGXu9TdsSQbTMrZGyH97PZvUY65xGFXU7SZLKHtjjTs8EogfCTKQYTHKtDox605BLPgZqPGLm4ZESYSJ2wZqDZVvGGrQWS-rk5e5clEuEw2Ui5nKXzHYGpXthROulzpe_BB5NufzfNiL7cmKc1mjxuoV6d4tA75JL_RkzoIUztMlXB1W8nScOrUgsa3g1mLvZ2ulOPFoIwZbzZHVjDYGfQTq_bcPktF7REhZdMApExq72we09J1sLSGonob-lkorwzztRjMqIGH77kRkZI6nD8C-OS2QgrlxLJtd8h45eWlvsFk3LTg8EL-Rf_PcoF1jyvopYqH3sEfBi6S5-FJ7s-00HQTzaWBsGTlTTFXhwQO5S6qq_EKohIJl818-hRac0b8XbHjUnd5SZnzuDC7RQeh7KfeBEpYmATgM-U_Bz798tFerWShjmydFSVA%5C%22%2C%5C%22517cfe4d26dd2de09eaf707174605cd7%5C%22%2Cnull%2C%5B0%5D%2C1%2Cnull%2Cnull%2C1%2C0%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2C%5B%5B6%5D%5D%2C0%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2C1%2Cnull%2Cnull%2C%5B4%5D%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2C%5B1%5D%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2C0%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2C%5B%5D%5D%22%5D&at=AJoiUyMApCx3L84IzB-LGRCWYdO9%3A1758466656691&"
+    RAWDATA = bard_form_raw(promptText)
     data_raw=RAWDATA
     data = dict(parse_qsl(data_raw))
     #print(data)  # For debugging purposes
     try:
+        if stream:
+            # 'http' is the time to the response headers, 'parse' reading and parsing the stream
+            with time_phase('http'):
+                response = get_transport().post(url, headers=headers, data=data, stream=True)
+            try:
+                response.raise_for_status()
+                with time_phase('parse'):
+                    forecast = parse_streaming_forecast(response.iter_lines(), REQUIRED_FORECAST_KEYS)
+            finally:
+                response.close()
+
+            if not isinstance(forecast, dict) or not all(key in forecast for key in REQUIRED_FORECAST_KEYS):
+                raise ValueError("Forecast JSON is missing required keys.")
+            console("Forecast JSON is valid and contains all required keys.")
+            return forecast
+
         # 4. Send the POST request
-        response = requests.post(url, headers=headers, data=data)
+        with time_phase('http'):
+            response = get_transport().post(url, headers=headers, data=data)
 
         # Raise an HTTPError for bad responses (4xx or 5xx)
         response.raise_for_status()
 
         # 5. Print the response
-        print("Request successful!")
-        print(f"Status Code: {response.status_code}")
+        console("Request successful!")
+        console(f"Status Code: {response.status_code}")
         # print("Response Text:")
         # print(response)
         response_text=response.content.decode('utf-8')
-        print(response_text)
+        console(response_text)
         
         
         
@@ -305,11 +520,12 @@ def make_curl_request(ticker, metrics_json):
         full_response = ""
          
         try:
-            parsed_json = parse_google_ai_response(response_text)
+            with time_phase('parse'):
+                parsed_json = parse_google_ai_response(response_text)
             full_response = json.dumps(parsed_json, indent=2)
-            print("Extracted JSON from response:")
-            print(full_response)    
-            print()
+            console("Extracted JSON from response:")
+            console(full_response)    
+            console()
         except ValueError as e:
             print(f"Error: {e}")
             traceback.print_exc()
@@ -320,60 +536,78 @@ def make_curl_request(ticker, metrics_json):
 
         forecast = json.loads(full_response)
 
-        required_keys = ["P_up", "P_down", "P_side", "trend", "reasoning"]
-        if not all(key in forecast for key in required_keys):
+        if not all(key in forecast for key in REQUIRED_FORECAST_KEYS):
             raise ValueError("Forecast JSON is missing required keys.")
-        print("Forecast JSON is valid and contains all required keys.")
+        console("Forecast JSON is valid and contains all required keys.")
         return forecast
 
     except requests.exceptions.RequestException as e:
         print(f"An error occurred: {e}")
         traceback.print_exc()
+        AGENT_ERRORS.inc(agent='http')
         return {"error": str(e)}
 
 
 
 
+def make_batch_curl_request(metrics_by_ticker, stream=True):
+    """
+    Forecasts several tickers with one request (see `build_batch_forecast_prompt`).
+    Returns {ticker: forecast} for the tickers the reply covers validly, which may be
+    fewer than asked, or {"error": ...} if the request or parsing failed.
+    """
+    tickers = list(metrics_by_ticker)
+    data = dict(parse_qsl(bard_form_raw(encode_prompt(build_batch_forecast_prompt(metrics_by_ticker)))))
+    try:
+        with time_phase('http'):
+            response = get_transport().post(BARD_URL, headers=BARD_HEADERS, data=data, stream=stream)
+        try:
+            response.raise_for_status()
+            with time_phase('parse'):
+                parser = StreamingBatchForecastParser(tickers)
+                lines = response.iter_lines() if stream else response.content.decode('utf-8').splitlines()
+                forecasts = None
+                for line in lines:
+                    forecasts = parser.feed_line(line)
+                    if forecasts is not None:
+                        break
+                if forecasts is None:
+                    forecasts = parser.finish()
+        finally:
+            response.close()
+        console(f"Batched forecast covered {len(forecasts)} of {len(tickers)} tickers.")
+        return forecasts
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"An error occurred in the batched forecast: {e}")
+        AGENT_ERRORS.inc(agent='batch_http')
+        return {"error": str(e)}
+
+
 def make_curl_requestWithPrompt(promptText: str) -> dict:
     """
     Replicates the provided cURL command to Google's Bard/Gemini service.
+    `promptText` is plain text; it is escaped here (see `encode_prompt`), so it may
+    hold quotes, ampersands and other characters from news feeds.
     """
     # 1. Define the URL from the cURL command
-    url = 'https://gemini.google.com/_/BardChatUi/data/assistant.lamda.BardFrontendService/StreamGenerate?bl=boq_assistant-bard-web-server_20250917.05_p4&f.sid=-456639814663206703&hl=en-GB&_reqid=6379513&rt=c'
+    url = BARD_URL
     # 2. Define the Headers from the -H arguments
     # Note: Trailing semicolons from the cURL command are removed for correctness.
-    headers = {
-        'sec-ch-ua-full-version-list': '',
-        'sec-ch-ua-platform': '"Windows"',
-        'sec-ch-ua': '"Google Chrome";v="135", "Chromium";v="135", "Not_A Brand";v="24"',
-        'sec-ch-ua-bitness': '""',
-        'sec-ch-ua-model': '""',
-        'sec-ch-ua-mobile': '?0',
-        'X-Same-Domain': '1',
-        'sec-ch-ua-wow64': '?0',
-        'sec-ch-ua-form-factors': '',
-        'sec-ch-ua-arch': '""',
-        'x-goog-ext-73010989-jspb': '[0]',
-        'sec-ch-ua-full-version': '""',
-        'Content-Type': 'application/x-www-form-urlencoded;charset=UTF-8',
-        'x-goog-ext-525001261-jspb': '[1,null,null,null,"9ec249fc9ad08861",null,null,0,[4]]',
-        'Referer': 'https://gemini.google.com/',
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/135.0.7049.115 Safari/537.36',
-        'sec-ch-ua-platform-version': '""',
-    }
+    headers = BARD_HEADERS
 
     # 3. Define the data payload from the --data-raw argument.
     # The raw data string is parsed into a dictionary, which is the
     # standard way to provide form data to the `requests` library.
  
 
-    RAWDATA = "f.req=%5Bnull%2C%22%5B%5B%5C%22"+promptText+"%5C%22%2C0%2Cnull%2Cnull%2Cnull%2Cnull%2C0%5D%2C%5B%5C%22en-GB%5C%22%5D%2C%5B%5C%22c_ebdcb1c6664b8d20%5C%22%2C%5C%22r_0a8e02235760bdcc%5C%22%2C%5C%22rc_20544167fb2fa1c6%5C%22%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2C%5C%22AwAAAAAAAAAQ4DUFz3Xz2P5_USnPlhk%5C%22%5D%2C%5C%22!OTqlOmLNAAa-BNTXngRCYhc77f6S-7A7ADQBEArZ1EKPRtNIAqiZ1tu84LgbIZsYApNN6bpszvXM530wwYMj-WWW3Kz5J_Tv_oerOBTBAgAAAH5SAAAAB2gBB34AQYxEiVnF2XdfRYXgl2c4fvrwfqB8UvPXDdoPcpc1z_-zPgN9ciqklx4xXS9ZWx3qrqBWHhm2W8KpF7gvJYMyelqymQOC0JZQadqj6CgXAkcrMaSkL8quaSVcZlQXdSwpoJjk9S0RImZGkt7Fa0kYGC3O9rRaBn1HBu4TelJvfvF633CTWdmy3ecGwnLHF65Rw-5tSIByo7R9rKJ_9MIutZbjOixjN4K-NhScSc1wdPdDbIshz5RXNRRWtbRFjSdLTw_b5ITXsQh7uZtFGtkzh1Sgt0E6sJVOIv8sTOHjlaZ1fLPTnwz8fKTw7g05UUgKXgyNJVRKEvr0x92AA7QLnYHJhY7q1lVJlyeip4oQ_NGuHzofin9O3nyzwj4xCNBJ68fovojSdRrnMoeaNklS3KYMdUx332LoZLD550SZvGghYkCRmPkav5JuaFrejLm-HQNudoimkbWR6WY2jMNEiAHBqWfmTSBMsSotCzX-quU1oiRqnybDNdKDQ4ba--4KJQ77qpBjj1YFqK5LWrmTIDOBNQcwY81IGb_JIgtE0dj3PNuZHxuFyKPlzUf70x87wDPBlIxC-MrV9PbkZYZGr_Y_d_FY4Kj6HKo2gz9lK_ETUaI151jqcsbiLMySMJyoicghac551fUEuaVRu0Xj8q50UbXXX3OtWIooEvHPJz5wpOB3F9za3792p623ewcTg-Rei29N-IRnyPmFUtlnDMaxlzjLNaEFhTWco2XrU-oJWdYVB_zh2XgX_buP3OLWb8a2cS_BWql77a9fBIds-5aGf7Eyb-hvtMolf5wdBuUnisl-TDIQz1oxdkB7UShofMkSV8NJfiIMSAYsGXu9TdsSQbTMrZGyH97PZvUY65xGFXU7SZLKHtjjTs8EogfCTKQYTHKtDox605BLPgZqPGLm4ZESYSJ2wZqDZVvGGrQWS-rk5e5clEuEw2Ui5nKXzHYGpXthROulzpe_BB5NufzfNiL7cmKc1mjxuoV6d4tA75JL_RkzoIUztMlXB1W8nScOrUgsa3g1mLvZ2ulOPFoIwZbzZHVjDYGfQTq_bcPktF7REhZdMApExq72we09J1sLSGonob-lkorwzztRjMqIGH77kRkZI6nD8C-OS2QgrlxLJtd8h45eWlvsFk3LTg8EL-Rf_PcoF1jyvopYqH3sEfBi6S5-FJ7s-00HQTzaWBsGTlTTFXhwQO5S6qq_EKohIJl818-hRac0b8XbHjUnd5SZnzuDC7RQeh7KfeBEpYmATgM-U_Bz798tFerWShjmydFSVA%5C%22%2C%5C%22517cfe4d26dd2de09eaf707174605cd7%5C%22%2Cnull%2C%5B0%5D%2C1%2Cnull%2Cnull%2C1%2C0%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2C%5B%5B6%5D%5D%2C0%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2C1%2Cnull%2Cnull%2C%5B4%5D%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2C%5B1%5D%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2C0%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2Cnull%2C%5B%5D%5D%22%5D&at=AJoiUyMApCx3L84IzB-LGRCWYdO9%3A1758466656691&"
+    RAWDATA = bard_form_raw(encode_prompt(promptText))
     data_raw=RAWDATA
     data = dict(parse_qsl(data_raw))
     # print(data)  # For debugging purposes
     try:
         # 4. Send the POST request
-        response = requests.post(url, headers=headers, data=data)
+        with time_phase('http'):
+            response = get_transport().post(url, headers=headers, data=data)
 
         # Raise an HTTPError for bad responses (4xx or 5xx)
         response.raise_for_status()
@@ -392,7 +626,8 @@ def make_curl_requestWithPrompt(promptText: str) -> dict:
         full_response = ""
          
         try:
-            parsed_json = parse_google_ai_response(response_text)
+            with time_phase('parse'):
+                parsed_json = parse_google_ai_response(response_text)
             full_response = json.dumps(parsed_json, indent=2)
             # print("Extracted JSON from response:")
             # print(full_response)    
@@ -409,17 +644,18 @@ def make_curl_requestWithPrompt(promptText: str) -> dict:
     except requests.exceptions.RequestException as e:
         print(f"An error occurred: {e}")
         traceback.print_exc()
+        AGENT_ERRORS.inc(agent='http')
 def make_curl_requestForFinancialReportAnalysis(ticker :str):
     financial_prompt = f"Analyze the financial reports of the following STOCK = {ticker}: ."
     financial_prompt += "You must output key financial metrics including revenue growth, profit margins, and any potential risks."
     financial_prompt += " The output must be in JSON format with keys 'revenue_growth_qoq', 'net_profit_margin', 'debt_to_equity', and 'potential_risks'."
     financial_prompt += " Ensure that your response is strictly in JSON format without any additional commentary or formatting."
     financialResponse = make_curl_requestWithPrompt(financial_prompt)
-    print("Financial Report Analysis Response:")
-    print(financialResponse)
+    console("Financial Report Analysis Response:")
+    console(financialResponse)
     return financialResponse
 
-def make_curl_requestForSentimentAnalysis(ticker :str):
+def make_curl_requestForSentimentAnalysis(ticker :str, news_items: list = None):
 
     sentiment_prompt = f"Analyze the sentiment of the following STOCK = {ticker}: ."
     sentiment_prompt += "You must output a sentiment score for  stock ranging from -100 (extremely negative) to +100 (extremely positive), and provide brief and crisp reasoning for this score based on the research."
@@ -434,9 +670,19 @@ def make_curl_requestForSentimentAnalysis(ticker :str):
     sentiment_prompt += " The output must be in JSON format with keys 'sentiment_score' and 'explanation'."
     sentiment_prompt += " Ensure that your response is strictly in JSON format without any additional commentary or formatting."
     # sentiment_prompt += " TEXT TO ANALYZE: " +  json.loads(deepResearchResponse)['deepAnalysisexplanation']
+    if news_items:
+        sentiment_prompt += " Base the score on these news items, duplicates already removed; 'reported N more times' counts the other outlets that carried the story. TEXT TO ANALYZE: "
+        for number, item in enumerate(news_items, 1):
+            sentiment_prompt += f" {number}. {item.get('headline') or ''}"
+            if item.get('published'):
+                sentiment_prompt += f" ({item['published']})"
+            if item.get('article'):
+                sentiment_prompt += f": {str(item['article'])[:500]}"
+            if item.get('duplicate_count'):
+                sentiment_prompt += f" [reported {item['duplicate_count']} more times]"
     sentimentResponse = make_curl_requestWithPrompt(sentiment_prompt)
-    print("Sentiment Analysis Response:")
-    print(sentimentResponse)
+    console("Sentiment Analysis Response:")
+    console(sentimentResponse)
     return sentimentResponse
 
 
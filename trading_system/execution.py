@@ -1,6 +1,8 @@
 import math
 from typing import Dict
 
+from trading_system.instrumentation import console
+
 def calculate_volatility_scalar(
     daily_cash_volatility_target: float,
     instrument_value_volatility: float
@@ -47,7 +49,7 @@ def run_phase3_execution(
     """
     Runs the full Phase 3 execution and position sizing logic.
     """
-    print("\n--- Phase 3: Execution and Position Sizing ---")
+    console("\n--- Phase 3: Execution and Position Sizing ---")
 
     # 2.4 Risk Profiling and Volatility Targeting
     daily_risk_target = (total_capital * annual_risk_target) / 16 # Carver's sqrt of time rule
@@ -65,10 +67,10 @@ def run_phase3_execution(
     # 3.4 Execution Decision
     decision = get_execution_decision(target_position, current_position)
 
-    print(f"Daily Risk Target: ${daily_risk_target:,.2f}")
-    print(f"Instrument Value Volatility: ${instrument_value_volatility:,.2f}")
-    print(f"Volatility Scalar: {volatility_scalar:.4f}")
-    print(f"Target Position (unrounded): {target_position:.4f}")
-    print(f"Execution Decision: {decision}")
+    console(f"Daily Risk Target: ${daily_risk_target:,.2f}")
+    console(f"Instrument Value Volatility: ${instrument_value_volatility:,.2f}")
+    console(f"Volatility Scalar: {volatility_scalar:.4f}")
+    console(f"Target Position (unrounded): {target_position:.4f}")
+    console(f"Execution Decision: {decision}")
 
     return round(target_position)
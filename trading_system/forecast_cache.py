@@ -0,0 +1,179 @@
+import os
+import json
+import glob
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+class ForecastCache:
+    """
+    Indexed store of the forecasting agent's results, one row per (ticker, date).
+
+    Replaces the per-day `{ticker}_{date}_analysis.json` / `_matrix.json` files with a
+    single SQLite database in WAL mode, so several processes can read and write it at
+    once. `prefetch` loads every forecast a backtest needs in one query; `release`
+    drops them again when the backtest is done, and at most `max_prefetched` are kept
+    (least recently used go first), so long sweeps do not pile them up.
+    """
+    def __init__(self, path: str = os.path.join("forecast_cache", "forecasts.sqlite3"), max_prefetched: int = 100000):
+        self.path = path
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self.max_prefetched = max_prefetched
+        self._prefetched: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._prefetched_lock = threading.Lock()
+
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS forecasts ("
+            " ticker TEXT NOT NULL,"
+            " date TEXT NOT NULL,"
+            " analysis TEXT,"
+            " metrics TEXT,"
+            " PRIMARY KEY (ticker, date)"
+            ") WITHOUT ROWID"
+        )
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread and process: sqlite connections must not be shared
+        # across threads or survive a fork.
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get_analysis(self, ticker: str, date_str: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the cached forecast for `ticker` on `date_str`, or None on a miss.
+        """
+        key = (ticker, date_str)
+        with self._prefetched_lock:
+            forecast = self._prefetched.get(key)
+            if forecast is not None:
+                self._prefetched.move_to_end(key)
+                return forecast
+        row = self._connection().execute(
+            "SELECT analysis FROM forecasts WHERE ticker = ? AND date = ? AND analysis IS NOT NULL", key
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def prefetch(self, keys: Iterable[Tuple[str, str]]) -> int:
+        """
+        Loads the cached forecasts for all (ticker, date) keys into memory with a single
+        query, so the lookups during a backtest do not touch the database. Returns the
+        number of hits.
+        """
+        keys = [list(key) for key in keys]
+        if not keys:
+            return 0
+        rows = self._connection().execute(
+            "SELECT f.ticker, f.date, f.analysis FROM forecasts f"
+            " JOIN json_each(?) k"
+            " ON f.ticker = json_extract(k.value, '$[0]') AND f.date = json_extract(k.value, '$[1]')"
+            " WHERE f.analysis IS NOT NULL",
+            (json.dumps(keys),)
+        ).fetchall()
+        with self._prefetched_lock:
+            for ticker, date_str, analysis in rows:
+                self._prefetched[(ticker, date_str)] = json.loads(analysis)
+                self._prefetched.move_to_end((ticker, date_str))
+            while len(self._prefetched) > self.max_prefetched:
+                self._prefetched.popitem(last=False)
+        return len(rows)
+
+    def release(self, keys: Iterable[Tuple[str, str]]):
+        """
+        Drops prefetched forecasts once the backtest that prefetched them is done.
+        """
+        with self._prefetched_lock:
+            for key in keys:
+                self._prefetched.pop(tuple(key), None)
+
+    def put_analysis(self, ticker: str, date_str: str, forecast: Dict[str, Any]):
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT INTO forecasts (ticker, date, analysis) VALUES (?, ?, ?)"
+                " ON CONFLICT (ticker, date) DO UPDATE SET analysis = excluded.analysis",
+                (ticker, date_str, json.dumps(forecast))
+            )
+        with self._prefetched_lock:
+            if (ticker, date_str) in self._prefetched:
+                self._prefetched[(ticker, date_str)] = forecast
+
+    def put_metrics(self, ticker: str, date_str: str, metrics_json: str):
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT INTO forecasts (ticker, date, metrics) VALUES (?, ?, ?)"
+                " ON CONFLICT (ticker, date) DO UPDATE SET metrics = excluded.metrics",
+                (ticker, date_str, metrics_json)
+            )
+
+    def get_metrics(self, ticker: str, date_str: str) -> Optional[str]:
+        row = self._connection().execute(
+            "SELECT metrics FROM forecasts WHERE ticker = ? AND date = ?", (ticker, date_str)
+        ).fetchone()
+        return row[0] if row else None
+
+    def migrate_json_cache(self, cache_dir: str = "forecast_cache", remove_files: bool = False) -> int:
+        """
+        Imports the legacy `{ticker}_{date}_analysis.json` and `{ticker}_{date}_matrix.json`
+        files from `cache_dir` in one transaction. Returns the number of files imported.
+        """
+        imported = []
+        conn = self._connection()
+        with conn:
+            for file_path in sorted(glob.glob(os.path.join(cache_dir, "*_analysis.json")) +
+                                    glob.glob(os.path.join(cache_dir, "*_matrix.json"))):
+                ticker, date_str, kind = os.path.basename(file_path)[:-len(".json")].rsplit('_', 2)
+                try:
+                    with open(file_path, 'r') as f:
+                        content = json.load(f)
+                except (OSError, json.JSONDecodeError) as e:
+                    print(f"Skipping unreadable cache file {file_path}: {e}")
+                    continue
+
+                if kind == "analysis":
+                    conn.execute(
+                        "INSERT INTO forecasts (ticker, date, analysis) VALUES (?, ?, ?)"
+                        " ON CONFLICT (ticker, date) DO UPDATE SET analysis = excluded.analysis",
+                        (ticker, date_str, json.dumps(content))
+                    )
+                else:
+                    # The matrix files hold the metrics JSON string itself
+                    conn.execute(
+                        "INSERT INTO forecasts (ticker, date, metrics) VALUES (?, ?, ?)"
+                        " ON CONFLICT (ticker, date) DO UPDATE SET metrics = excluded.metrics",
+                        (ticker, date_str, content if isinstance(content, str) else json.dumps(content))
+                    )
+                imported.append(file_path)
+
+        if remove_files:
+            for file_path in imported:
+                os.remove(file_path)
+        return len(imported)
+
+_default_cache = None
+
+def get_forecast_cache() -> ForecastCache:
+    """
+    Returns the process-wide forecast cache.
+    """
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ForecastCache()
+    return _default_cache
+
+if __name__ == "__main__":
+    # One-shot migration of the legacy per-day JSON cache
+    count = get_forecast_cache().migrate_json_cache()
+    print(f"Imported {count} cache files into {get_forecast_cache().path}")
@@ -0,0 +1,96 @@
+import os
+import math
+from typing import Any, Callable, Dict
+
+# A forecaster takes (ticker, technical_metrics, date_str), the arguments of
+# `stock_forecasting_agent`, and returns the same dict: P_up, P_down, P_side, trend
+# and reasoning.
+Forecaster = Callable[[str, Dict[Any, Any], str], Dict[str, Any]]
+
+AGENT = "agent"
+TRENDS = ('uptrend', 'downtrend', 'sideways')
+
+def _metric(technical_metrics: Dict[Any, Any], prefix: str, default: float = None) -> float:
+    """
+    Looks a Phase-1 value up by column name prefix (e.g. 'RSI_' or 'SMA_'), so the
+    lookback suffixes do not have to be known. Accepts tuple or string keys.
+    """
+    for key, value in technical_metrics.items():
+        name = key[0] if isinstance(key, tuple) else str(key).strip("('")
+        if name.startswith(prefix):
+            return float(value)
+    return default
+
+def rule_based_forecaster(ticker: str, technical_metrics: Dict[Any, Any], date_str: str) -> Dict[str, Any]:
+    """
+    Fast in-process forecaster over the Phase-1 metrics: trend strength is the distance
+    to the SMA in units of the simplified ATR, confirmed by RSI momentum and a 20-day
+    breakout, and turned into P_up/P_down/P_side with a softmax that favours
+    'sideways' when the signals are weak.
+    """
+    distance = _metric(technical_metrics, 'Distance_to_SMA_', 0.0)
+    atr = _metric(technical_metrics, 'Simplified_ATR_', 0.0)
+    rsi = _metric(technical_metrics, 'RSI_', 50.0)
+    close = _metric(technical_metrics, 'Close')
+    high = _metric(technical_metrics, 'High_')
+    low = _metric(technical_metrics, 'Low_')
+
+    trend_strength = math.tanh(distance / atr / 2) if atr > 0 else 0.0
+    momentum = (rsi - 50.0) / 50.0
+    breakout = 0.0
+    if close is not None and high is not None and close >= high:
+        breakout = 1.0
+    elif close is not None and low is not None and close <= low:
+        breakout = -1.0
+
+    score = 0.5 * trend_strength + 0.3 * momentum + 0.2 * breakout
+    weights = (math.exp(3 * score), math.exp(-3 * score), math.exp(0.6))
+    total = sum(weights)
+    P_up, P_down, P_side = (round(weight / total, 3) for weight in weights)
+    trend = TRENDS[(P_up, P_down, P_side).index(max(P_up, P_down, P_side))]
+
+    return {
+        'P_up': P_up,
+        'P_down': P_down,
+        'P_side': P_side,
+        'trend': trend,
+        'reasoning': (f"Rule-based: SMA distance {distance:.2f}% ({trend_strength:+.2f} ATR-scaled), "
+                      f"RSI {rsi:.1f}, breakout {breakout:+.0f}, score {score:+.2f}"),
+    }
+
+def _agent_forecaster(ticker: str, technical_metrics: Dict[Any, Any], date_str: str) -> Dict[str, Any]:
+    from trading_system.agents import stock_forecasting_agent
+    return stock_forecasting_agent(ticker, technical_metrics, date_str)
+
+FORECASTERS: Dict[str, Forecaster] = {
+    AGENT: _agent_forecaster,
+    "rules": rule_based_forecaster,
+}
+
+def register_forecaster(name: str, forecaster: Forecaster):
+    """
+    Makes `forecaster` selectable by name in the scanner and backtester.
+    """
+    FORECASTERS[name] = forecaster
+
+def default_forecaster_name() -> str:
+    """
+    The forecaster used when none is named: TRADING_FORECASTER, or the LLM agent.
+    """
+    return os.getenv("TRADING_FORECASTER", AGENT)
+
+def resolve_forecaster_name(name: str = None) -> str:
+    name = name or default_forecaster_name()
+    if name not in FORECASTERS:
+        raise ValueError(f"Unknown forecaster '{name}'. Available: {', '.join(sorted(FORECASTERS))}")
+    return name
+
+def is_agent(name: str = None) -> bool:
+    """
+    True if `name` selects the LLM agent, whose calls are cached, rate limited and
+    batched; local forecasters are simply called.
+    """
+    return resolve_forecaster_name(name) == AGENT
+
+def get_forecaster(name: str = None) -> Forecaster:
+    return FORECASTERS[resolve_forecaster_name(name)]
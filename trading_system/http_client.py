@@ -0,0 +1,110 @@
+import os
+import time
+import random
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from typing import Dict
+
+from trading_system.instrumentation import get_metrics
+
+# Responses worth retrying: rate limiting and transient server errors
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class PooledTransport:
+    """
+    Shared HTTP transport for all agent calls: one keep-alive `requests.Session` with a
+    bounded connection pool per host, default timeouts, and retries with jittered
+    exponential backoff on connection errors, timeouts and RETRY_STATUS_CODES.
+    Requests, retries and failures are counted in `stats`.
+    """
+    def __init__(
+        self,
+        max_connections_per_host: int = 4,
+        timeout: tuple = (10, 120), # (connect, read) seconds
+        max_retries: int = 4,
+        backoff_base: float = 1.0,
+        backoff_cap: float = 30.0
+    ):
+        self.max_connections_per_host = max_connections_per_host
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.stats: Dict[str, int] = {'requests': 0, 'retries': 0, 'failures': 0}
+        self._lock = threading.Lock()
+        self._session = None
+        self._pid = None
+
+    @property
+    def session(self) -> requests.Session:
+        # Pooled connections must not be shared with forked worker processes
+        if self._session is None or self._pid != os.getpid():
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=8,
+                pool_maxsize=self.max_connections_per_host,
+                pool_block=True,
+                max_retries=0
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self._session = session
+            self._pid = os.getpid()
+        return self._session
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _backoff(self, attempt: int, retry_after: str = None):
+        delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, min(self.backoff_cap, float(retry_after)))
+        time.sleep(delay)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """
+        `requests.post` through the pooled session, retried on transient errors. Returns
+        the last response (the caller still calls `raise_for_status`) or raises the last
+        connection error.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        self._count('requests')
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.post(url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt == self.max_retries:
+                    self._count('failures')
+                    raise
+                self._count('retries')
+                self._backoff(attempt)
+                continue
+
+            if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                retry_after = response.headers.get('Retry-After')
+                response.close()
+                self._count('retries')
+                self._backoff(attempt, retry_after)
+                continue
+
+            if response.status_code >= 400:
+                self._count('failures')
+            return response
+
+_transport = None
+
+def get_transport() -> PooledTransport:
+    """
+    Returns the transport shared by every agent call in this process.
+    """
+    global _transport
+    if _transport is None:
+        _transport = PooledTransport()
+    return _transport
+
+get_metrics().collector(
+    "http_transport_total", "counter", "Agent HTTP requests, retries and failed requests of the shared transport.",
+    ("event",), lambda: {(event,): count for event, count in (_transport.stats.items() if _transport else ())}
+)
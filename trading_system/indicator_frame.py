@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, Iterable, Sequence
+
+class IndicatorFrame:
+    """
+    Compact container for the Phase-1 parameter frame.
+
+    Holds one contiguous float64 array per feature (a (n_features, n_rows) array) with a
+    fixed schema given by the DataFrame's column tuples, e.g. ('Close', ticker) or
+    ('RSI_14', ''). Rows are read through O(1) `IndicatorRow` views instead of building
+    a dict from a MultiIndex row. Boolean columns are stored as 0/1 and restored on
+    conversion.
+    """
+    __slots__ = ('columns', 'index', 'values', 'bool_columns', '_positions')
+
+    def __init__(self, columns: Sequence[tuple], index: pd.DatetimeIndex, values: np.ndarray, bool_columns: Iterable[tuple] = ()):
+        self.columns = tuple(columns)
+        self.index = index
+        self.values = np.ascontiguousarray(values, dtype=np.float64)
+        self.bool_columns = frozenset(bool_columns)
+        self._positions = {column: position for position, column in enumerate(self.columns)}
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> "IndicatorFrame":
+        """
+        Builds the container from the output of `calculate_systematic_parameters`.
+        """
+        bool_columns = [column for column, dtype in df.dtypes.items() if dtype == bool]
+        values = np.empty((len(df.columns), len(df)), dtype=np.float64)
+        for position, column in enumerate(df.columns):
+            values[position] = df[column].to_numpy(dtype=np.float64)
+        return cls(list(df.columns), df.index, values, bool_columns)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        Converts back to the tuple-column DataFrame shape used by existing callers.
+        """
+        data = {
+            column: (self.values[position] != 0) if column in self.bool_columns else self.values[position]
+            for position, column in enumerate(self.columns)
+        }
+        df = pd.DataFrame(data, index=self.index)
+        df.columns = pd.MultiIndex.from_tuples(self.columns)
+        return df
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    @property
+    def empty(self) -> bool:
+        return len(self.index) == 0
+
+    def column(self, column: tuple) -> np.ndarray:
+        """
+        Returns the contiguous array of one feature (a view, not a copy).
+        """
+        return self.values[self._positions[column]]
+
+    def row(self, i: int) -> "IndicatorRow":
+        if i < 0:
+            i += len(self.index)
+        if not 0 <= i < len(self.index):
+            raise IndexError(f"Row {i} out of range for {len(self.index)} rows")
+        return IndicatorRow(self, i)
+
+    def position_as_of(self, as_of_date) -> int:
+        """
+        Returns the position of the last row strictly before `as_of_date` (the previous
+        close), or -1 if there is none.
+        """
+        return int(self.index.searchsorted(pd.Timestamp(as_of_date), side='left')) - 1
+
+class IndicatorRow:
+    """
+    View of one row of an `IndicatorFrame`, indexed by the same column tuples.
+    """
+    __slots__ = ('frame', 'i')
+
+    def __init__(self, frame: IndicatorFrame, i: int):
+        self.frame = frame
+        self.i = i
+
+    @property
+    def date(self) -> pd.Timestamp:
+        return self.frame.index[self.i]
+
+    def __getitem__(self, column: tuple) -> Any:
+        value = float(self.frame.values[self.frame._positions[column], self.i])
+        return value != 0 if column in self.frame.bool_columns else value
+
+    def __contains__(self, column: tuple) -> bool:
+        return column in self.frame._positions
+
+    def get(self, column: tuple, default: Any = None) -> Any:
+        return self[column] if column in self.frame._positions else default
+
+    def to_dict(self) -> Dict[tuple, Any]:
+        """
+        Same keys and values as `params_df.iloc[i].to_dict()`, e.g. for the agent prompt.
+        """
+        return {column: self[column] for column in self.frame.columns}
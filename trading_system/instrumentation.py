@@ -0,0 +1,309 @@
+import os
+import time
+import bisect
+import threading
+from contextlib import ContextDecorator, contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from trading_system import tracing
+
+# Latency buckets in seconds, from in-process phases to slow agent calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+METRIC_PREFIX = "trading_"
+
+Labels = Tuple[str, ...]
+
+_quiet = os.getenv("TRADING_QUIET", "").lower() in ("1", "true", "yes")
+
+def set_quiet(quiet: bool = True):
+    """
+    Silences (or restores) the per-ticker console output of the hot paths: Phases 2-4,
+    the agents and the HTTP calls. Also set by TRADING_QUIET=1.
+    """
+    global _quiet
+    _quiet = quiet
+
+def is_quiet() -> bool:
+    return _quiet
+
+def console(*args, **kwargs):
+    """
+    `print` for hot paths, skipped when quiet (see `set_quiet`).
+    """
+    if not _quiet:
+        print(*args, **kwargs)
+
+def _format_labels(names: Labels, values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{str(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """
+    Monotonic count per label set, e.g. agent errors by agent.
+    """
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, label_names: Labels = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value: float = 1, **labels):
+        key = tuple(labels.get(name, "") for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(tuple(labels.get(name, "") for name in self.label_names), 0)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in sorted(values.items())]
+
+class Histogram:
+    """
+    Latency distribution per label set in fixed buckets: an observation is one bisect
+    and three additions under a lock, so it can sit on per-bar paths.
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, label_names: Labels = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [counts per bucket (+Inf last), sum, count]
+        self._values: Dict[Labels, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(name, "") for name in self.label_names)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """
+        Observes the wall time of the `with` block, also when it raises.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def totals(self) -> Dict[Labels, Tuple[float, int]]:
+        """
+        (sum of observations, count) per label set.
+        """
+        with self._lock:
+            return {key: (state[1], state[2]) for key, state in self._values.items()}
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = {key: ([*state[0]], state[1], state[2]) for key, state in self._values.items()}
+        lines = []
+        for key, (counts, total, count) in sorted(values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                bucket_label = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, bucket_label)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {count}")
+        return lines
+
+class _Collected:
+    """
+    Metric read from existing stats at export time, e.g. the HTTP transport's counts,
+    so recording them costs nothing extra.
+    """
+    def __init__(self, name: str, kind: str, help_text: str, label_names: Labels, collect: Callable[[], Dict[Labels, float]]):
+        self.name = name
+        self.kind = kind
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.collect = collect
+
+    def reset(self):
+        pass
+
+    def render(self) -> List[str]:
+        try:
+            values = self.collect()
+        except Exception as e:
+            return [f"# {self.name} unavailable: {type(e).__name__}"]
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in sorted(values.items())]
+
+class MetricsRegistry:
+    """
+    Process-wide set of named counters, histograms and collected metrics, exportable
+    in the Prometheus text format (see `render`, `export_metrics` and `serve_metrics`).
+    Declaring a metric that already exists returns the existing one.
+    """
+    def __init__(self, prefix: str = METRIC_PREFIX):
+        self.prefix = prefix
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, name: str, factory: Callable[[str], object]):
+        full_name = self.prefix + name
+        with self._lock:
+            if full_name not in self._metrics:
+                self._metrics[full_name] = factory(full_name)
+            return self._metrics[full_name]
+
+    def counter(self, name: str, help_text: str, label_names: Labels = ()) -> Counter:
+        return self._register(name, lambda full_name: Counter(full_name, help_text, label_names))
+
+    def histogram(self, name: str, help_text: str, label_names: Labels = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(name, lambda full_name: Histogram(full_name, help_text, label_names, buckets))
+
+    def collector(self, name: str, kind: str, help_text: str, label_names: Labels, collect: Callable[[], Dict[Labels, float]]):
+        """
+        Registers a metric whose values `collect()` returns at export time, as a dict of
+        label values -> value.
+        """
+        return self._register(name, lambda full_name: _Collected(full_name, kind, help_text, label_names, collect))
+
+    def reset(self):
+        """
+        Clears the recorded values, e.g. in a forked worker that inherited the parent's.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.reset()
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        lines = []
+        for name, metric in metrics:
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+_registry = MetricsRegistry()
+
+def get_metrics() -> MetricsRegistry:
+    """
+    Returns the metrics registry of this process.
+    """
+    return _registry
+
+# Instruments shared by the pipeline modules
+PHASE_SECONDS = _registry.histogram(
+    "phase_seconds",
+    "Wall time of each pipeline phase: indicators, forecast, sizing, risk, learning_store, rate_limit_wait, http, parse, news_dedup.",
+    ("phase",)
+)
+AGENT_ERRORS = _registry.counter("agent_errors_total", "Agent calls that failed and were answered with a fallback.", ("agent",))
+SIGNALS = _registry.counter("signals_total", "Phase 2-4 results by direction of the target position.", ("direction",))
+
+class time_phase(ContextDecorator):
+    """
+    `with time_phase('indicators'): ...` (or `@time_phase('indicators')`) records the
+    block in PHASE_SECONDS and, when tracing is on, as a span (see `tracing`).
+    """
+    def __init__(self, phase: str):
+        self.phase = phase
+
+    def _recreate_cm(self):
+        # A fresh timer per decorated call, so concurrent calls do not share state
+        return time_phase(self.phase)
+
+    def __enter__(self):
+        self._span = tracing.span(self.phase, "phase")
+        self._span.__enter__()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        PHASE_SECONDS.observe(time.perf_counter() - self._start, phase=self.phase)
+        self._span.__exit__(*exc)
+        return False
+
+def format_phase_summary() -> str:
+    """
+    One line per phase: calls, total and mean seconds, slowest phase first.
+    """
+    totals = sorted(PHASE_SECONDS.totals().items(), key=lambda item: -item[1][0])
+    return "\n".join(
+        f"{key[0]}: {count} calls, {total:.3f}s total, {total / count * 1000:.2f}ms mean"
+        for key, (total, count) in totals if count
+    )
+
+def export_metrics(path: str = None, per_process: bool = False) -> str:
+    """
+    Writes the registry in the Prometheus text format to `path` (default:
+    TRADING_METRICS_FILE; nothing is written if neither is set), e.g. for the
+    node_exporter textfile collector. With `per_process`, the pid is added to the file
+    name so pool workers do not overwrite each other. Returns the path written.
+    """
+    path = path or os.getenv("TRADING_METRICS_FILE")
+    if not path:
+        return None
+    if per_process:
+        root, extension = os.path.splitext(path)
+        path = f"{root}.{os.getpid()}{extension}"
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, 'w') as f:
+        f.write(_registry.render())
+    os.replace(temporary_path, path)
+    return path
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = _registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def serve_metrics(port: int = None, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """
+    Serves the registry at http://host:port/metrics from a daemon thread (port default:
+    TRADING_METRICS_PORT). Returns the server; call `shutdown()` to stop it.
+    """
+    port = int(port if port is not None else os.getenv("TRADING_METRICS_PORT", 9464))
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
@@ -0,0 +1,159 @@
+import os
+import glob
+import gzip
+import json
+import queue
+import atexit
+import threading
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterator, List
+
+import numpy as np
+
+def _json_default(value: Any):
+    # numpy scalars and timestamps in the Phase 2-4 results
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+class LearningStore:
+    """
+    Append-only store of the Phase 2-4 results for learning and auditing. Records are
+    one JSON line each in a gzip file (`learnings.jsonl.gz`). `store_learning` only
+    enqueues the record; a background thread writes them in batches of up to
+    `batch_size`, or what arrived within `flush_interval` seconds.
+
+    Each batch is compressed in memory and appended as its own gzip member with a
+    single write, so several processes can share the file. After a hard crash, at most
+    the last, partly written batch is lost; `read_learnings` stops before it. Buffered
+    records are written on `flush`, `close` and at interpreter exit.
+    """
+    def __init__(self, storage_path: str = "learnings", file_name: str = "learnings.jsonl.gz", batch_size: int = 256, flush_interval: float = 1.0):
+        self.storage_path = storage_path
+        # Absolute, so a later change of working directory does not move the file
+        self.path = os.path.abspath(os.path.join(storage_path, file_name))
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.records_written = 0
+        self.batches_written = 0
+        self._pid = os.getpid()
+        os.makedirs(self.storage_path, exist_ok=True)
+        self._queue: "queue.Queue" = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._writer, name="learning-store", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def store_learning(self, ticker: str, date: datetime, result_data: Dict):
+        if self._closed:
+            raise RuntimeError("LearningStore is closed")
+        record = dict(result_data)
+        record.setdefault('ticker', ticker)
+        record.setdefault('date', date.strftime('%Y-%m-%d'))
+        self._queue.put(record)
+
+    def _writer(self):
+        while True:
+            record = self._queue.get()
+            batch = [record]
+            # Gather more records until the batch is full or the stream goes quiet
+            while record is not None and len(batch) < self.batch_size:
+                try:
+                    record = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    break
+                batch.append(record)
+            records = [item for item in batch if item is not None]
+            try:
+                if records:
+                    self._write_batch(records)
+            except Exception as e:
+                print(f"LearningStore: could not write {len(records)} records to {self.path}: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if batch[-1] is None:
+                return
+
+    def _write_batch(self, records: List[Dict[str, Any]]):
+        lines = "".join(json.dumps(record, default=_json_default) + "\n" for record in records)
+        member = gzip.compress(lines.encode('utf-8'))
+        # One O_APPEND write per batch keeps concurrent writers from interleaving members
+        fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            os.write(fd, member)
+        finally:
+            os.close(fd)
+        self.records_written += len(records)
+        self.batches_written += 1
+
+    def flush(self):
+        """
+        Blocks until every record stored so far is written.
+        """
+        self._queue.join()
+
+    def close(self):
+        """
+        Writes the remaining records and stops the writer thread.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_learning_store() -> LearningStore:
+    """
+    Returns the store shared by this process. A forked worker gets its own, since the
+    parent's writer thread does not survive the fork.
+    """
+    global _store
+    with _store_lock:
+        if _store is None or _store._pid != os.getpid():
+            _store = LearningStore(storage_path=os.getenv("LEARNING_STORE_PATH", "learnings"))
+        return _store
+
+def reset_learning_store():
+    """
+    Closes this process's store, writing what it buffered; the next `get_learning_store`
+    opens a new one, e.g. after LEARNING_STORE_PATH or the working directory changed.
+    """
+    global _store
+    with _store_lock:
+        previous, _store = _store, None
+    if previous is not None and previous._pid == os.getpid():
+        previous.close()
+
+def read_learnings(path: str = None, include_legacy: bool = True) -> Iterator[Dict[str, Any]]:
+    """
+    Streams the stored records one at a time, without loading the file; `path`
+    defaults to the store under LEARNING_STORE_PATH. A batch cut short by a crash ends
+    the stream instead of raising. With `include_legacy`, the per-day
+    `*_analysis.json` files of the old store in the same folder follow.
+    """
+    if path is None:
+        path = os.path.join(os.getenv("LEARNING_STORE_PATH", "learnings"), "learnings.jsonl.gz")
+    if os.path.exists(path):
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        return # Torn last line of a truncated batch
+        except (EOFError, gzip.BadGzipFile, zlib.error):
+            pass
+
+    if include_legacy:
+        for file_path in sorted(glob.glob(os.path.join(os.path.dirname(path) or ".", "*_analysis.json"))):
+            try:
+                with open(file_path) as f:
+                    yield json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Skipping unreadable learning file {file_path}: {e}")
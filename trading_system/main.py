@@ -1,4 +1,3 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
 import math
@@ -15,19 +14,27 @@ from trading_system.agents import (
 )
 from trading_system.execution import run_phase3_execution
 from trading_system.risk_management import run_phase4_risk_management
+from trading_system.price_store import download_prices
+from trading_system.indicator_frame import IndicatorFrame, IndicatorRow
+from trading_system.learning_store import LearningStore, get_learning_store
+from trading_system.forecasters import get_forecaster, is_agent
+from trading_system.instrumentation import SIGNALS, console, time_phase
 
+@time_phase('indicators')
 def calculate_systematic_parameters(
     ticker: str,
     data: pd.DataFrame = None,
     lookback_L: int = 20,
-    rsi_L: int = 14
+    rsi_L: int = 14,
+    ewma_span: int = 36
 ) -> pd.DataFrame:
     """
     Calculates essential systematic and technical parameters for a given stock.
-    If a DataFrame is provided, it uses it; otherwise, it downloads the data.
+    If a DataFrame is provided, it uses it; otherwise, it reads a year of data through
+    the local price store (see `price_store`).
     """
     if data is None:
-        df = yf.download(ticker, period="1y", progress=False, auto_adjust=True)
+        df = download_prices(ticker, period="1y")
     else:
         df = data.copy()
 
@@ -55,7 +62,6 @@ def calculate_systematic_parameters(
     df[(f'Simplified_ATR_{lookback_L}_pct', '')] = df[log_returns_col].rolling(window=lookback_L).std() * 100
     df[('Breakout_Threshold_pct', '')] = df[(f'Simplified_ATR_{lookback_L}_pct', '')].apply(lambda x: max(1.0, 0.5 * x))
 
-    ewma_span = 36
     df[(f'EWMA_Volatility_{ewma_span}_pct', '')] = df[log_returns_col].ewm(span=ewma_span, adjust=False).std() * 100
     df[(f'EWMA_Volatility_{ewma_span}_annualized_pct', '')] = df[(f'EWMA_Volatility_{ewma_span}_pct', '')] * math.sqrt(256)
 
@@ -70,67 +76,110 @@ def calculate_systematic_parameters(
 
     return df.dropna()
 
-class LearningStore:
-    def __init__(self, storage_path="learnings"):
-        self.storage_path = storage_path
-        os.makedirs(self.storage_path, exist_ok=True)
+def parameters_as_of(params_df: pd.DataFrame, as_of_date) -> pd.DataFrame:
+    """
+    Returns the rows of a precomputed Phase-1 frame strictly before `as_of_date`.
+    The last row is the previous close, so a simulated day never sees its own bar.
+    """
+    end = params_df.index.searchsorted(pd.Timestamp(as_of_date), side='left')
+    return params_df.iloc[:end]
 
-    def store_learning(self, ticker: str, date: datetime, result_data: Dict):
-        file_path = f"{self.storage_path}/{ticker}_{date.strftime('%Y%m%d')}_analysis.json"
-        with open(file_path, 'w') as f:
-            json.dump(result_data, f, indent=4)
+def ewma_volatility_column(columns) -> tuple:
+    """
+    The daily EWMA volatility column among Phase-1 `columns`, whatever its span.
+    """
+    return next(
+        column for column in columns
+        if column[0].startswith('EWMA_Volatility_') and column[0].endswith('_pct') and 'annualized' not in column[0]
+    )
 
-def run_system_for_ticker(ticker: str, data: pd.DataFrame = None, date_str: str = None) -> Dict[str, Any]:
+def run_system_for_ticker(
+    ticker: str,
+    data: pd.DataFrame = None,
+    date_str: str = None,
+    params_df: pd.DataFrame = None,
+    agent_forecast: Dict[str, Any] = None,
+    forecaster: str = None
+) -> Dict[str, Any]:
     """
     Runs the full trading system for a single ticker and returns the results.
-    Can take a pre-fetched DataFrame for backtesting.
+    Can take a pre-fetched DataFrame for backtesting, or an already computed
+    Phase-1 frame (see `parameters_as_of`), in which case Phase 1 is skipped.
+    An `agent_forecast` obtained elsewhere (e.g. from a concurrent batch) skips
+    the call to the forecasting agent; `forecaster` names the forecaster to call
+    otherwise (see `forecasters`).
     """
     # Phase 1
-    params_df = calculate_systematic_parameters(ticker, data=data)
+    if params_df is None:
+        params_df = calculate_systematic_parameters(ticker, data=data)
     if params_df.empty:
         return None
 
-    # Phase 2
-    last_day_metrics = params_df.iloc[-1].to_dict()
+    # Only the last row is needed by Phases 2-4
+    last_day = IndicatorFrame.from_dataframe(params_df.iloc[-1:]).row(-1)
+    return run_system_for_row(ticker, last_day, date_str=date_str, agent_forecast=agent_forecast, forecaster=forecaster)
 
-    # Use provided date_str for caching, otherwise use the latest date from the data
+def run_system_for_row(
+    ticker: str,
+    last_day: IndicatorRow,
+    date_str: str = None,
+    agent_forecast: Dict[str, Any] = None,
+    forecaster: str = None
+) -> Dict[str, Any]:
+    """
+    Runs Phases 2-4 on one row of Phase-1 parameters (see `indicator_frame`) and
+    returns the results. Backtests call this directly with rows of a frame that was
+    computed once. `forecaster` selects the Phase-2 forecaster by name (default: the
+    LLM agent, or TRADING_FORECASTER).
+    """
+    # Phase 2
+    # Use provided date_str for caching, otherwise use the date of the row
     if date_str is None:
-        date_str = params_df.index[-1].strftime("%Y-%m-%d")
-
-    agent_forecast = stock_forecasting_agent(ticker, last_day_metrics, date_str)
-    print(f"[{ticker}] Agent Forecast: {agent_forecast}")
+        date_str = last_day.date.strftime("%Y-%m-%d")
+
+    if agent_forecast is None:
+        with time_phase('forecast'):
+            if is_agent(forecaster):
+                agent_forecast = stock_forecasting_agent(ticker, last_day.to_dict(), date_str)
+            else:
+                agent_forecast = get_forecaster(forecaster)(ticker, last_day.to_dict(), date_str)
+    console(f"[{ticker}] Agent Forecast: {agent_forecast}")
     
     trading_style = style_preference_agent()
 
     trend_map = {'uptrend': 10.0, 'downtrend': -10.0, 'sideways': 0.0}
-    print(f"[{ticker}] agent_forecast =============================================================  : {agent_forecast}")
+    console(f"[{ticker}] agent_forecast =============================================================  : {agent_forecast}")
     scaled_forecast = trend_map.get(agent_forecast.get('trend'), 0.0)
-    print(f"[{ticker}] Scaled Forecast: {scaled_forecast}")
+    console(f"[{ticker}] Scaled Forecast: {scaled_forecast}")
+    ewma_volatility = last_day.get(ewma_volatility_column(last_day.frame.columns))
     # Phase 3
-    target_position = run_phase3_execution(
-        forecast=scaled_forecast,
-        ewma_volatility=last_day_metrics.get((f'EWMA_Volatility_36_pct', '')),
-        instrument_price=last_day_metrics.get(('Close', ticker)),
-        total_capital=100000,
-        current_position=0
-    )
+    with time_phase('sizing'):
+        target_position = run_phase3_execution(
+            forecast=scaled_forecast,
+            ewma_volatility=ewma_volatility,
+            instrument_price=last_day.get(('Close', ticker)),
+            total_capital=100000,
+            current_position=0
+        )
 
     # Phase 4
     risk_thresholds = None
     if target_position != 0:
         direction = "long" if target_position > 0 else "short"
-        risk_thresholds = run_phase4_risk_management(
-            instrument_price=last_day_metrics.get(('Close', ticker)),
-            volatility=last_day_metrics.get((f'EWMA_Volatility_36_pct', '')),
-            direction=direction,
-            style=trading_style
-        )
+        with time_phase('risk'):
+            risk_thresholds = run_phase4_risk_management(
+                instrument_price=last_day.get(('Close', ticker)),
+                volatility=ewma_volatility,
+                direction=direction,
+                style=trading_style
+            )
+    SIGNALS.inc(direction="long" if target_position > 0 else "short" if target_position < 0 else "flat")
 
     # Consolidate results
     result = {
         'ticker': ticker,
-        'date': params_df.index[-1].strftime("%Y-%m-%d"),
-        'instrument_price': last_day_metrics.get(('Close', ticker)),
+        'date': last_day.date.strftime("%Y-%m-%d"),
+        'instrument_price': last_day.get(('Close', ticker)),
         'trend': agent_forecast.get('trend'),
         'P_up': agent_forecast.get('P_up'),
         'P_down': agent_forecast.get('P_down'),
@@ -141,7 +190,7 @@ def run_system_for_ticker(ticker: str, data: pd.DataFrame = None, date_str: str
     }
 
     # Store result for learning/auditing
-    learning_store = LearningStore()
-    learning_store.store_learning(ticker, params_df.index[-1], result)
+    with time_phase('learning_store'):
+        get_learning_store().store_learning(ticker, last_day.date, result)
 
     return result
@@ -0,0 +1,258 @@
+import os
+import re
+import sys
+import gzip
+import json
+from typing import Any, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from trading_system.agents import news_sentiment_agent
+from trading_system.instrumentation import console, get_metrics, time_phase
+
+DEFAULT_FEED_PATH = os.path.join("news", "feed.jsonl")
+
+# Near-duplicate defaults: word 3-grams hashed into 2^20 dimensions; 64 MinHash values in
+# 16 bands of 4, so pairs from about 0.5 similarity on become candidates
+NGRAM = 3
+DIMENSIONS = 1 << 20
+NUM_PERM = 64
+BANDS = 16
+THRESHOLD = 0.6
+
+_PRIME = (1 << 31) - 1
+_WORD = re.compile(r"[a-z0-9]+")
+
+NEWS_ITEMS = get_metrics().counter("news_items_total", "News items read from the feed per ticker, and the unique ones sent to sentiment scoring.", ("stage",))
+
+def _first(record: Dict[str, Any], *keys: str, default=None):
+    for key in keys:
+        if record.get(key) not in (None, ""):
+            return record[key]
+    return default
+
+def read_news_feed(path: str = None) -> List[Dict[str, Any]]:
+    """
+    Reads headline and article records from a local feed: JSON lines (optionally
+    gzipped) or one JSON array. A record needs a `ticker` (or a `tickers` list) and a
+    `headline`/`title` or `article`/`body`/`text`/`summary`; `published`/`date`,
+    `source`, `url` and `id` are kept if present. Records missing either are skipped.
+    """
+    path = path or os.getenv("NEWS_FEED_PATH", DEFAULT_FEED_PATH)
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        text = f.read()
+    stripped = text.lstrip()
+    if stripped.startswith('['):
+        records = json.loads(stripped)
+    else:
+        records = [json.loads(line) for line in text.splitlines() if line.strip()]
+
+    items, skipped = [], 0
+    for position, record in enumerate(records):
+        tickers = record.get('tickers') or ([record['ticker']] if record.get('ticker') else [])
+        headline = _first(record, 'headline', 'title', default="")
+        article = _first(record, 'article', 'body', 'text', 'summary', default="")
+        if not tickers or not (headline or article):
+            skipped += 1
+            continue
+        items.append({
+            'id': record.get('id', position),
+            'tickers': [str(ticker) for ticker in tickers],
+            'headline': headline,
+            'article': article,
+            'published': _first(record, 'published', 'date', 'datetime'),
+            'source': record.get('source'),
+            'url': record.get('url'),
+        })
+    if skipped:
+        print(f"Skipped {skipped} news records without a ticker or text in {path}")
+    return items
+
+class _DisjointSet:
+    """
+    Union-find over item positions, with path halving.
+    """
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, i: int) -> int:
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(self, i: int, j: int) -> bool:
+        root_i, root_j = self.find(i), self.find(j)
+        if root_i == root_j:
+            return False
+        # The lower position (earlier in the feed) stays the root
+        if root_j < root_i:
+            root_i, root_j = root_j, root_i
+        self.parent[root_j] = root_i
+        return True
+
+class NewsDeduplicator:
+    """
+    Groups near-duplicate news items, e.g. one story syndicated by many outlets.
+
+    Each item is embedded as a sparse binary vector of hashed word n-grams of its
+    headline and article (the sorted indices of its non-zero dimensions). MinHash
+    signatures of these vectors go into an LSH index of `bands` buckets per ticker, so
+    only items sharing a bucket are compared: a candidate pair whose exact Jaccard
+    similarity reaches `threshold` is merged with union-find. The earliest item of
+    each group represents it.
+    """
+    def __init__(
+        self,
+        threshold: float = THRESHOLD,
+        ngram: int = NGRAM,
+        dimensions: int = DIMENSIONS,
+        num_perm: int = NUM_PERM,
+        bands: int = BANDS,
+        seed: int = 1
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.ngram = ngram
+        self.dimensions = dimensions
+        self.bands = bands
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, size=(num_perm, 1), dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, size=(num_perm, 1), dtype=np.uint64)
+        self._vocabulary: Dict[str, int] = {}
+        self.comparisons = 0
+
+    def vector(self, text: str) -> np.ndarray:
+        """
+        Sorted unique hashed n-gram indices of `text` (lower-cased words).
+        """
+        words = _WORD.findall(text.lower())
+        if not words:
+            return np.zeros(0, dtype=np.uint64)
+        vocabulary = self._vocabulary
+        ids = np.fromiter((vocabulary.setdefault(word, len(vocabulary) + 1) for word in words), dtype=np.uint64, count=len(words))
+        n = min(self.ngram, len(ids))
+        hashes = np.zeros(len(ids) - n + 1, dtype=np.uint64)
+        for offset in range(n):
+            # Multiply-xorshift mix per position; uint64 arithmetic wraps
+            hashes = (hashes ^ ids[offset:len(ids) - n + 1 + offset]) * np.uint64(0x9E3779B97F4A7C15)
+            hashes ^= hashes >> np.uint64(29)
+        return np.unique(hashes % np.uint64(self.dimensions))
+
+    def signatures(self, vectors: List[np.ndarray]) -> np.ndarray:
+        """
+        (items x num_perm) MinHash signatures, from universal hashes of the indices.
+        """
+        signatures = np.full((len(vectors), len(self._a)), _PRIME, dtype=np.uint64)
+        for i, vector in enumerate(vectors):
+            if len(vector):
+                signatures[i] = ((self._a * vector + self._b) % np.uint64(_PRIME)).min(axis=1)
+        return signatures
+
+    @staticmethod
+    def similarity(a: np.ndarray, b: np.ndarray) -> float:
+        """
+        Jaccard similarity of two items' n-gram sets (binary vectors).
+        """
+        if not len(a) or not len(b):
+            return 0.0
+        shared = len(np.intersect1d(a, b, assume_unique=True))
+        return shared / (len(a) + len(b) - shared)
+
+    def deduplicate(self, items: List[Dict[str, Any]], tickers: Iterable[str] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Per ticker (default: every ticker in `items`): `unique`, the representative of
+        each group with its `duplicate_count`, earliest first; `groups`, the item ids
+        of each group; the counts of items and unique items and the `dedup_ratio`, the
+        share of items dropped as duplicates.
+        """
+        wanted = set(tickers) if tickers is not None else None
+        # Earliest first, so each group's root is its first publication
+        order = sorted(range(len(items)), key=lambda i: (str(items[i].get('published') or ""), i))
+        items = [items[i] for i in order]
+        vectors = [self.vector(f"{item.get('headline') or ''} {item.get('article') or ''}") for item in items]
+        signatures = self.signatures(vectors)
+        rows = signatures.shape[1] // self.bands
+
+        by_ticker: Dict[str, List[int]] = {}
+        for position, item in enumerate(items):
+            for ticker in item['tickers']:
+                if wanted is None or ticker in wanted:
+                    by_ticker.setdefault(ticker, []).append(position)
+
+        groups = _DisjointSet(len(items))
+        for ticker, positions in by_ticker.items():
+            for band in range(self.bands):
+                buckets: Dict[bytes, List[int]] = {}
+                band_values = signatures[positions, band * rows:(band + 1) * rows]
+                for position, values in zip(positions, band_values):
+                    buckets.setdefault(values.tobytes(), []).append(position)
+                for members in buckets.values():
+                    for k, i in enumerate(members):
+                        for j in members[k + 1:]:
+                            if groups.find(i) == groups.find(j):
+                                continue
+                            self.comparisons += 1
+                            if self.similarity(vectors[i], vectors[j]) >= self.threshold:
+                                groups.union(i, j)
+
+        results = {}
+        for ticker, positions in by_ticker.items():
+            members: Dict[int, List[int]] = {}
+            for position in positions:
+                members.setdefault(groups.find(position), []).append(position)
+            unique = [dict(items[group[0]], duplicate_count=len(group) - 1) for group in members.values()]
+            results[ticker] = {
+                'unique': unique,
+                'groups': [[items[position]['id'] for position in group] for group in members.values()],
+                'items': len(positions),
+                'unique_items': len(unique),
+                'dedup_ratio': 1 - len(unique) / len(positions),
+            }
+        return results
+
+def format_dedup_report(results: Dict[str, Dict[str, Any]]) -> str:
+    """
+    One line per ticker with its items, unique items and share of duplicates, plus the total.
+    """
+    lines = [
+        f"{ticker}: {result['items']} items -> {result['unique_items']} unique ({result['dedup_ratio']:.1%} duplicates)"
+        for ticker, result in sorted(results.items(), key=lambda item: -item[1]['items'])
+    ]
+    total = sum(result['items'] for result in results.values())
+    unique = sum(result['unique_items'] for result in results.values())
+    if total:
+        lines.append(f"Total: {total} items -> {unique} unique ({1 - unique / total:.1%} duplicates)")
+    return "\n".join(lines)
+
+def score_news_sentiment(
+    feed_path: str = None,
+    tickers: Iterable[str] = None,
+    threshold: float = THRESHOLD,
+    max_items: int = 20
+) -> Dict[str, Dict[str, Any]]:
+    """
+    News ingestion ahead of the News-Sentiment Agent: reads the feed, drops near-
+    duplicates per ticker and sends each ticker's unique items (up to `max_items`,
+    earliest first) to `news_sentiment_agent`, one call per ticker. Returns the
+    deduplication results per ticker with the agent's answer under `sentiment`.
+    """
+    items = read_news_feed(feed_path)
+    with time_phase('news_dedup'):
+        results = NewsDeduplicator(threshold=threshold).deduplicate(items, tickers)
+    print(format_dedup_report(results))
+    for ticker, result in results.items():
+        NEWS_ITEMS.inc(result['items'], stage="received")
+        NEWS_ITEMS.inc(result['unique_items'], stage="unique")
+        console(f"Scoring sentiment of {ticker} on {min(result['unique_items'], max_items)} unique news items")
+        result['sentiment'] = news_sentiment_agent(ticker, result['unique'][:max_items])
+    return results
+
+if __name__ == "__main__":
+    # python -m trading_system.news [FEED] [TICKER ...]
+    score_news_sentiment(sys.argv[1] if len(sys.argv) > 1 else None, sys.argv[2:] or None)
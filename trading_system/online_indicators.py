@@ -0,0 +1,407 @@
+import math
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from trading_system.indicator_frame import IndicatorFrame, IndicatorRow
+
+# Streaming versions of the indicators in `main.calculate_systematic_parameters`.
+# Every updater takes one value (or bar) at a time in O(1), returns its current output
+# (NaN until warmed up) and can be snapshotted to a plain dict and restored from it.
+
+class EWMAVariance:
+    """
+    Exponentially weighted variance, identical to `series.ewm(span=span, adjust=False).var()`
+    (bias-corrected; a NaN decays the weights as with `ignore_na=False`).
+    """
+    def __init__(self, span: float):
+        self.span = span
+        self.alpha = 2.0 / (span + 1.0)
+        self.mean = math.nan
+        self.cov = 0.0
+        self.sum_wt = 1.0
+        self.sum_wt2 = 1.0
+        self.old_wt = 1.0
+        self.nobs = 0
+
+    def update(self, x: float) -> float:
+        is_observation = x == x
+        self.nobs += is_observation
+        if self.mean == self.mean:
+            decay = 1.0 - self.alpha
+            self.sum_wt *= decay
+            self.sum_wt2 *= decay * decay
+            self.old_wt *= decay
+            if is_observation:
+                old_mean = self.mean
+                if self.mean != x:
+                    self.mean = (self.old_wt * old_mean + self.alpha * x) / (self.old_wt + self.alpha)
+                self.cov = (self.old_wt * (self.cov + (old_mean - self.mean) * (old_mean - self.mean)) +
+                            self.alpha * ((x - self.mean) * (x - self.mean))) / (self.old_wt + self.alpha)
+                self.sum_wt += self.alpha
+                self.sum_wt2 += self.alpha * self.alpha
+                self.old_wt += self.alpha
+                # adjust=False renormalises the weights after every observation
+                self.sum_wt /= self.old_wt
+                self.sum_wt2 /= self.old_wt * self.old_wt
+                self.old_wt = 1.0
+        elif is_observation:
+            self.mean = x
+        return self.value
+
+    @property
+    def value(self) -> float:
+        if self.nobs < 1:
+            return math.nan
+        numerator = self.sum_wt * self.sum_wt
+        denominator = numerator - self.sum_wt2
+        return numerator / denominator * self.cov if denominator > 0 else math.nan
+
+    @property
+    def std(self) -> float:
+        variance = self.value
+        return math.sqrt(max(variance, 0.0)) if variance == variance else math.nan
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {'span': self.span, 'mean': self.mean, 'cov': self.cov, 'sum_wt': self.sum_wt,
+                'sum_wt2': self.sum_wt2, 'old_wt': self.old_wt, 'nobs': self.nobs}
+
+    @classmethod
+    def restore(cls, state: Dict[str, Any]) -> "EWMAVariance":
+        updater = cls(state['span'])
+        for key in ('mean', 'cov', 'sum_wt', 'sum_wt2', 'old_wt', 'nobs'):
+            setattr(updater, key, state[key])
+        return updater
+
+class _Window:
+    """
+    Last `window` values plus the number of NaNs among them; a rolling output is only
+    defined once the window is full and NaN-free (pandas' `min_periods=window`).
+    """
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque()
+        self.nan_count = 0
+
+    def push(self, x: float) -> Optional[float]:
+        """
+        Appends `x` and returns the value that fell out of the window (None if none did).
+        """
+        self.values.append(x)
+        self.nan_count += x != x
+        if len(self.values) > self.window:
+            dropped = self.values.popleft()
+            self.nan_count -= dropped != dropped
+            return dropped
+        return None
+
+    @property
+    def full(self) -> bool:
+        return len(self.values) == self.window and self.nan_count == 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {'window': self.window, 'values': list(self.values)}
+
+    def _restore_values(self, values: List[float]):
+        self.values = deque(values)
+        self.nan_count = sum(1 for v in values if v != v)
+
+class RollingStd(_Window):
+    """
+    Rolling sample standard deviation (ddof=1) kept with Welford's add/remove updates;
+    matches `series.rolling(window).std()`.
+    """
+    def __init__(self, window: int):
+        super().__init__(window)
+        self.nobs = 0
+        self.mean = 0.0
+        self.ssqdm = 0.0
+
+    def update(self, x: float) -> float:
+        dropped = self.push(x)
+        if x == x:
+            self.nobs += 1
+            delta = x - self.mean
+            self.mean += delta / self.nobs
+            self.ssqdm += (self.nobs - 1) * delta * delta / self.nobs
+        if dropped is not None and dropped == dropped:
+            self.nobs -= 1
+            if self.nobs:
+                delta = dropped - self.mean
+                self.mean -= delta / self.nobs
+                self.ssqdm -= (self.nobs + 1) * delta * delta / self.nobs
+            else:
+                self.mean = 0.0
+                self.ssqdm = 0.0
+        return self.value
+
+    @property
+    def value(self) -> float:
+        if not self.full or self.window < 2:
+            return math.nan
+        return math.sqrt(max(self.ssqdm / (self.window - 1), 0.0))
+
+    def snapshot(self) -> Dict[str, Any]:
+        return dict(super().snapshot(), nobs=self.nobs, mean=self.mean, ssqdm=self.ssqdm)
+
+    @classmethod
+    def restore(cls, state: Dict[str, Any]) -> "RollingStd":
+        updater = cls(state['window'])
+        updater._restore_values(state['values'])
+        updater.nobs, updater.mean, updater.ssqdm = state['nobs'], state['mean'], state['ssqdm']
+        return updater
+
+class RollingMean(_Window):
+    """
+    Simple moving average from a compensated (Kahan) running sum; matches
+    `series.rolling(window).mean()`.
+    """
+    def __init__(self, window: int):
+        super().__init__(window)
+        self.total = 0.0
+        self.compensation = 0.0
+
+    def _add(self, x: float):
+        y = x - self.compensation
+        t = self.total + y
+        self.compensation = (t - self.total) - y
+        self.total = t
+
+    def update(self, x: float) -> float:
+        dropped = self.push(x)
+        if x == x:
+            self._add(x)
+        if dropped is not None and dropped == dropped:
+            self._add(-dropped)
+        return self.value
+
+    @property
+    def value(self) -> float:
+        return self.total / self.window if self.full else math.nan
+
+    def snapshot(self) -> Dict[str, Any]:
+        return dict(super().snapshot(), total=self.total, compensation=self.compensation)
+
+    @classmethod
+    def restore(cls, state: Dict[str, Any]) -> "RollingMean":
+        updater = cls(state['window'])
+        updater._restore_values(state['values'])
+        updater.total, updater.compensation = state['total'], state['compensation']
+        return updater
+
+class RollingExtreme(_Window):
+    """
+    Rolling maximum (or minimum with `maximum=False`) kept in a monotonic deque of
+    (bar, value) candidates; matches `series.rolling(window).max()` / `.min()`.
+    """
+    def __init__(self, window: int, maximum: bool = True):
+        super().__init__(window)
+        self.maximum = maximum
+        self.bar = -1
+        self.candidates = deque()
+
+    def update(self, x: float) -> float:
+        self.push(x)
+        self.bar += 1
+        if x == x:
+            if self.maximum:
+                while self.candidates and self.candidates[-1][1] <= x:
+                    self.candidates.pop()
+            else:
+                while self.candidates and self.candidates[-1][1] >= x:
+                    self.candidates.pop()
+            self.candidates.append((self.bar, x))
+        while self.candidates and self.candidates[0][0] <= self.bar - self.window:
+            self.candidates.popleft()
+        return self.value
+
+    @property
+    def value(self) -> float:
+        return self.candidates[0][1] if self.full and self.candidates else math.nan
+
+    def snapshot(self) -> Dict[str, Any]:
+        return dict(super().snapshot(), maximum=self.maximum, bar=self.bar,
+                    candidates=[list(candidate) for candidate in self.candidates])
+
+    @classmethod
+    def restore(cls, state: Dict[str, Any]) -> "RollingExtreme":
+        updater = cls(state['window'], state['maximum'])
+        updater._restore_values(state['values'])
+        updater.bar = state['bar']
+        updater.candidates = deque((int(bar), value) for bar, value in state['candidates'])
+        return updater
+
+class WilderRSI:
+    """
+    Relative Strength Index with Wilder smoothing, seeded with the simple average of the
+    first `period` changes; matches `talib.RSI(close, timeperiod=period)`.
+    """
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.previous_close = math.nan
+        self.changes = 0
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+
+    def update(self, close: float) -> float:
+        if self.previous_close == self.previous_close:
+            change = close - self.previous_close
+            gain, loss = (change, 0.0) if change > 0 else (0.0, -change)
+            self.changes += 1
+            if self.changes <= self.period:
+                self.avg_gain += gain / self.period
+                self.avg_loss += loss / self.period
+            else:
+                self.avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+                self.avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+        self.previous_close = close
+        return self.value
+
+    @property
+    def value(self) -> float:
+        if self.changes < self.period:
+            return math.nan
+        total = self.avg_gain + self.avg_loss
+        return 100.0 * self.avg_gain / total if total != 0 else 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {'period': self.period, 'previous_close': self.previous_close, 'changes': self.changes,
+                'avg_gain': self.avg_gain, 'avg_loss': self.avg_loss}
+
+    @classmethod
+    def restore(cls, state: Dict[str, Any]) -> "WilderRSI":
+        updater = cls(state['period'])
+        for key in ('previous_close', 'changes', 'avg_gain', 'avg_loss'):
+            setattr(updater, key, state[key])
+        return updater
+
+class OnlineSystematicParameters:
+    """
+    Per-bar equivalent of `calculate_systematic_parameters` for one ticker.
+
+    `update` takes one daily bar and returns the Phase-1 row for it, keyed by the same
+    column tuples as the batch frame, or None while the indicators are still warming up
+    (the rows the batch version drops). `row()` exposes the latest row as an
+    `IndicatorRow`, so it can be passed straight to `run_system_for_row`.
+    """
+    HV_L = 10
+
+    def __init__(self, ticker: str, lookback_L: int = 20, rsi_L: int = 14, ewma_span: int = 36):
+        self.ticker = ticker
+        self.lookback_L = lookback_L
+        self.rsi_L = rsi_L
+        self.ewma_span = ewma_span
+        self.previous_close = math.nan
+        self.last_date = None
+        self.last_values: Optional[Dict[tuple, Any]] = None
+
+        self.hv = RollingStd(self.HV_L)
+        self.atr = RollingStd(lookback_L)
+        self.ewma = EWMAVariance(ewma_span)
+        self.sma = RollingMean(lookback_L)
+        self.high = RollingExtreme(lookback_L, maximum=True)
+        self.low = RollingExtreme(lookback_L, maximum=False)
+        self.rsi = WilderRSI(rsi_L)
+
+        L = lookback_L
+        self.columns = (
+            ('Close', ticker), ('High', ticker), ('Low', ticker), ('Open', ticker), ('Volume', ticker),
+            ('Log_Returns', ''), (f'HV_{self.HV_L}_pct', ''), (f'Simplified_ATR_{L}_pct', ''),
+            ('Breakout_Threshold_pct', ''), (f'EWMA_Volatility_{ewma_span}_pct', ''),
+            (f'EWMA_Volatility_{ewma_span}_annualized_pct', ''), (f'SMA_{L}', ''),
+            (f'Distance_to_SMA_{L}_pct', ''), (f'High_{L}', ''), (f'Low_{L}', ''),
+            (f'High_Low_Flag_{L}', ''), (f'RSI_{rsi_L}', ''),
+        )
+
+    @classmethod
+    def from_history(cls, ticker: str, data: pd.DataFrame, **kwargs) -> "OnlineSystematicParameters":
+        """
+        Warms the updaters up on a downloaded history (the frame `calculate_systematic_parameters`
+        takes) in one pass; afterwards each new bar costs O(1).
+        """
+        online = cls(ticker, **kwargs)
+        fields = [data[(field, ticker)] if (field, ticker) in data.columns else data[field]
+                  for field in ('Open', 'High', 'Low', 'Close', 'Volume')]
+        for date, open_, high, low, close, volume in zip(data.index, *(f.to_numpy(dtype=np.float64) for f in fields)):
+            online.update(date, open_, high, low, close, volume)
+        return online
+
+    def update(self, date, open_: float, high: float, low: float, close: float, volume: float) -> Optional[Dict[tuple, Any]]:
+        """
+        Consumes the next daily bar. Returns its Phase-1 values, or None while warming up.
+        """
+        open_, high, low, close, volume = float(open_), float(high), float(low), float(close), float(volume)
+        log_return = math.log(close / self.previous_close) if self.previous_close == self.previous_close else math.nan
+        self.previous_close = close
+        self.last_date = pd.Timestamp(date)
+
+        hv = self.hv.update(log_return) * math.sqrt(256) * 100
+        atr = self.atr.update(log_return) * 100
+        self.ewma.update(log_return)
+        ewma_volatility = self.ewma.std * 100
+        sma = self.sma.update(close)
+        high_L = self.high.update(high)
+        low_L = self.low.update(low)
+        rsi = self.rsi.update(close)
+
+        values = (
+            close, high, low, open_, volume, log_return, hv, atr, max(1.0, 0.5 * atr) if atr == atr else math.nan,
+            ewma_volatility, ewma_volatility * math.sqrt(256), sma, (close - sma) / sma * 100,
+            high_L, low_L, None, rsi,
+        )
+        if any(v != v for v in values if v is not None):
+            self.last_values = None
+            return None
+
+        self.last_values = dict(zip(self.columns, values))
+        self.last_values[self.columns[15]] = close == high_L or close == low_L
+        return self.last_values
+
+    def row(self) -> Optional[IndicatorRow]:
+        """
+        Returns the latest row as an `IndicatorRow`, or None while warming up.
+        """
+        if self.last_values is None:
+            return None
+        values = np.array([[float(self.last_values[column])] for column in self.columns])
+        frame = IndicatorFrame(self.columns, pd.DatetimeIndex([self.last_date]), values, bool_columns=[self.columns[15]])
+        return frame.row(0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns the full updater state as plain values (JSON- and pickle-friendly).
+        """
+        return {
+            'ticker': self.ticker,
+            'lookback_L': self.lookback_L,
+            'rsi_L': self.rsi_L,
+            'ewma_span': self.ewma_span,
+            'previous_close': self.previous_close,
+            'last_date': None if self.last_date is None else self.last_date.isoformat(),
+            'hv': self.hv.snapshot(),
+            'atr': self.atr.snapshot(),
+            'ewma': self.ewma.snapshot(),
+            'sma': self.sma.snapshot(),
+            'high': self.high.snapshot(),
+            'low': self.low.snapshot(),
+            'rsi': self.rsi.snapshot(),
+            'last_values': None if self.last_values is None else [self.last_values[column] for column in self.columns],
+        }
+
+    @classmethod
+    def restore(cls, state: Dict[str, Any]) -> "OnlineSystematicParameters":
+        online = cls(state['ticker'], lookback_L=state['lookback_L'], rsi_L=state['rsi_L'], ewma_span=state['ewma_span'])
+        online.previous_close = state['previous_close']
+        online.last_date = None if state['last_date'] is None else pd.Timestamp(state['last_date'])
+        online.hv = RollingStd.restore(state['hv'])
+        online.atr = RollingStd.restore(state['atr'])
+        online.ewma = EWMAVariance.restore(state['ewma'])
+        online.sma = RollingMean.restore(state['sma'])
+        online.high = RollingExtreme.restore(state['high'])
+        online.low = RollingExtreme.restore(state['low'])
+        online.rsi = WilderRSI.restore(state['rsi'])
+        if state['last_values'] is not None:
+            online.last_values = dict(zip(online.columns, state['last_values']))
+        return online
@@ -0,0 +1,195 @@
+from typing import Any, Dict, List, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+# Trade fields the exposure and turnover need
+HOLDING_FIELDS = ('entry_date', 'exit_date', 'size', 'entry_price', 'exit_price')
+
+def stack_curves(curves: Sequence[Sequence[float]]) -> np.ndarray:
+    """
+    Stacks equity curves of different lengths into a (curves x days) float matrix,
+    NaN-padded at the end.
+    """
+    curves = [np.asarray(curve, dtype=np.float64) for curve in curves]
+    matrix = np.full((len(curves), max((len(curve) for curve in curves), default=0)), np.nan)
+    for i, curve in enumerate(curves):
+        matrix[i, :len(curve)] = curve
+    return matrix
+
+def equity_metrics(
+    equity: Union[np.ndarray, Sequence[Sequence[float]]],
+    initial_capital: Union[float, np.ndarray],
+    periods_per_year: int = TRADING_DAYS
+) -> Dict[str, np.ndarray]:
+    """
+    Return and risk metrics of many equity curves in one pass over a (curves x days)
+    matrix (NaN-padded, see `stack_curves`); a 1-D curve is treated as one row.
+
+    Daily returns start with a 0 for the first day, as `pct_change().fillna(0)` does.
+    Sharpe and Sortino are annualised with sqrt(`periods_per_year`); Sortino uses the
+    downside deviation. Drawdowns are measured from the running peak, starting at
+    `initial_capital`; the drawdown duration is the longest run of days below a peak.
+    """
+    matrix = np.asarray(equity, dtype=np.float64) if isinstance(equity, np.ndarray) else stack_curves(equity)
+    if matrix.ndim == 1:
+        matrix = matrix[np.newaxis, :]
+    n_curves, n_days = matrix.shape
+    initial_capital = np.broadcast_to(np.asarray(initial_capital, dtype=np.float64), (n_curves,))
+    valid = ~np.isnan(matrix)
+    count = valid.sum(axis=1)
+
+    returns = np.zeros_like(matrix)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns[:, 1:] = matrix[:, 1:] / matrix[:, :-1] - 1
+    returns = np.where(valid, np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0), 0.0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.where(count > 0, returns.sum(axis=1) / count, 0.0)
+        deviation = np.where(valid, returns - mean[:, np.newaxis], 0.0)
+        std = np.where(count > 1, np.sqrt((deviation ** 2).sum(axis=1) / (count - 1)), 0.0)
+        downside = np.where(count > 0, np.sqrt((np.minimum(returns, 0.0) ** 2).sum(axis=1) / count), 0.0)
+        sharpe = np.where(std > 0, mean / std * np.sqrt(periods_per_year), 0.0)
+        sortino = np.where(downside > 0, mean / downside * np.sqrt(periods_per_year), 0.0)
+
+    final = matrix[np.arange(n_curves), np.maximum(count - 1, 0)] if n_days else initial_capital.copy()
+    final = np.where(count > 0, final, initial_capital)
+    years = np.maximum(count - 1, 0) / periods_per_year
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = final / initial_capital
+        cagr = np.where((years > 0) & (growth > 0), growth ** (1 / np.where(years > 0, years, 1)) - 1, 0.0)
+
+    filled = np.where(valid, matrix, -np.inf)
+    peak = np.maximum.accumulate(np.maximum(filled, initial_capital[:, np.newaxis]), axis=1)
+    drawdown = np.where(valid, (peak - matrix) / peak, 0.0)
+    max_drawdown = np.maximum(drawdown.max(axis=1, initial=0.0), 0.0)
+
+    # Longest run of consecutive days under water
+    underwater = drawdown > 0
+    day = np.arange(n_days)
+    last_peak_day = np.maximum.accumulate(np.where(underwater, -1, day), axis=1) if n_days else np.zeros((n_curves, 0), dtype=np.int64)
+    duration = np.where(underwater, day - last_peak_day, 0).max(axis=1, initial=0)
+
+    return {
+        'days': count,
+        'final_equity': final,
+        'total_return_pct': (final / initial_capital - 1) * 100,
+        'cagr': cagr,
+        'sharpe': sharpe,
+        'sortino': sortino,
+        'max_drawdown': max_drawdown,
+        'max_drawdown_duration': duration,
+    }
+
+def max_drawdown(equity: np.ndarray, initial_capital: float) -> float:
+    """
+    Maximum drawdown of one equity curve, from a running peak starting at `initial_capital`.
+    """
+    return float(equity_metrics(np.asarray(equity, dtype=np.float64), initial_capital)['max_drawdown'][0])
+
+def trade_metrics(
+    curve: np.ndarray,
+    pnl: np.ndarray,
+    entry_index: np.ndarray,
+    exit_index: np.ndarray,
+    notional: np.ndarray,
+    n_curves: int,
+    n_days: np.ndarray,
+    average_equity: np.ndarray,
+    periods_per_year: int = TRADING_DAYS
+) -> Dict[str, np.ndarray]:
+    """
+    Trade statistics of many backtests from flat arrays of closed trades, `curve`
+    giving the backtest each trade belongs to. A trade holds a position from the close
+    of its entry day until its exit day.
+
+    Win rate is in percent (a trade with P&L <= 0 counts as a loss). Profit factor is
+    gross profit over gross loss (inf without losses). Exposure is the share of days
+    with an open position; turnover is the traded notional (entries plus exits) per
+    year as a multiple of the average equity.
+    """
+    curve = np.asarray(curve, dtype=np.int64)
+    pnl = np.asarray(pnl, dtype=np.float64)
+    trades = np.bincount(curve, minlength=n_curves)
+    wins = np.bincount(curve, weights=pnl > 0, minlength=n_curves)
+    gross_profit = np.bincount(curve, weights=np.where(pnl > 0, pnl, 0.0), minlength=n_curves)
+    gross_loss = np.bincount(curve, weights=np.where(pnl <= 0, pnl, 0.0), minlength=n_curves)
+    losses = trades - wins
+    traded = np.bincount(curve, weights=np.asarray(notional, dtype=np.float64), minlength=n_curves)
+
+    # +1 on the entry day, -1 on the exit day: days with a positive running sum hold a position
+    width = int(np.max(n_days, initial=0)) + 1
+    open_count = np.zeros((n_curves, width))
+    np.add.at(open_count, (curve, np.asarray(entry_index, dtype=np.int64)), 1)
+    np.add.at(open_count, (curve, np.asarray(exit_index, dtype=np.int64)), -1)
+    days_in_market = (np.cumsum(open_count, axis=1)[:, :-1] > 0).sum(axis=1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            'trades': trades,
+            'win_rate': np.where(trades > 0, wins / trades * 100, 0.0),
+            'avg_win_pnl': np.where(wins > 0, gross_profit / wins, 0.0),
+            'avg_loss_pnl': np.where(losses > 0, gross_loss / losses, 0.0),
+            'profit_factor': np.where(gross_loss < 0, gross_profit / -gross_loss, np.where(gross_profit > 0, np.inf, 0.0)),
+            'exposure': np.where(n_days > 0, days_in_market / n_days, 0.0),
+            'turnover': np.where((n_days > 0) & (average_equity > 0), traded / average_equity * periods_per_year / n_days, 0.0),
+        }
+
+def results_metrics(all_results: List[Dict[str, Any]], periods_per_year: int = TRADING_DAYS) -> List[Dict[str, float]]:
+    """
+    All metrics of a list of backtest reports (as returned by `run_trading_backtest`,
+    `run_vectorized_backtest` or `run_portfolio_backtest`), computed together: the
+    equity curves are stacked into one matrix and the trades into flat arrays.
+    """
+    if not all_results:
+        return []
+    n_curves = len(all_results)
+    curves, dates = [], []
+    for results in all_results:
+        equity_curve = results.get('equity_curve') or []
+        curves.append([point['equity'] for point in equity_curve])
+        dates.append(pd.to_datetime([point['date'] for point in equity_curve]).to_numpy())
+    matrix = stack_curves(curves)
+    initial_capital = np.array([results['initial_capital'] for results in all_results], dtype=np.float64)
+    metrics = equity_metrics(matrix, initial_capital, periods_per_year)
+    # Reports without an equity curve keep their own final equity
+    metrics['final_equity'] = np.where(
+        metrics['days'] > 0, metrics['final_equity'],
+        [results.get('final_equity', results['initial_capital']) for results in all_results]
+    )
+    metrics['total_return_pct'] = (metrics['final_equity'] / initial_capital - 1) * 100
+
+    trade_curve, pnl, entry_index, exit_index, notional = [], [], [], [], []
+    for i, results in enumerate(all_results):
+        trades = results.get('trades') or []
+        if not trades:
+            continue
+        # A trade without dates, size or prices (e.g. only a P&L) counts in the P&L
+        # metrics but adds no exposure or turnover: it opens and closes on day 0
+        held = [all(trade.get(key) is not None for key in HOLDING_FIELDS) for trade in trades]
+        entries = pd.to_datetime([trade['entry_date'] if has else pd.NaT for trade, has in zip(trades, held)]).to_numpy()
+        exits = pd.to_datetime([trade['exit_date'] if has else pd.NaT for trade, has in zip(trades, held)]).to_numpy()
+        trade_curve.append(np.full(len(trades), i))
+        pnl.append([trade['pnl'] for trade in trades])
+        entry_index.append(np.where(held, dates[i].searchsorted(entries), 0))
+        exit_index.append(np.where(held, dates[i].searchsorted(exits), 0))
+        notional.append([
+            abs(trade['size']) * (abs(trade['entry_price']) + abs(trade['exit_price'])) if has else 0.0
+            for trade, has in zip(trades, held)
+        ])
+
+    flat = [np.concatenate(part) if part else np.zeros(0) for part in (trade_curve, pnl, entry_index, exit_index, notional)]
+    average_equity = np.where(
+        metrics['days'] > 0,
+        np.nan_to_num(matrix).sum(axis=1) / np.maximum(metrics['days'], 1),
+        initial_capital
+    )
+    metrics.update(trade_metrics(*flat, n_curves=n_curves, n_days=metrics['days'], average_equity=average_equity, periods_per_year=periods_per_year))
+
+    rows = []
+    for i, results in enumerate(all_results):
+        row = {'ticker': results.get('ticker'), 'initial_capital': float(initial_capital[i])}
+        row.update({name: values[i].item() for name, values in metrics.items()})
+        rows.append(row)
+    return rows
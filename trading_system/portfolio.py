@@ -0,0 +1,301 @@
+import os
+import sys
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from trading_system.main import calculate_systematic_parameters, ewma_volatility_column
+from trading_system.indicator_frame import IndicatorFrame
+from trading_system.risk_management import STYLE_MULTIPLIERS
+from trading_system.agents import style_preference_agent
+from trading_system.backtester import download_backtest_data, warmup_start_date
+from trading_system.price_store import get_price_store
+from trading_system.forecast_cache import get_forecast_cache
+from trading_system.async_agents import forecast_batch
+from trading_system.forecasters import get_forecaster, is_agent
+from trading_system.performance import max_drawdown
+
+TREND_MAP = {'uptrend': 10.0, 'downtrend': -10.0, 'sideways': 0.0}
+MAX_IDM = 2.5
+
+class RollingCorrelation:
+    """
+    Correlation matrix of the last `window` daily returns of n instruments, updated in
+    O(n^2) per day: the running sums and cross-products add the new day's returns and
+    subtract the ones leaving the window, instead of recomputing over the window. The
+    sums are rebuilt from the buffer every `resync_every` updates to stop rounding
+    drift. Missing returns count as 0.
+    """
+    def __init__(self, n_instruments: int, window: int = 125, min_periods: int = 20, resync_every: int = 250):
+        self.window = window
+        self.min_periods = min_periods
+        self.resync_every = resync_every
+        self.buffer = np.zeros((window, n_instruments))
+        self.sums = np.zeros(n_instruments)
+        self.cross = np.zeros((n_instruments, n_instruments))
+        self.count = 0
+        self.head = 0
+        self.updates = 0
+
+    def update(self, returns: np.ndarray):
+        returns = np.nan_to_num(np.asarray(returns, dtype=np.float64), nan=0.0, posinf=0.0, neginf=0.0)
+        if self.count == self.window:
+            old = self.buffer[self.head]
+            self.sums -= old
+            self.cross -= np.outer(old, old)
+        else:
+            self.count += 1
+        self.buffer[self.head] = returns
+        self.head = (self.head + 1) % self.window
+        self.sums += returns
+        self.cross += np.outer(returns, returns)
+
+        self.updates += 1
+        if self.resync_every and self.updates % self.resync_every == 0:
+            filled = self.buffer[:self.count] if self.count < self.window else self.buffer
+            self.sums = filled.sum(axis=0)
+            self.cross = filled.T @ filled
+
+    @property
+    def ready(self) -> bool:
+        return self.count >= max(2, self.min_periods)
+
+    def correlation(self) -> Optional[np.ndarray]:
+        """
+        Returns the current correlation matrix, or None before `min_periods` days.
+        Instruments without variance are uncorrelated with the others.
+        """
+        if not self.ready:
+            return None
+        mean = self.sums / self.count
+        cov = (self.cross - self.count * np.outer(mean, mean)) / (self.count - 1)
+        sd = np.sqrt(np.clip(np.diag(cov), 0.0, None))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = np.where(np.outer(sd, sd) > 0, cov / np.outer(sd, sd), 0.0)
+        np.fill_diagonal(corr, 1.0)
+        return np.clip(corr, -1.0, 1.0)
+
+def instrument_diversification_multiplier(weights: np.ndarray, correlation: np.ndarray, cap: float = MAX_IDM) -> float:
+    """
+    IDM = 1 / sqrt(w' H w) for instrument weights w and correlation matrix H, with
+    negative correlations floored at zero and the result capped at `cap`.
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    total = weights.sum()
+    if total <= 0:
+        return 1.0
+    weights = weights / total
+    portfolio_variance = weights @ np.clip(correlation, 0.0, None) @ weights
+    if portfolio_variance <= 0:
+        return cap
+    return float(min(cap, 1.0 / np.sqrt(portfolio_variance)))
+
+def _scaled_forecasts(
+    ticker: str,
+    full_data: pd.DataFrame,
+    indicators: IndicatorFrame,
+    backtest_index: pd.DatetimeIndex,
+    forecaster: str = None
+) -> Dict[str, np.ndarray]:
+    """
+    Scaled forecast, price and EWMA volatility (as of the previous close) for every
+    backtest day of one ticker; NaN on days the single-ticker backtest does not trade.
+    """
+    n = len(backtest_index)
+    history_lengths = full_data.index.searchsorted(backtest_index, side='left')
+    row_positions = indicators.index.searchsorted(backtest_index, side='left') - 1
+    days = [i for i in range(1, n) if history_lengths[i] >= 50 and row_positions[i] >= 0]
+    requests = [
+        (ticker, indicators.row(row_positions[i]).to_dict(), backtest_index[i].strftime("%Y-%m-%d"))
+        for i in days
+    ]
+    if is_agent(forecaster):
+        prefetched = [(ticker, date.strftime("%Y-%m-%d")) for date in backtest_index]
+        get_forecast_cache().prefetch(prefetched)
+        forecasts = forecast_batch(requests)
+        get_forecast_cache().release(prefetched)
+    else:
+        forecast_fn = get_forecaster(forecaster)
+        forecasts = [forecast_fn(*request) for request in requests]
+
+    scaled = np.full(n, np.nan)
+    price = np.full(n, np.nan)
+    volatility = np.full(n, np.nan)
+    close = indicators.column(('Close', ticker))
+    ewma = indicators.column(ewma_volatility_column(indicators.columns))
+    for i, forecast in zip(days, forecasts):
+        scaled[i] = TREND_MAP.get(forecast.get('trend'), 0.0)
+        price[i] = close[row_positions[i]]
+        volatility[i] = ewma[row_positions[i]]
+    return {'forecast': scaled, 'price': price, 'volatility': volatility}
+
+def run_portfolio_backtest(
+    tickers: list,
+    start_date: str,
+    end_date: str,
+    initial_capital: float = 100000.0,
+    instrument_weights: Dict[str, float] = None,
+    annual_risk_target: float = 0.20,
+    correlation_window: int = 125,
+    idm_cap: float = MAX_IDM,
+    compound: bool = True,
+    forecaster: str = None
+) -> Dict[str, Any]:
+    """
+    Event-driven backtest of all `tickers` on one shared date index with a single
+    capital pool (steps 3.1-3.3 of the outline).
+
+    Each day, open trades are checked for their stop and then their target, as in
+    `run_trading_backtest`. Flat instruments with a signal then enter at the open with
+    position = round(volatility scalar x forecast / 10 x instrument weight x IDM). The
+    daily risk target comes from the pooled equity at the previous close (the initial
+    capital if not `compound`). The IDM comes from a rolling correlation matrix of daily
+    returns (`RollingCorrelation`), updated incrementally after each close, and is
+    capped at `idm_cap`. Weights default to equal; a dict of weights is normalised.
+
+    Memory is O(days x tickers) for the price and signal arrays plus O(window x tickers)
+    for the correlation. Returns a report shaped like `run_trading_backtest`'s (ticker
+    "PORTFOLIO"), plus the IDM per day and the weights used.
+    """
+    print(f"\n--- Running Portfolio Backtest for {len(tickers)} instruments ---")
+    get_price_store().top_up_many(tickers, warmup_start_date(start_date), end_date)
+
+    inputs = {}
+    for ticker in tickers:
+        full_data = download_backtest_data(ticker, start_date, end_date)
+        if full_data is None:
+            continue
+        backtest_index = full_data.index[full_data.index >= pd.to_datetime(start_date)]
+        params_df = calculate_systematic_parameters(ticker, data=full_data)
+        if params_df.empty or len(backtest_index) < 2:
+            continue
+        indicators = IndicatorFrame.from_dataframe(params_df)
+        signals = _scaled_forecasts(ticker, full_data, indicators, backtest_index, forecaster)
+        inputs[ticker] = (full_data.loc[backtest_index], backtest_index, signals)
+
+    if not inputs:
+        print("No instrument has data for the portfolio backtest.")
+        return None
+
+    names = list(inputs)
+    n = len(names)
+    dates = inputs[names[0]][1]
+    for name in names[1:]:
+        dates = dates.union(inputs[name][1])
+    n_days = len(dates)
+
+    # (days x instruments) arrays on the shared index; NaN where an instrument has no bar
+    fields = {field: np.full((n_days, n), np.nan) for field in ('Open', 'High', 'Low', 'Close', 'forecast', 'price', 'volatility')}
+    for j, name in enumerate(names):
+        data, backtest_index, signals = inputs[name]
+        rows = dates.get_indexer(backtest_index)
+        for field in ('Open', 'High', 'Low', 'Close'):
+            fields[field][rows, j] = data[(field, name)].to_numpy(dtype=np.float64)
+        for field in ('forecast', 'price', 'volatility'):
+            fields[field][rows, j] = signals[field]
+    valuation_close = pd.DataFrame(fields['Close']).ffill().to_numpy()
+
+    if instrument_weights is None:
+        weights = np.full(n, 1.0 / n)
+    else:
+        weights = np.array([instrument_weights.get(name, 0.0) for name in names], dtype=np.float64)
+        weights = weights / weights.sum() if weights.sum() > 0 else np.full(n, 1.0 / n)
+    multipliers = STYLE_MULTIPLIERS.get(style_preference_agent(), STYLE_MULTIPLIERS['conservative'])
+
+    correlation = RollingCorrelation(n, window=correlation_window)
+    idm = 1.0
+    cash = initial_capital
+    position = np.zeros(n, dtype=np.int64)
+    open_trades: Dict[int, Dict[str, Any]] = {}
+    trades, equity_curve, idm_curve = [], [], []
+    equity = initial_capital
+
+    for t in tqdm(range(n_days), desc="Portfolio"):
+        date_str = dates[t].strftime("%Y-%m-%d")
+        opens, highs, lows = fields['Open'][t], fields['High'][t], fields['Low'][t]
+
+        # a. Exits: stop-loss first, then take-profit
+        for j in [j for j in open_trades if not np.isnan(opens[j])]:
+            trade, size = open_trades[j], position[j]
+            exit_price, exit_reason = None, None
+            if (size > 0 and lows[j] <= trade['stop_loss']) or (size < 0 and highs[j] >= trade['stop_loss']):
+                exit_price, exit_reason = trade['stop_loss'], "Stop-Loss"
+            elif (size > 0 and highs[j] >= trade['take_profit']) or (size < 0 and lows[j] <= trade['take_profit']):
+                exit_price, exit_reason = trade['take_profit'], "Take-Profit"
+            if exit_price is not None:
+                cash += size * exit_price
+                trade.update({
+                    "exit_date": date_str,
+                    "exit_price": exit_price,
+                    "pnl": size * (exit_price - trade['entry_price']),
+                    "exit_reason": exit_reason
+                })
+                trades.append(trade)
+                del open_trades[j]
+                position[j] = 0
+
+        # b. Entries for flat instruments, sized on the pooled capital
+        forecast, price, volatility = fields['forecast'][t], fields['price'][t], fields['volatility'][t]
+        candidates = (position == 0) & ~np.isnan(opens) & np.isfinite(forecast) & (forecast != 0)
+        if candidates.any():
+            capital_base = equity if compound else initial_capital
+            daily_risk_target = capital_base * annual_risk_target / 16
+            value_volatility = price * volatility / 100
+            with np.errstate(divide='ignore', invalid='ignore'):
+                scalar = np.where(value_volatility > 0, daily_risk_target / value_volatility, 0.0)
+            target = np.round(scalar * forecast / 10.0 * weights * idm)
+            for j in np.flatnonzero(candidates & np.isfinite(target) & (target != 0)):
+                size = int(target[j])
+                distance = price[j] * volatility[j] / 100
+                direction = 1 if size > 0 else -1
+                position[j] = size
+                cash -= size * opens[j]
+                open_trades[j] = {
+                    "entry_date": date_str,
+                    "ticker": names[j],
+                    "direction": "long" if size > 0 else "short",
+                    "entry_price": opens[j],
+                    "size": size,
+                    "stop_loss": price[j] - direction * distance * multipliers['sl'],
+                    "take_profit": price[j] + direction * distance * multipliers['tp'],
+                    "weight": weights[j],
+                    "idm": idm
+                }
+
+        # c. Mark to market on the last known closes
+        equity = cash + float(position @ np.nan_to_num(valuation_close[t]))
+        equity_curve.append({'date': dates[t], 'equity': equity})
+        idm_curve.append({'date': dates[t], 'idm': idm})
+
+        # d. Update the correlation with today's returns; the IDM applies from tomorrow
+        if t > 0:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                correlation.update(valuation_close[t] / valuation_close[t - 1] - 1)
+            matrix = correlation.correlation()
+            if matrix is not None:
+                idm = instrument_diversification_multiplier(weights, matrix, idm_cap)
+
+    return {
+        "ticker": "PORTFOLIO",
+        "initial_capital": initial_capital,
+        "final_equity": equity,
+        "max_drawdown": max_drawdown([point['equity'] for point in equity_curve], initial_capital),
+        "trades": trades,
+        "equity_curve": equity_curve,
+        "idm_curve": idm_curve,
+        "instrument_weights": dict(zip(names, weights.tolist())),
+    }
+
+if __name__ == "__main__":
+    from trading_system.nifty50 import NIFTY_50_SYMBOLS
+    from trading_system.backtester import generate_full_report, save_trade_log
+
+    results = run_portfolio_backtest(NIFTY_50_SYMBOLS, "2025-05-01", "2025-09-22")
+    if results:
+        save_trade_log(results)
+        generate_full_report(results)
+        print(f"Final IDM: {results['idm_curve'][-1]['idm']:.2f}")
@@ -0,0 +1,278 @@
+import os
+import json
+import re
+import tempfile
+import yfinance as yf
+import pandas as pd
+import numpy as np
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+# Column order of a yfinance download
+PRICE_FIELDS = ('Close', 'High', 'Low', 'Open', 'Volume')
+
+def is_offline() -> bool:
+    """
+    Offline mode is switched on with the TRADING_OFFLINE environment variable.
+    """
+    return os.getenv("TRADING_OFFLINE", "").lower() in ("1", "true", "yes")
+
+def _period_start(period: str) -> str:
+    """
+    Converts a yfinance-style period such as "1y", "6mo" or "30d" into a start date.
+    """
+    match = re.fullmatch(r"(\d+)(d|wk|mo|y)", period)
+    if not match:
+        raise ValueError(f"Unsupported period: {period}")
+    count, unit = int(match.group(1)), match.group(2)
+    days = {'d': 1, 'wk': 7, 'mo': 31, 'y': 366}[unit] * count
+    return (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+
+def _next_day(date_str: str) -> str:
+    return (datetime.strptime(date_str, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+
+class PriceStore:
+    """
+    Local OHLCV store keyed by ticker.
+
+    Each ticker is kept as one `{ticker}.npy` array of shape (6, n_days): the first row
+    holds the dates (days since the epoch), the others the PRICE_FIELDS, so every column
+    is contiguous and the file can be memory-mapped. A `{ticker}.json` file records the
+    [start, end) range that has already been fetched, so only missing ranges are
+    downloaded. In offline mode nothing is downloaded and only stored data is served.
+    """
+    def __init__(self, storage_path: str = "price_store", offline: bool = None):
+        self.storage_path = storage_path
+        self.offline = is_offline() if offline is None else offline
+        os.makedirs(self.storage_path, exist_ok=True)
+
+    def _paths(self, ticker: str) -> Tuple[str, str]:
+        name = ticker.replace('/', '_').replace('\\', '_')
+        return os.path.join(self.storage_path, f"{name}.npy"), os.path.join(self.storage_path, f"{name}.json")
+
+    def covered_range(self, ticker: str) -> Optional[Tuple[str, str]]:
+        _, meta_path = self._paths(ticker)
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        return meta['start'], meta['end']
+
+    def load(self, ticker: str, start: str = None, end: str = None) -> pd.DataFrame:
+        """
+        Returns the stored rows with start <= date < end as a single-level OHLCV frame.
+        """
+        data_path, _ = self._paths(ticker)
+        if not os.path.exists(data_path):
+            return pd.DataFrame(columns=list(PRICE_FIELDS), dtype=float)
+
+        table = np.load(data_path, mmap_mode='r')
+        days = table[0]
+        lo = 0 if start is None else np.searchsorted(days, _epoch_days(start), side='left')
+        hi = len(days) if end is None else np.searchsorted(days, _epoch_days(end), side='left')
+
+        index = pd.to_datetime(np.asarray(days[lo:hi], dtype='int64'), unit='D')
+        index.name = 'Date'
+        columns = {field: np.array(table[row + 1, lo:hi]) for row, field in enumerate(PRICE_FIELDS)}
+        return pd.DataFrame(columns, index=index)
+
+    def save(self, ticker: str, df: pd.DataFrame, start: str, end: str):
+        """
+        Replaces the stored history of `ticker` and records [start, end) as fetched.
+        Files are written to a temporary file of their own first, so readers never see
+        partial data and concurrent writers (e.g. backtest workers) do not collide.
+        """
+        data_path, meta_path = self._paths(ticker)
+        table = np.empty((len(PRICE_FIELDS) + 1, len(df)), dtype=np.float64)
+        table[0] = _index_to_epoch_days(df.index)
+        for row, field in enumerate(PRICE_FIELDS):
+            table[row + 1] = df[field].to_numpy(dtype=np.float64)
+
+        _write_atomically(data_path, lambda f: np.save(f, table))
+        _write_atomically(meta_path, lambda f: f.write(json.dumps({'ticker': ticker, 'start': start, 'end': end}).encode()))
+
+    def missing_ranges(self, ticker: str, start: str, end: str) -> List[Tuple[str, str]]:
+        """
+        Returns the [start, end) ranges that must be downloaded to cover [start, end).
+        The last stored day is always refetched with the tail, as it may have been partial.
+        """
+        covered = self.covered_range(ticker)
+        if covered is None:
+            return [(start, end)]
+
+        covered_start, covered_end = covered
+        ranges = []
+        if start < covered_start:
+            ranges.append((start, covered_start))
+        if end > covered_end:
+            stored = self.load(ticker)
+            last_day = stored.index[-1].strftime("%Y-%m-%d") if not stored.empty else covered_end
+            ranges.append((min(last_day, covered_end), end))
+        return ranges
+
+    def merge(self, ticker: str, fetched: pd.DataFrame, start: str, end: str):
+        """
+        Merges freshly downloaded rows covering [start, end) into the stored history.
+        """
+        if fetched.empty:
+            return
+        stored = self.load(ticker)
+        merged = pd.concat([stored, fetched[list(PRICE_FIELDS)]]) if not stored.empty else fetched[list(PRICE_FIELDS)]
+        merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+
+        covered = self.covered_range(ticker)
+        if covered is not None:
+            start, end = min(start, covered[0]), max(end, covered[1])
+        self.save(ticker, merged, start, end)
+
+    def top_up(self, ticker: str, start: str, end: str):
+        """
+        Downloads only the parts of [start, end) that are not stored yet.
+        """
+        if self.offline:
+            return
+        for range_start, range_end in self.missing_ranges(ticker, start, end):
+            fetched = yf.download(ticker, start=range_start, end=range_end, progress=False, auto_adjust=True)
+            self.merge(ticker, _single_level(fetched, ticker), range_start, range_end)
+
+    def top_up_many(self, tickers: List[str], start: str, end: str, chunk_size: int = 50):
+        """
+        Downloads the missing ranges of many tickers with batched `yf.download` calls:
+        tickers missing the same range are fetched together, `chunk_size` at a time.
+        """
+        if self.offline:
+            return
+        by_range = {}
+        for ticker in tickers:
+            for missing in self.missing_ranges(ticker, start, end):
+                by_range.setdefault(missing, []).append(ticker)
+
+        for (range_start, range_end), range_tickers in by_range.items():
+            for i in range(0, len(range_tickers), chunk_size):
+                chunk = range_tickers[i:i + chunk_size]
+                fetched = yf.download(chunk, start=range_start, end=range_end, progress=False, auto_adjust=True, threads=True)
+                for ticker in chunk:
+                    self.merge(ticker, _single_level(fetched, ticker), range_start, range_end)
+
+    def get_many(
+        self,
+        tickers: List[str],
+        start: str = None,
+        end: str = None,
+        period: str = None,
+        chunk_size: int = 50
+    ) -> Tuple[Dict[str, pd.DataFrame], List[str]]:
+        """
+        Batched version of `get` for a whole universe. Returns the per-ticker frames and
+        the tickers that have no data in the requested window.
+        """
+        if start is None:
+            start = _period_start(period or "1y")
+        if end is None:
+            end = _next_day(datetime.now().strftime("%Y-%m-%d"))
+
+        self.top_up_many(tickers, start, end, chunk_size=chunk_size)
+        frames, failed = {}, []
+        for ticker in tickers:
+            df = self._stored_frame(ticker, start, end)
+            if df.empty:
+                failed.append(ticker)
+            else:
+                frames[ticker] = df
+        return frames, failed
+
+    def _stored_frame(self, ticker: str, start: str, end: str) -> pd.DataFrame:
+        df = self.load(ticker, start, end).dropna(how='all')
+        df.columns = pd.MultiIndex.from_product([df.columns, [ticker]], names=['Price', 'Ticker'])
+        return df
+
+    def get(self, ticker: str, start: str = None, end: str = None, period: str = None) -> pd.DataFrame:
+        """
+        Returns the daily history of `ticker` in the shape of `yf.download` (a
+        (Price, Ticker) column MultiIndex), topping up the store first unless offline.
+        Takes either `start`/`end` (end exclusive) or a `period` such as "1y".
+        """
+        if start is None:
+            start = _period_start(period or "1y")
+        if end is None:
+            end = _next_day(datetime.now().strftime("%Y-%m-%d"))
+
+        self.top_up(ticker, start, end)
+        return self._stored_frame(ticker, start, end)
+
+def _write_atomically(path: str, write):
+    """
+    Calls `write` with a binary file that replaces `path` once written. The temporary
+    file is unique to the caller and in the same directory, so `os.replace` is atomic.
+    """
+    fd, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(temporary_path, path)
+    except BaseException:
+        try:
+            os.remove(temporary_path)
+        except OSError:
+            pass
+        raise
+
+def _epoch_days(date_str: str) -> float:
+    return float((pd.Timestamp(date_str) - pd.Timestamp(0)).days)
+
+def _index_to_epoch_days(index: pd.DatetimeIndex) -> np.ndarray:
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return ((index.normalize() - pd.Timestamp(0)) // pd.Timedelta(days=1)).to_numpy(dtype=np.float64)
+
+def _single_level(df: pd.DataFrame, ticker: str) -> pd.DataFrame:
+    """
+    Drops the ticker level that yfinance adds to the columns of a download. For a
+    multi-ticker download this picks out the columns of `ticker`.
+    """
+    if df.empty:
+        return df
+    if isinstance(df.columns, pd.MultiIndex):
+        tickers_in_download = df.columns.get_level_values(1)
+        if ticker in tickers_in_download:
+            df = df.xs(ticker, axis=1, level=1)
+        elif tickers_in_download.nunique() == 1:
+            df = df.droplevel(1, axis=1)
+        else:
+            return pd.DataFrame()
+    return df.reindex(columns=list(PRICE_FIELDS)).dropna(how='all')
+
+_default_store = None
+
+def get_price_store() -> PriceStore:
+    """
+    Returns the process-wide price store used by the scanner and backtester.
+    """
+    global _default_store
+    if _default_store is None:
+        _default_store = PriceStore()
+    return _default_store
+
+def download_prices(ticker: str, start: str = None, end: str = None, period: str = None) -> pd.DataFrame:
+    """
+    Drop-in replacement for `yf.download(ticker, ...)` that reads through the local store.
+    """
+    return get_price_store().get(ticker, start=start, end=end, period=period)
+
+def download_universe(
+    tickers: List[str],
+    start: str = None,
+    end: str = None,
+    period: str = None,
+    chunk_size: int = 50
+) -> Tuple[Dict[str, pd.DataFrame], List[str]]:
+    """
+    Fetches a whole universe (e.g. F_AND_O_STOCKS or NIFTY_50_SYMBOLS) in a few batched
+    requests. Returns per-ticker frames in the shape `calculate_systematic_parameters`
+    expects and the list of tickers without data.
+    """
+    frames, failed = get_price_store().get_many(tickers, start=start, end=end, period=period, chunk_size=chunk_size)
+    if failed:
+        print(f"No price data for {len(failed)} of {len(tickers)} tickers: {', '.join(failed)}")
+    return frames, failed
@@ -0,0 +1,112 @@
+import os
+import time
+import asyncio
+import threading
+import multiprocessing
+
+# Slots of the bucket state, kept in one array so it can live in shared memory
+_TOKENS, _UPDATED, _RATE, _BURST = range(4)
+
+class TokenBucket:
+    """
+    Thread-safe token bucket allowing `rate` requests per second on average and bursts
+    of up to `burst` requests. Waiters are served in the order they asked for a token.
+
+    With `shared`, the state and lock live in shared memory, so worker processes
+    started after its creation (forked, or handed the bucket as a process argument)
+    draw from the same budget instead of each getting the full rate.
+    """
+    def __init__(self, rate: float, burst: int = 1, shared: bool = False):
+        self._check(rate, burst)
+        state = [float(burst), time.monotonic(), float(rate), float(burst)]
+        if shared:
+            self._state = multiprocessing.RawArray('d', state)
+            self._lock = multiprocessing.Lock()
+        else:
+            self._state = state
+            self._lock = threading.Lock()
+        self.shared = shared
+
+    @staticmethod
+    def _check(rate: float, burst: int):
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate must be positive and burst at least 1")
+
+    @property
+    def rate(self) -> float:
+        return self._state[_RATE]
+
+    @property
+    def burst(self) -> int:
+        return int(self._state[_BURST])
+
+    def configure(self, rate: float = None, burst: int = None):
+        """
+        Changes the rate and/or burst for every user of the bucket, in all processes
+        if it is shared.
+        """
+        with self._lock:
+            rate = self._state[_RATE] if rate is None else rate
+            burst = self._state[_BURST] if burst is None else burst
+            self._check(rate, burst)
+            self._state[_RATE] = float(rate)
+            self._state[_BURST] = float(burst)
+            self._state[_TOKENS] = min(self._state[_TOKENS], float(burst))
+
+    def _reserve(self) -> float:
+        """
+        Takes a token, borrowing against future refills if none is left, and returns
+        how many seconds the caller has to wait before using it.
+        """
+        with self._lock:
+            state = self._state
+            # time.monotonic is one system-wide clock, so processes agree on `now`
+            now = time.monotonic()
+            tokens = min(state[_BURST], state[_TOKENS] + (now - state[_UPDATED]) * state[_RATE]) - 1
+            state[_TOKENS] = tokens
+            state[_UPDATED] = now
+            return 0.0 if tokens >= 0 else -tokens / state[_RATE]
+
+    def acquire(self) -> float:
+        """
+        Blocks until a token is available and returns the time waited.
+        """
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self) -> float:
+        """
+        Awaits a token without blocking the event loop and returns the time waited.
+        """
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+_agent_limiter = None
+_agent_limiter_lock = threading.Lock()
+
+def get_agent_rate_limiter() -> TokenBucket:
+    """
+    Returns the limiter shared by every agent call in this process and the worker
+    processes it starts (see `set_agent_rate_limiter`), so together they stay within
+    one budget. The rate defaults to one request every 7 seconds and can be changed
+    with AGENT_REQUESTS_PER_MINUTE and AGENT_BURST, or with `configure`.
+    """
+    global _agent_limiter
+    with _agent_limiter_lock:
+        if _agent_limiter is None:
+            requests_per_minute = float(os.getenv("AGENT_REQUESTS_PER_MINUTE", 60 / 7))
+            burst = int(os.getenv("AGENT_BURST", 1))
+            _agent_limiter = TokenBucket(rate=requests_per_minute / 60, burst=burst, shared=True)
+        return _agent_limiter
+
+def set_agent_rate_limiter(limiter: TokenBucket):
+    """
+    Installs the parent's limiter in a worker process: pass `get_agent_rate_limiter()`
+    to the worker when starting it and call this first thing in the worker.
+    """
+    global _agent_limiter
+    _agent_limiter = limiter
@@ -1,22 +1,26 @@
 from typing import Dict
 
+from trading_system.instrumentation import console
+
+# Multipliers tied to trading style (mock values)
+STYLE_MULTIPLIERS = {
+    'conservative': {'sl': 1.5, 'tp': 2.0},
+    'aggressive': {'sl': 2.5, 'tp': 4.0}
+}
+
 def calculate_dynamic_thresholds(
     instrument_price: float,
     volatility: float,
     direction: str,
-    style: str = 'conservative'
+    style: str = 'conservative',
+    multipliers: Dict[str, float] = None
 ) -> Dict[str, float]:
     """
     Calculates dynamic stop-loss and take-profit thresholds based on trade direction.
+    Explicit `multipliers` ({'sl': ..., 'tp': ...}) override the style's, e.g. in a sweep.
     """
-
-    # Multipliers tied to trading style (mock values)
-    style_multipliers = {
-        'conservative': {'sl': 1.5, 'tp': 2.0},
-        'aggressive': {'sl': 2.5, 'tp': 4.0}
-    }
-
-    multipliers = style_multipliers.get(style, style_multipliers['conservative'])
+    if multipliers is None:
+        multipliers = STYLE_MULTIPLIERS.get(style, STYLE_MULTIPLIERS['conservative'])
 
     sl_distance = instrument_price * volatility / 100 * multipliers['sl']
     tp_distance = instrument_price * volatility / 100 * multipliers['tp']
@@ -40,17 +44,18 @@ def run_phase4_risk_management(
     instrument_price: float,
     volatility: float, # Unannualized standard deviation of returns
     direction: str,
-    style: str
+    style: str,
+    multipliers: Dict[str, float] = None
 ):
     """
     Runs the full Phase 4 risk management logic.
     """
-    print("\n--- Phase 4: Active Trade Management ---")
+    console("\n--- Phase 4: Active Trade Management ---")
 
-    thresholds = calculate_dynamic_thresholds(instrument_price, volatility, direction, style)
+    thresholds = calculate_dynamic_thresholds(instrument_price, volatility, direction, style, multipliers)
 
-    print(f"Trade Direction: {direction}")
-    print(f"Dynamic Stop-Loss Price: ${thresholds['stop_loss']:,.2f}")
-    print(f"Dynamic Take-Profit Price: ${thresholds['take_profit']:,.2f}")
+    console(f"Trade Direction: {direction}")
+    console(f"Dynamic Stop-Loss Price: ${thresholds['stop_loss']:,.2f}")
+    console(f"Dynamic Take-Profit Price: ${thresholds['take_profit']:,.2f}")
 
     return thresholds
@@ -1,5 +1,19 @@
+import os
+import csv
+import json
+import argparse
 import pandas as pd
-from trading_system.main import run_system_for_ticker
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from trading_system.main import calculate_systematic_parameters, run_system_for_ticker, run_system_for_row
+from trading_system.async_agents import forecast_batch
+from trading_system.agents import batch_forecasting_agent
+from trading_system.indicator_frame import IndicatorFrame
+from trading_system.online_indicators import OnlineSystematicParameters
+from trading_system.price_store import download_universe, get_price_store, PRICE_FIELDS
+from trading_system.forecasters import FORECASTERS, is_agent
+from trading_system.single_flight import format_single_flight_stats
+from trading_system.instrumentation import console, export_metrics, format_phase_summary, serve_metrics, set_quiet, time_phase
+from trading_system.tracing import enable_tracing, merge_traces, span, traced, tracing_enabled
 
 # For development, we'll use a small, hardcoded list of F&O stocks.
 F_AND_O_STOCKS = [
@@ -7,22 +21,83 @@ F_AND_O_STOCKS = [
     'HINDUNILVR.NS', 'SBIN.NS', 'BAJFINANCE.NS', 'BHARTIARTL.NS', 'KOTAKBANK.NS'
 ]
 
-def run_scanner(tickers: list):
+@traced('run')
+def run_scanner(
+    tickers: list,
+    concurrent_forecasts: bool = False,
+    forecaster: str = None,
+    prompt_batch_size: int = None,
+    **client_options
+):
     """
     Runs the trading system analysis for a list of tickers and returns the results.
+    With `concurrent_forecasts`, Phase 1 runs for every ticker first and all forecasts
+    are requested as one concurrent batch (see `async_agents`); `client_options` such as
+    `max_concurrency` or `requests_per_minute` configure the client. With
+    `prompt_batch_size`, Phase 1 also runs first and the forecasts are requested with
+    multi-ticker prompts of that many tickers (see `agents.batch_forecasting_agent`).
+    `forecaster` selects the Phase-2 forecaster by name (see `forecasters`).
     """
     all_results = []
     print(f"--- Starting Scanner for {len(tickers)} stocks ---")
+
+    # Fetch the whole universe in a few batched requests instead of one per ticker
+    price_frames, failed = download_universe(tickers, period="1y")
+    for ticker in failed:
+        print(f"!!! Error processing {ticker}: no price data !!!")
+
+    forecasts = {}
+    params_frames = {}
+    # Local forecasters are cheap: only the agent benefits from a concurrent batch
+    concurrent_forecasts = (concurrent_forecasts or bool(prompt_batch_size)) and is_agent(forecaster)
+    if concurrent_forecasts:
+        requests = []
+        for ticker in tickers:
+            if ticker not in price_frames:
+                continue
+            try:
+                params_df = calculate_systematic_parameters(ticker, data=price_frames[ticker])
+            except Exception as e:
+                print(f"!!! Error processing {ticker}: {e} !!!")
+                continue
+            if params_df.empty:
+                continue
+            params_frames[ticker] = params_df
+            last_day = IndicatorFrame.from_dataframe(params_df.iloc[-1:]).row(-1)
+            requests.append((ticker, last_day.to_dict(), last_day.date.strftime("%Y-%m-%d")))
+        if prompt_batch_size:
+            batch_forecasts = batch_forecasting_agent(requests, batch_size=prompt_batch_size)
+        else:
+            batch_forecasts = forecast_batch(requests, **client_options)
+        forecasts = dict(zip([request[0] for request in requests], batch_forecasts))
+
     for ticker in tickers:
+        if ticker not in price_frames:
+            continue
+        if concurrent_forecasts and ticker not in forecasts:
+            continue
         try:
-            print(f"\n...Scanning {ticker}...")
-            result = run_system_for_ticker(ticker)
+            console(f"\n...Scanning {ticker}...")
+            with span(ticker, 'ticker'):
+                result = run_system_for_ticker(
+                    ticker,
+                    data=price_frames[ticker],
+                    params_df=params_frames.get(ticker),
+                    agent_forecast=forecasts.get(ticker),
+                    forecaster=forecaster
+                )
             if result:
                 all_results.append(result)
         except Exception as e:
             print(f"!!! Error processing {ticker}: {e} !!!")
 
     print(f"\n--- Scanner finished. Analyzed {len(all_results)} stocks successfully. ---")
+    flight_stats = format_single_flight_stats()
+    if flight_stats:
+        print(f"Agent calls:\n{flight_stats}")
+    phase_summary = format_phase_summary()
+    if phase_summary:
+        print(f"Time per phase:\n{phase_summary}")
     return all_results
 
 def generate_report(results: list):
@@ -63,8 +138,205 @@ def generate_report(results: list):
     else:
         print("No strong short candidates found.")
 
+# --- Streaming mode ---
+# A bar is a dict with 'ticker', 'date', 'open', 'high', 'low', 'close' and 'volume'.
+# A bar dated like the ticker's last bar replaces it (an intraday update of today's
+# daily bar); a later date appends a new day.
+
+BAR_FIELDS = ('ticker', 'date', 'open', 'high', 'low', 'close', 'volume')
+
+def read_replay_file(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Streams bars from a replay file, either CSV with a header of BAR_FIELDS or JSON
+    lines with the same keys, without loading the file into memory.
+    """
+    with open(path, 'r', newline='') as f:
+        if path.endswith(('.jsonl', '.json')):
+            records = (json.loads(line) for line in f if line.strip())
+        else:
+            records = csv.DictReader(f)
+        for record in records:
+            yield {
+                'ticker': record['ticker'],
+                'date': record['date'],
+                **{field: float(record[field]) for field in BAR_FIELDS[2:]}
+            }
+
+def replay_from_store(tickers: List[str], start: str, end: str) -> Iterator[Dict[str, Any]]:
+    """
+    Replays the stored daily bars of `tickers` in [start, end) in date order, e.g. to
+    rehearse the streaming scanner on past days.
+    """
+    store = get_price_store()
+    frames = {ticker: store.load(ticker, start, end).dropna(how='all') for ticker in tickers}
+    bars = []
+    for ticker, df in frames.items():
+        for date, row in zip(df.index, df[list(PRICE_FIELDS)].itertuples(index=False)):
+            bars.append((date, ticker, row))
+    for date, ticker, row in sorted(bars, key=lambda bar: (bar[0], bar[1])):
+        yield {'ticker': ticker, 'date': date.strftime("%Y-%m-%d"), 'open': row.Open, 'high': row.High,
+               'low': row.Low, 'close': row.Close, 'volume': row.Volume}
+
+def write_replay_file(bars: Iterable[Dict[str, Any]], path: str) -> int:
+    """
+    Writes bars to a CSV replay file readable by `read_replay_file`. Returns the count.
+    """
+    count = 0
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(BAR_FIELDS))
+        writer.writeheader()
+        for bar in bars:
+            writer.writerow({field: bar[field] for field in BAR_FIELDS})
+            count += 1
+    return count
+
+def candidate_side(result: Optional[Dict[str, Any]]) -> Optional[str]:
+    """
+    'long' or 'short' if a scanner result is a trade candidate, else None.
+    """
+    if not result or not result.get('target_position'):
+        return None
+    return 'long' if result['target_position'] > 0 else 'short'
+
+class StreamingScanner:
+    """
+    Incremental scanner: keeps the online Phase-1 state of every ticker and, for each
+    incoming bar, updates only that ticker and reruns its Phases 2-4. Emits an event
+    whenever the ticker's long/short candidate status changes. `forecaster` selects the
+    Phase-2 forecaster by name (see `forecasters`).
+    """
+    def __init__(self, tickers: List[str], forecaster: str = None, **indicator_options):
+        self.tickers = list(tickers)
+        self.forecaster = forecaster
+        self.indicator_options = indicator_options
+        self.indicators: Dict[str, OnlineSystematicParameters] = {}
+        self.before_last_bar: Dict[str, Dict[str, Any]] = {}
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.sides: Dict[str, Optional[str]] = {}
+
+    def warm_up(self, start: str = None, end: str = None, period: str = "1y"):
+        """
+        Seeds the indicators from stored history (one batched download for the whole
+        universe). `end` is exclusive, so a replay can start right after it. The state
+        before the last history bar is kept too, so a streamed bar of that same day
+        (e.g. today's, when warming up to today) replaces it instead of being added.
+        """
+        if start is None and end is not None:
+            start = (pd.Timestamp(end) - pd.DateOffset(years=1)).strftime("%Y-%m-%d")
+        price_frames, _ = download_universe(self.tickers, start=start, end=end, period=period)
+        for ticker, df in price_frames.items():
+            if df.empty:
+                continue
+            online = OnlineSystematicParameters.from_history(ticker, df.iloc[:-1], **self.indicator_options)
+            self.before_last_bar[ticker] = online.snapshot()
+            online.update(df.index[-1], *(
+                float((df[(field, ticker)] if (field, ticker) in df.columns else df[field]).iloc[-1])
+                for field in ('Open', 'High', 'Low', 'Close', 'Volume')
+            ))
+            self.indicators[ticker] = online
+
+    def process_bar(self, bar: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Applies one bar and returns a candidate event if the ticker's side changed.
+        """
+        ticker = bar['ticker']
+        online = self.indicators.get(ticker)
+        if online is None:
+            online = self.indicators[ticker] = OnlineSystematicParameters(ticker, **self.indicator_options)
+
+        date = pd.Timestamp(bar['date'])
+        if online.last_date is not None and date < online.last_date:
+            return None # stale bar
+        if online.last_date is not None and date == online.last_date:
+            # Intraday update of the current day: rewind to before that day's first bar
+            online = self.indicators[ticker] = OnlineSystematicParameters.restore(self.before_last_bar[ticker])
+        else:
+            self.before_last_bar[ticker] = online.snapshot()
+
+        with time_phase('indicators'):
+            online.update(date, bar['open'], bar['high'], bar['low'], bar['close'], bar['volume'])
+            row = online.row()
+        if row is None:
+            return None
+
+        result = run_system_for_row(ticker, row, forecaster=self.forecaster)
+        self.results[ticker] = result
+        side = candidate_side(result)
+        previous = self.sides.get(ticker)
+        self.sides[ticker] = side
+        if side == previous:
+            return None
+        return {'ticker': ticker, 'date': result['date'], 'side': side, 'previous_side': previous, 'result': result}
+
+    def run(self, bars: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Consumes a bar stream (a generator or `read_replay_file`) and yields events.
+        """
+        for bar in bars:
+            try:
+                with span(str(bar.get('ticker')), 'bar', date=bar.get('date')):
+                    event = self.process_bar(bar)
+            except Exception as e:
+                print(f"!!! Error processing {bar.get('ticker')} bar {bar.get('date')}: {e} !!!")
+                continue
+            if event is not None:
+                yield event
+
+    def candidates(self) -> List[Dict[str, Any]]:
+        """
+        Latest results of the tickers that are currently long or short candidates.
+        """
+        return [self.results[ticker] for ticker, side in self.sides.items() if side is not None]
+
+def run_scanner_stream(
+    tickers: list,
+    bars: Iterable[Dict[str, Any]],
+    warm_up_end: str = None,
+    forecaster: str = None,
+    **indicator_options
+) -> Iterator[Dict[str, Any]]:
+    """
+    Streaming counterpart of `run_scanner`: warms up on history before `warm_up_end`
+    (or the last year), then yields a candidate event for every change in the stream.
+    """
+    scanner = StreamingScanner(tickers, forecaster=forecaster, **indicator_options)
+    scanner.warm_up(end=warm_up_end)
+    for event in scanner.run(bars):
+        if event['side'] is None:
+            print(f"[{event['ticker']}] {event['date']}: no longer a {event['previous_side']} candidate")
+        else:
+            result = event['result']
+            print(f"[{event['ticker']}] {event['date']}: new {event['side']} candidate "
+                  f"(position {result['target_position']}, SL {result['stop_loss']}, TP {result['take_profit']})")
+        yield event
+
 if __name__ == "__main__":
-    # In a real scenario, you might not want to run the full list every time.
-    # For this test, we run the scanner on the dev list.
-    results = run_scanner(F_AND_O_STOCKS)
-    generate_report(results)
+    parser = argparse.ArgumentParser(description="Scan the F&O list for trading opportunities.")
+    parser.add_argument("--replay", help="Stream bars from a CSV/JSONL replay file instead of a one-off scan")
+    parser.add_argument("--warm-up-end", help="Warm the streaming indicators up on history before this date")
+    parser.add_argument("--forecaster", choices=sorted(FORECASTERS), help="Phase-2 forecaster (default: TRADING_FORECASTER or the LLM agent)")
+    parser.add_argument("--prompt-batch-size", type=int, help="Forecast this many tickers per agent request")
+    parser.add_argument("--quiet", action="store_true", help="Silence the per-ticker console output (or set TRADING_QUIET=1)")
+    parser.add_argument("--metrics-file", help="Write Prometheus metrics to this file at the end (or set TRADING_METRICS_FILE)")
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics on this local port while scanning")
+    parser.add_argument("--trace", help="Write a trace-event timeline of the run to this JSON file (or set TRADING_TRACE)")
+    args = parser.parse_args()
+    if args.trace:
+        enable_tracing(args.trace)
+    if args.quiet:
+        set_quiet()
+    if args.metrics_port:
+        serve_metrics(args.metrics_port)
+
+    if args.replay:
+        bars = read_replay_file(args.replay)
+        for _ in run_scanner_stream(F_AND_O_STOCKS, bars, warm_up_end=args.warm_up_end, forecaster=args.forecaster):
+            pass
+    else:
+        # In a real scenario, you might not want to run the full list every time.
+        # For this test, we run the scanner on the dev list.
+        results = run_scanner(F_AND_O_STOCKS, forecaster=args.forecaster, prompt_batch_size=args.prompt_batch_size)
+        generate_report(results)
+    export_metrics(args.metrics_file)
+    if tracing_enabled():
+        merge_traces()
@@ -0,0 +1,156 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional
+
+from trading_system.instrumentation import get_metrics
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller (the leader) runs
+    the function, later callers wait for and share its result or exception instead of
+    repeating the call. Only calls in flight at the same time are coalesced, and only
+    within one process; finished results are served by the caller's own cache.
+
+    Counts cache hits, coalesced calls and misses (calls actually made).
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.stats = {'hits': 0, 'coalesced': 0, 'misses': 0}
+
+    def in_flight(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._calls
+
+    def record_hit(self):
+        with self._lock:
+            self.stats['hits'] += 1
+
+    def record_miss(self, count: int = 1):
+        with self._lock:
+            self.stats['misses'] += count
+
+    def lead(self, keys: Iterable[Hashable]) -> List[Hashable]:
+        """
+        Makes the caller the leader of each of `keys` not already in flight and returns
+        those, for a call that covers several keys at once (e.g. a batched request).
+        Callers of `do` with these keys wait until the leader calls `finish` for each.
+        """
+        with self._lock:
+            led = [key for key in dict.fromkeys(keys) if key not in self._calls]
+            for key in led:
+                self._calls[key] = _Call()
+        return led
+
+    def finish(self, key: Hashable, result: Any = None, error: BaseException = None):
+        """
+        Hands the result (or exception) for a key taken with `lead` to its waiters.
+        """
+        with self._lock:
+            call = self._calls.pop(key)
+        call.result, call.error = result, error
+        call.done.set()
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, lookup: Callable[[], Optional[Any]] = None, **kwargs) -> Any:
+        """
+        Returns `fn(*args, **kwargs)`, sharing one execution between concurrent callers
+        with the same `key`. `lookup` is an optional cache read (None on a miss); it is
+        tried first and again by the leader, so a call that finished just before this
+        one started is not repeated.
+        """
+        if lookup is not None:
+            cached = lookup()
+            if cached is not None:
+                self.record_hit()
+                return cached
+
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.stats['coalesced'] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            cached = lookup() if lookup is not None else None
+            if cached is not None:
+                self.record_hit()
+                call.result = cached
+            else:
+                with self._lock:
+                    self.stats['misses'] += 1
+                call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def ratios(self) -> Dict[str, float]:
+        """
+        Counts plus the share of calls that were hits, coalesced and misses.
+        """
+        with self._lock:
+            stats = dict(self.stats)
+        total = sum(stats.values())
+        for kind in ('hits', 'coalesced', 'misses'):
+            stats[f'{kind}_ratio'] = stats[kind] / total if total else 0.0
+        return stats
+
+_flights: Dict[str, SingleFlight] = {}
+_flights_lock = threading.Lock()
+
+def get_flight(name: str) -> SingleFlight:
+    """
+    Returns the process-wide coalescing layer called `name`, e.g. 'forecast'.
+    """
+    with _flights_lock:
+        if name not in _flights:
+            _flights[name] = SingleFlight(name)
+        return _flights[name]
+
+def single_flight_stats() -> Dict[str, Dict[str, float]]:
+    """
+    Hit/coalesce/miss counts and ratios of every coalescing layer in this process.
+    """
+    with _flights_lock:
+        flights = list(_flights.values())
+    return {flight.name: flight.ratios() for flight in flights}
+
+get_metrics().collector(
+    "agent_calls_total", "counter", "Agent calls per coalescing layer: cache hits, coalesced calls and misses (requests made).",
+    ("layer", "outcome"),
+    lambda: {(name, kind): stats[kind] for name, stats in single_flight_stats().items() for kind in ('hits', 'coalesced', 'misses')}
+)
+get_metrics().collector(
+    "agent_cache_hit_ratio", "gauge", "Share of agent calls per coalescing layer answered from the cache.",
+    ("layer",), lambda: {(name,): stats['hits_ratio'] for name, stats in single_flight_stats().items()}
+)
+
+def format_single_flight_stats() -> str:
+    lines = []
+    for name, stats in single_flight_stats().items():
+        lines.append(
+            f"{name}: {stats['hits']} hits ({stats['hits_ratio']:.0%}), "
+            f"{stats['coalesced']} coalesced ({stats['coalesced_ratio']:.0%}), "
+            f"{stats['misses']} misses ({stats['misses_ratio']:.0%})"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,366 @@
+import os
+import sys
+import itertools
+import multiprocessing
+from typing import Any, Callable, Dict, List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import talib
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from trading_system.main import calculate_systematic_parameters
+from trading_system.indicator_frame import IndicatorFrame
+from trading_system.risk_management import STYLE_MULTIPLIERS
+from trading_system.backtest_engine import simulate_stop_target_trades
+from trading_system.backtester import download_backtest_data, warmup_start_date
+from trading_system.price_store import get_price_store
+from trading_system.forecast_cache import get_forecast_cache
+from trading_system.async_agents import forecast_batch
+from trading_system.forecasters import Forecaster, get_forecaster, is_agent
+from trading_system.performance import equity_metrics
+from trading_system.rate_limit import TokenBucket, get_agent_rate_limiter, set_agent_rate_limiter
+
+TREND_MAP = {'uptrend': 10.0, 'downtrend': -10.0, 'sideways': 0.0}
+INDICATOR_PARAMETERS = ('lookback_L', 'rsi_L', 'ewma_span')
+RISK_PARAMETERS = ('annual_risk_target', 'sl_multiplier', 'tp_multiplier')
+
+def parameter_grid(
+    lookback_L=(20,),
+    rsi_L=(14,),
+    ewma_span=(36,),
+    annual_risk_target=(0.20,),
+    sl_multiplier=(STYLE_MULTIPLIERS['conservative']['sl'],),
+    tp_multiplier=(STYLE_MULTIPLIERS['conservative']['tp'],)
+) -> List[Dict[str, Any]]:
+    """
+    Returns every combination of the given values as a list of configurations. The
+    defaults are the values the live system uses.
+    """
+    names = INDICATOR_PARAMETERS + RISK_PARAMETERS
+    values = (lookback_L, rsi_L, ewma_span, annual_risk_target, sl_multiplier, tp_multiplier)
+    return [dict(zip(names, combination)) for combination in itertools.product(*values)]
+
+class SharedIndicators:
+    """
+    Intermediates of `calculate_systematic_parameters` for one ticker, computed once
+    and reused by every configuration: the log returns, and each rolling statistic
+    once per distinct window, RSI period or EWMA span.
+    """
+    HV_L = 10
+
+    def __init__(self, ticker: str, data: pd.DataFrame):
+        self.ticker = ticker
+        self.data = data
+        self.close = data[('Close', ticker)]
+        self.log_returns = np.log(self.close / self.close.shift(1))
+        self._cache: Dict[tuple, pd.Series] = {}
+
+    def _memo(self, key: tuple, compute: Callable[[], pd.Series]) -> pd.Series:
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def returns_std(self, window: int) -> pd.Series:
+        return self._memo(('std', window), lambda: self.log_returns.rolling(window=window).std())
+
+    def ewma_std(self, span: int) -> pd.Series:
+        return self._memo(('ewma', span), lambda: self.log_returns.ewm(span=span, adjust=False).std())
+
+    def sma(self, window: int) -> pd.Series:
+        return self._memo(('sma', window), lambda: self.close.rolling(window=window).mean())
+
+    def rolling_high(self, window: int) -> pd.Series:
+        return self._memo(('high', window), lambda: self.data[('High', self.ticker)].rolling(window=window).max())
+
+    def rolling_low(self, window: int) -> pd.Series:
+        return self._memo(('low', window), lambda: self.data[('Low', self.ticker)].rolling(window=window).min())
+
+    def rsi(self, period: int) -> pd.Series:
+        return self._memo(('rsi', period), lambda: talib.RSI(self.close, timeperiod=period))
+
+    def parameter_frame(self, lookback_L: int = 20, rsi_L: int = 14, ewma_span: int = 36) -> pd.DataFrame:
+        """
+        Same frame as `calculate_systematic_parameters(ticker, data, lookback_L, rsi_L, ewma_span)`,
+        assembled from the shared intermediates.
+        """
+        return self._memo(('frame', lookback_L, rsi_L, ewma_span), lambda: self._build_frame(lookback_L, rsi_L, ewma_span))
+
+    def _build_frame(self, lookback_L: int, rsi_L: int, ewma_span: int) -> pd.DataFrame:
+        df = self.data.copy()
+        atr = self.returns_std(lookback_L) * 100
+        ewma = self.ewma_std(ewma_span) * 100
+        sma = self.sma(lookback_L)
+        high, low = self.rolling_high(lookback_L), self.rolling_low(lookback_L)
+
+        df[('Log_Returns', '')] = self.log_returns
+        df[(f'HV_{self.HV_L}_pct', '')] = self.returns_std(self.HV_L) * np.sqrt(256) * 100
+        df[(f'Simplified_ATR_{lookback_L}_pct', '')] = atr
+        df[('Breakout_Threshold_pct', '')] = atr.apply(lambda x: max(1.0, 0.5 * x))
+        df[(f'EWMA_Volatility_{ewma_span}_pct', '')] = ewma
+        df[(f'EWMA_Volatility_{ewma_span}_annualized_pct', '')] = ewma * np.sqrt(256)
+        df[(f'SMA_{lookback_L}', '')] = sma
+        df[(f'Distance_to_SMA_{lookback_L}_pct', '')] = ((self.close - sma) / sma) * 100
+        df[(f'High_{lookback_L}', '')] = high
+        df[(f'Low_{lookback_L}', '')] = low
+        df[(f'High_Low_Flag_{lookback_L}', '')] = (self.close == high) | (self.close == low)
+        df[(f'RSI_{rsi_L}', '')] = self.rsi(rsi_L)
+        return df.dropna()
+
+def _curve_metrics(equity: np.ndarray, initial_capital: float) -> Dict[str, float]:
+    """
+    Sharpe ratio (annualised daily returns), maximum drawdown and total return of an
+    equity curve.
+    """
+    if len(equity) < 2:
+        return {'sharpe': 0.0, 'max_drawdown': 0.0, 'total_return_pct': 0.0}
+    metrics = equity_metrics(np.asarray(equity, dtype=np.float64), initial_capital)
+    return {name: float(metrics[name][0]) for name in ('sharpe', 'max_drawdown', 'total_return_pct')}
+
+# Per-process state of the sweep workers, set by `_init_sweep_worker`
+_sweep_context: Dict[str, Any] = {}
+_sweep_indicators: Dict[str, SharedIndicators] = {}
+_sweep_inputs: Dict[Tuple[int, int, int], List[Dict[str, Any]]] = {}
+
+def _init_sweep_worker(context: Dict[str, Any], limiter: TokenBucket = None):
+    global _sweep_context, _sweep_indicators, _sweep_inputs
+    if limiter is not None:
+        # Agent calls of a custom forecaster draw from the parent's budget
+        set_agent_rate_limiter(limiter)
+    _sweep_context = context
+    _sweep_indicators = {}
+    _sweep_inputs = {}
+
+def prepare_sweep_context(
+    tickers: list,
+    start_date: str,
+    end_date: str,
+    initial_capital: float = 100000.0,
+    forecaster: Union[str, Forecaster] = None
+) -> Dict[str, Any]:
+    """
+    Reads the prices of every ticker once and, unless a `forecaster` is given, fetches
+    the agent forecasts once per (ticker, date). The result is handed to the pool
+    workers of a sweep or walk-forward run. Returns None if no ticker has data.
+    `forecaster` is a function or the name of a registered forecaster.
+    """
+    if forecaster is None or isinstance(forecaster, str):
+        forecaster = None if is_agent(forecaster) else get_forecaster(forecaster)
+    get_price_store().top_up_many(tickers, warmup_start_date(start_date), end_date)
+
+    ticker_inputs = {}
+    for ticker in tickers:
+        full_data = download_backtest_data(ticker, start_date, end_date)
+        if full_data is None:
+            continue
+        backtest_index = full_data.index[full_data.index >= pd.to_datetime(start_date)]
+        if len(backtest_index) < 2:
+            continue
+
+        shared_forecast = None
+        if forecaster is None:
+            # One forecast per (ticker, date), shared by every configuration
+            indicators = IndicatorFrame.from_dataframe(calculate_systematic_parameters(ticker, data=full_data))
+            prefetched = [(ticker, date.strftime("%Y-%m-%d")) for date in backtest_index]
+            get_forecast_cache().prefetch(prefetched)
+            history_lengths = full_data.index.searchsorted(backtest_index, side='left')
+            row_positions = indicators.index.searchsorted(backtest_index, side='left') - 1
+            days = [i for i in range(1, len(backtest_index)) if history_lengths[i] >= 50 and row_positions[i] >= 0]
+            forecasts = forecast_batch([
+                (ticker, indicators.row(row_positions[i]).to_dict(), backtest_index[i].strftime("%Y-%m-%d"))
+                for i in days
+            ])
+            get_forecast_cache().release(prefetched)
+            shared_forecast = np.full(len(backtest_index), np.nan)
+            for i, forecast in zip(days, forecasts):
+                shared_forecast[i] = TREND_MAP.get(forecast.get('trend'), 0.0)
+
+        ticker_inputs[ticker] = (full_data, backtest_index, shared_forecast)
+
+    if not ticker_inputs:
+        return None
+
+    # Simulated bars of all tickers (each ticker's first backtest day only seeds the index)
+    dates = ticker_inputs[next(iter(ticker_inputs))][1][1:]
+    for _, backtest_index, _ in list(ticker_inputs.values())[1:]:
+        dates = dates.union(backtest_index[1:])
+    return {'tickers': ticker_inputs, 'dates': dates, 'initial_capital': initial_capital, 'forecaster': forecaster}
+
+def _indicator_inputs(indicator_key: Tuple[int, int, int]) -> List[Dict[str, Any]]:
+    """
+    Per-ticker arrays of one indicator set (price, volatility and scaled forecast of
+    every backtest day, and the OHLC bars), memoised per worker process.
+    """
+    if indicator_key in _sweep_inputs:
+        return _sweep_inputs[indicator_key]
+    lookback_L, rsi_L, ewma_span = indicator_key
+    forecaster = _sweep_context['forecaster']
+
+    inputs = []
+    for ticker, (full_data, backtest_index, shared_forecast) in _sweep_context['tickers'].items():
+        if ticker not in _sweep_indicators:
+            _sweep_indicators[ticker] = SharedIndicators(ticker, full_data)
+        params_df = _sweep_indicators[ticker].parameter_frame(lookback_L, rsi_L, ewma_span)
+
+        row_positions = params_df.index.searchsorted(backtest_index, side='left') - 1
+        history_lengths = full_data.index.searchsorted(backtest_index, side='left')
+        days = (np.arange(len(backtest_index)) >= 1) & (history_lengths >= 50) & (row_positions >= 0)
+        rows = np.where(days, row_positions, 0)
+
+        if forecaster is None:
+            scaled_forecast = np.where(days, shared_forecast, np.nan)
+        else:
+            indicators = IndicatorFrame.from_dataframe(params_df)
+            scaled_forecast = np.full(len(backtest_index), np.nan)
+            for i in np.flatnonzero(days):
+                forecast = forecaster(ticker, indicators.row(rows[i]).to_dict(), backtest_index[i].strftime("%Y-%m-%d"))
+                scaled_forecast[i] = TREND_MAP.get(forecast.get('trend'), 0.0)
+
+        backtest_data = full_data.loc[backtest_index]
+        inputs.append({
+            'dates': backtest_index,
+            'price': params_df[('Close', ticker)].to_numpy()[rows],
+            'volatility': params_df[(f'EWMA_Volatility_{ewma_span}_pct', '')].to_numpy()[rows],
+            'forecast': scaled_forecast,
+            'bars': [backtest_data[(field, ticker)].to_numpy() for field in ('Open', 'High', 'Low', 'Close')],
+        })
+    _sweep_inputs[indicator_key] = inputs
+    return inputs
+
+def evaluate_config(
+    inputs: List[Dict[str, Any]],
+    config: Dict[str, Any],
+    dates: pd.DatetimeIndex
+) -> Tuple[Dict[str, Any], np.ndarray]:
+    """
+    Trades one configuration over `dates` (a contiguous slice of the simulated days)
+    for every ticker, each with its own capital. Returns the metrics and the combined
+    equity curve on `dates`.
+    """
+    initial_capital = _sweep_context['initial_capital']
+    total_equity = np.zeros(len(dates))
+    trades, wins = 0, 0
+    for item in inputs:
+        # This ticker's days within the slice; the first backtest day is never traded
+        lo = max(1, int(item['dates'].searchsorted(dates[0], side='left'))) if len(dates) else 1
+        hi = int(item['dates'].searchsorted(dates[-1], side='right')) if len(dates) else 1
+        price, volatility, forecast = item['price'][lo:hi], item['volatility'][lo:hi], item['forecast'][lo:hi]
+
+        # Phase 3: volatility-targeted position, as in `run_phase3_execution`
+        daily_risk_target = initial_capital * config['annual_risk_target'] / 16
+        value_volatility = price * volatility / 100
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scalar = np.where(value_volatility == 0, 0.0, daily_risk_target / value_volatility)
+        target = np.round(scalar * forecast / 10.0)
+        signal = np.where(np.isfinite(target), target, 0).astype(np.int64)
+
+        # Phase 4: stop-loss/take-profit distances, as in `calculate_dynamic_thresholds`
+        direction = np.sign(signal)
+        stop_loss = np.where(signal != 0, price - direction * price * volatility / 100 * config['sl_multiplier'], np.nan)
+        take_profit = np.where(signal != 0, price + direction * price * volatility / 100 * config['tp_multiplier'], np.nan)
+
+        sim = simulate_stop_target_trades(*(bars[lo:hi] for bars in item['bars']), signal, stop_loss, take_profit, initial_capital)
+        closed = sim['exit_index'] >= 0
+        trades += int(closed.sum())
+        wins += int((sim['pnl'][closed] > 0).sum())
+
+        # Carry the ticker's equity onto the common dates (flat capital before its first bar)
+        equity = sim['equity']
+        if len(equity):
+            positions = item['dates'][lo:hi].searchsorted(dates, side='right') - 1
+            total_equity += np.where(positions >= 0, equity[np.maximum(positions, 0)], initial_capital)
+        else:
+            total_equity += initial_capital
+
+    metrics = dict(
+        config,
+        **_curve_metrics(total_equity, initial_capital * len(inputs)),
+        trades=trades,
+        win_rate=wins / trades if trades else 0.0,
+    )
+    return metrics, total_equity
+
+def _sweep_worker(indicator_key: Tuple[int, int, int], risk_configs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Evaluates all risk configurations that share one set of indicator parameters.
+    Phase 1 runs once per ticker for the set; Phases 3 and 4 are evaluated for every
+    day at once with array operations, and the trades simulated with the array engine.
+    """
+    inputs = _indicator_inputs(indicator_key)
+    return [evaluate_config(inputs, config, _sweep_context['dates'])[0] for config in risk_configs]
+
+def group_by_indicators(grid: List[Dict[str, Any]]) -> Dict[Tuple[int, int, int], List[Dict[str, Any]]]:
+    """
+    Groups configurations by their indicator parameters, the unit of Phase-1 work.
+    """
+    groups: Dict[Tuple[int, int, int], List[Dict[str, Any]]] = {}
+    for config in grid:
+        groups.setdefault(tuple(config[name] for name in INDICATOR_PARAMETERS), []).append(config)
+    return groups
+
+def rank_results(rows: List[Dict[str, Any]]) -> pd.DataFrame:
+    """
+    Best Sharpe ratio first, then smallest drawdown.
+    """
+    results = pd.DataFrame(rows)
+    if results.empty:
+        return results
+    return results.sort_values(by=['sharpe', 'max_drawdown'], ascending=[False, True], kind='stable').reset_index(drop=True)
+
+def run_parameter_sweep(
+    tickers: list,
+    start_date: str,
+    end_date: str,
+    grid: List[Dict[str, Any]] = None,
+    initial_capital: float = 100000.0,
+    max_workers: int = None,
+    forecaster: Union[str, Forecaster] = None
+) -> pd.DataFrame:
+    """
+    Backtests every configuration of `grid` (see `parameter_grid`) over `tickers` and
+    returns one row per configuration with its Sharpe ratio, maximum drawdown, total
+    return, trade count and win rate, best Sharpe first (then smallest drawdown).
+
+    Work is shared across configurations: prices are read once, the agent forecasts
+    are fetched once per (ticker, date), each indicator is computed once per distinct
+    parameter value, and configurations with the same indicator parameters run in one
+    task. Tasks are spread over `max_workers` processes (default: CPU count; 1 runs
+    in-process).
+
+    The agent forecast is keyed by (ticker, date) only, so by default it is requested
+    with the standard Phase-1 metrics and shared by every configuration; only the EWMA
+    span, risk target and multipliers then change the trades. Pass a `forecaster`
+    with the signature of `stock_forecasting_agent` (a picklable function) to make the
+    forecast depend on the swept lookbacks too; a registered local forecaster can be
+    named instead (e.g. "rules", see `forecasters`).
+    """
+    grid = grid or parameter_grid()
+    context = prepare_sweep_context(tickers, start_date, end_date, initial_capital, forecaster)
+    if context is None:
+        return pd.DataFrame()
+
+    tasks = group_by_indicators(grid)
+    print(f"--- Sweeping {len(grid)} configurations ({len(tasks)} indicator sets) over {len(context['tickers'])} tickers ---")
+    if max_workers == 1 or len(tasks) == 1:
+        _init_sweep_worker(context)
+        chunks = [_sweep_worker(key, configs) for key, configs in tasks.items()]
+    else:
+        with multiprocessing.Pool(processes=max_workers, initializer=_init_sweep_worker, initargs=(context, get_agent_rate_limiter())) as pool:
+            chunks = pool.starmap(_sweep_worker, list(tasks.items()))
+
+    return rank_results([row for chunk in chunks for row in chunk])
+
+if __name__ == "__main__":
+    from trading_system.nifty50 import NIFTY_50_SYMBOLS
+
+    grid = parameter_grid(
+        ewma_span=(24, 36, 48),
+        annual_risk_target=(0.10, 0.20, 0.30),
+        sl_multiplier=(1.0, 1.5, 2.5),
+        tp_multiplier=(2.0, 3.0, 4.0)
+    )
+    results = run_parameter_sweep(NIFTY_50_SYMBOLS[:5], "2024-01-01", "2024-06-30", grid=grid,
+                                  max_workers=int(os.getenv("BACKTEST_WORKERS", 0)) or None)
+    results.to_csv("sweep_results.csv", index=False)
+    print(results.head(20).to_string())
@@ -0,0 +1,228 @@
+import os
+import sys
+import glob
+import json
+import time
+import atexit
+import functools
+import itertools
+import threading
+import multiprocessing
+from typing import Any, Callable, Dict, List, Optional
+
+# Events are buffered in memory and appended to the process's file in chunks of this size
+FLUSH_EVERY = 10000
+
+_enabled = False
+_path = None
+_run_id = None
+_events: List[Dict[str, Any]] = []
+_named_threads = set()
+_async_ids = itertools.count(1)
+_lock = threading.Lock()
+
+def clock() -> Optional[float]:
+    """
+    Current trace timestamp in microseconds, or None when tracing is off (see
+    `complete_span`).
+    """
+    return time.time_ns() / 1000 if _enabled else None
+
+def tracing_enabled() -> bool:
+    return _enabled
+
+def _process_file(pid: int = None) -> str:
+    root, extension = os.path.splitext(_path)
+    return f"{root}.{_run_id}.{pid or os.getpid()}{extension or '.json'}"
+
+def _record(event: Dict[str, Any]):
+    tid = threading.get_ident()
+    event['pid'] = os.getpid()
+    event['tid'] = tid
+    with _lock:
+        if tid not in _named_threads:
+            _named_threads.add(tid)
+            _events.append({'name': 'thread_name', 'ph': 'M', 'pid': event['pid'], 'tid': tid,
+                            'args': {'name': threading.current_thread().name}})
+        _events.append(event)
+        full = len(_events) >= FLUSH_EVERY
+    if full:
+        flush_trace()
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+class _Span:
+    __slots__ = ('name', 'cat', 'args', 'start')
+
+    def __init__(self, name: str, cat: str, args: Dict[str, Any]):
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.time_ns() / 1000
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        complete_span(self.name, self.cat, self.start, **self.args)
+        return False
+
+class _AsyncSpan(_Span):
+    """
+    Nestable async span ('b'/'e' events with an id), for work that overlaps on one
+    thread, such as coroutines waiting on the rate limiter.
+    """
+    __slots__ = ('id',)
+
+    def __enter__(self):
+        self.id = next(_async_ids)
+        _record({'name': self.name, 'cat': self.cat, 'ph': 'b', 'id': self.id, 'ts': time.time_ns() / 1000, 'args': self.args})
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _record({'name': self.name, 'cat': self.cat, 'ph': 'e', 'id': self.id, 'ts': time.time_ns() / 1000})
+        return False
+
+def span(name: str, cat: str = "", **args):
+    """
+    `with span('forecast', 'phase', ticker=...):` records the block as a complete event
+    on the current thread; spans nest by time. Returns a shared no-op context when
+    tracing is off, so a disabled span costs one check.
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, cat, args)
+
+def async_span(name: str, cat: str = "", **args):
+    if not _enabled:
+        return _NULL_SPAN
+    return _AsyncSpan(name, cat, args)
+
+def complete_span(name: Any, cat: str, start: Optional[float], **args):
+    """
+    Records a span from `start` (a `clock()` value) to now; does nothing if `start` is
+    None, i.e. tracing was off when it began. For loop bodies that `with` would
+    re-indent, e.g. one backtest day.
+    """
+    if start is None or not _enabled:
+        return
+    _record({'name': str(name), 'cat': cat, 'ph': 'X', 'ts': start, 'dur': time.time_ns() / 1000 - start, 'args': args})
+
+def traced(cat: str) -> Callable:
+    """
+    Decorator recording each call as a span named after the function, plus its first
+    argument if that is a string (e.g. the ticker).
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            name = f"{fn.__name__}({args[0]})" if args and isinstance(args[0], str) else fn.__name__
+            with _Span(name, cat, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def flush_trace():
+    """
+    Appends the buffered events to this process's trace file, in the JSON array format
+    trace viewers accept without the closing bracket, so a crashed run still loads.
+    """
+    if _path is None:
+        return
+    with _lock:
+        events = _events[:]
+        del _events[:]
+    if not events:
+        return
+    file_path = _process_file()
+    directory = os.path.dirname(file_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    new_file = not os.path.exists(file_path)
+    with open(file_path, 'a') as f:
+        if new_file:
+            f.write("[\n")
+            process_name = multiprocessing.current_process().name
+            f.write(json.dumps({'name': 'process_name', 'ph': 'M', 'pid': os.getpid(), 'args': {'name': f"{process_name} ({os.getpid()})"}}) + ",\n")
+        for event in events:
+            f.write(json.dumps(event, default=str) + ",\n")
+
+def reset_trace():
+    """
+    Drops the buffered events, e.g. in a forked worker that inherited the parent's.
+    """
+    with _lock:
+        del _events[:]
+        _named_threads.clear()
+
+def enable_tracing(path: str = "trace.json"):
+    """
+    Turns tracing on for this process and the worker processes it starts later. Each
+    process writes `<path root>.<run>.<pid>.json`; `merge_traces` combines them into
+    `path` for a trace viewer (chrome://tracing or ui.perfetto.dev).
+    """
+    global _enabled, _path, _run_id
+    _path = path
+    _run_id = os.getenv("TRADING_TRACE_RUN") or str(os.getpid())
+    os.environ["TRADING_TRACE"] = path
+    os.environ["TRADING_TRACE_RUN"] = _run_id
+    _enabled = True
+
+def disable_tracing():
+    global _enabled
+    flush_trace()
+    _enabled = False
+
+def _read_events(file_path: str) -> List[Dict[str, Any]]:
+    with open(file_path) as f:
+        text = f.read().strip()
+    if not text:
+        return []
+    if text.startswith('{'):
+        return json.loads(text).get('traceEvents', [])
+    text = text.rstrip(',').rstrip(']').rstrip().rstrip(',')
+    return json.loads(text + "]")
+
+def merge_traces(output: str = None, inputs: List[str] = None) -> str:
+    """
+    Merges per-process trace files (default: all of this run's) into one trace-event
+    JSON object at `output` (default: the path given to `enable_tracing`). Returns the
+    output path.
+    """
+    flush_trace()
+    output = output or _path
+    if inputs is None:
+        root, extension = os.path.splitext(_path)
+        inputs = sorted(glob.glob(f"{glob.escape(root)}.{_run_id}.*{extension or '.json'}"))
+    events = []
+    for file_path in inputs:
+        events.extend(_read_events(file_path))
+    with open(output, 'w') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, default=str)
+    print(f"Trace with {len(events)} events from {len(inputs)} processes written to {output}")
+    return output
+
+atexit.register(flush_trace)
+
+if os.getenv("TRADING_TRACE"):
+    enable_tracing(os.environ["TRADING_TRACE"])
+
+if __name__ == "__main__":
+    # python -m trading_system.tracing merged.json trace.*.json
+    if len(sys.argv) < 3:
+        print("Usage: python -m trading_system.tracing OUTPUT INPUT [INPUT ...]")
+        sys.exit(1)
+    merge_traces(sys.argv[1], sys.argv[2:])
@@ -0,0 +1,173 @@
+import os
+import sys
+import multiprocessing
+from typing import Any, Dict, List, Union
+
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from trading_system.sweep import (
+    parameter_grid,
+    prepare_sweep_context,
+    group_by_indicators,
+    evaluate_config,
+    _indicator_inputs,
+    _init_sweep_worker,
+    _curve_metrics,
+)
+import trading_system.sweep as sweep
+from trading_system.forecasters import Forecaster
+from trading_system.rate_limit import get_agent_rate_limiter
+
+def walk_forward_windows(
+    dates: pd.DatetimeIndex,
+    train_days: int,
+    test_days: int,
+    mode: str = "rolling",
+    step_days: int = None
+) -> List[Dict[str, pd.Timestamp]]:
+    """
+    Splits the trading days into consecutive train/test windows. Each test window
+    follows its train window, and the test windows tile the period without overlap
+    (`step_days` defaults to `test_days`). In "rolling" mode every train window has
+    `train_days` days; in "expanding" mode it always starts at the first day.
+    """
+    if mode not in ("rolling", "expanding"):
+        raise ValueError(f"Unknown walk-forward mode: {mode}")
+    step_days = step_days or test_days
+
+    windows = []
+    test_start = train_days
+    while test_start < len(dates):
+        test_end = min(test_start + test_days, len(dates))
+        train_start = 0 if mode == "expanding" else test_start - train_days
+        windows.append({
+            'train_start': dates[train_start],
+            'train_end': dates[test_start - 1],
+            'test_start': dates[test_start],
+            'test_end': dates[test_end - 1],
+        })
+        test_start += step_days
+    return windows
+
+def _window_slice(dates: pd.DatetimeIndex, first: pd.Timestamp, last: pd.Timestamp) -> pd.DatetimeIndex:
+    return dates[dates.searchsorted(first, side='left'):dates.searchsorted(last, side='right')]
+
+def _walk_forward_worker(window: Dict[str, pd.Timestamp], grid: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Picks the best configuration of `grid` on the window's train days and trades it on
+    its test days. Indicator inputs are memoised per process, so windows handled by the
+    same worker reuse them.
+    """
+    dates = sweep._sweep_context['dates']
+    train_dates = _window_slice(dates, window['train_start'], window['train_end'])
+    test_dates = _window_slice(dates, window['test_start'], window['test_end'])
+
+    train_rows = []
+    for indicator_key, configs in group_by_indicators(grid).items():
+        inputs = _indicator_inputs(indicator_key)
+        train_rows.extend(evaluate_config(inputs, config, train_dates)[0] for config in configs)
+    # Same order as `rank_results`: best Sharpe, then smallest drawdown
+    best = min(train_rows, key=lambda row: (-row['sharpe'], row['max_drawdown']))
+
+    config = {name: best[name] for name in grid[0]}
+    indicator_key = tuple(config[name] for name in sweep.INDICATOR_PARAMETERS)
+    test_metrics, test_equity = evaluate_config(_indicator_inputs(indicator_key), config, test_dates)
+    return {
+        'window': window,
+        'config': config,
+        'train_sharpe': best['sharpe'],
+        'train_max_drawdown': best['max_drawdown'],
+        'test_metrics': test_metrics,
+        'test_dates': test_dates,
+        'test_equity': test_equity,
+    }
+
+def run_walk_forward(
+    tickers: list,
+    start_date: str,
+    end_date: str,
+    grid: List[Dict[str, Any]] = None,
+    train_days: int = 120,
+    test_days: int = 20,
+    mode: str = "rolling",
+    initial_capital: float = 100000.0,
+    max_workers: int = None,
+    forecaster: Union[str, Forecaster] = None
+) -> Dict[str, Any]:
+    """
+    Walk-forward optimisation of the strategy over `tickers`: for each window (see
+    `walk_forward_windows`) the configuration with the best in-sample Sharpe ratio is
+    chosen on the train days and traded on the following test days.
+
+    Prices and forecasts are fetched once for the whole period and Phase 1 runs once
+    over the full history per indicator set (see `sweep.SharedIndicators`), so
+    overlapping train windows share all indicator work. Windows run in parallel on
+    `max_workers` processes (1 runs in-process).
+
+    Each test window starts flat with the full capital per ticker, as the live system
+    sizes positions on fixed capital; the out-of-sample curve chains the windows by
+    adding each window's P&L. Returns the per-window table, the out-of-sample equity
+    curve and its metrics.
+    """
+    grid = grid or parameter_grid()
+    context = prepare_sweep_context(tickers, start_date, end_date, initial_capital, forecaster)
+    if context is None:
+        return {'windows': pd.DataFrame(), 'equity_curve': pd.Series(dtype=float), 'metrics': {}}
+
+    windows = walk_forward_windows(context['dates'], train_days, test_days, mode)
+    if not windows:
+        print(f"Not enough data for a {train_days}-day train window.")
+        return {'windows': pd.DataFrame(), 'equity_curve': pd.Series(dtype=float), 'metrics': {}}
+
+    print(f"--- Walk-forward: {len(windows)} {mode} windows x {len(grid)} configurations over {len(context['tickers'])} tickers ---")
+    if max_workers == 1 or len(windows) == 1:
+        _init_sweep_worker(context)
+        outcomes = [_walk_forward_worker(window, grid) for window in windows]
+    else:
+        with multiprocessing.Pool(processes=max_workers, initializer=_init_sweep_worker, initargs=(context, get_agent_rate_limiter())) as pool:
+            outcomes = pool.starmap(_walk_forward_worker, [(window, grid) for window in windows])
+
+    # Chain the out-of-sample windows: each adds its P&L to the equity carried over
+    total_capital = initial_capital * len(context['tickers'])
+    carried = total_capital
+    curves, rows = [], []
+    for outcome in outcomes:
+        equity = outcome['test_equity'] - total_capital + carried
+        curves.append(pd.Series(equity, index=outcome['test_dates']))
+        if len(equity):
+            carried = equity[-1]
+        test = outcome['test_metrics']
+        rows.append({
+            **{key: value.strftime("%Y-%m-%d") for key, value in outcome['window'].items()},
+            **outcome['config'],
+            'train_sharpe': outcome['train_sharpe'],
+            'train_max_drawdown': outcome['train_max_drawdown'],
+            'test_sharpe': test['sharpe'],
+            'test_max_drawdown': test['max_drawdown'],
+            'test_return_pct': test['total_return_pct'],
+            'test_trades': test['trades'],
+        })
+
+    equity_curve = pd.concat(curves) if curves else pd.Series(dtype=float)
+    metrics = _curve_metrics(equity_curve.to_numpy(), total_capital)
+    print(f"Out-of-sample: Sharpe {metrics['sharpe']:.2f}, max drawdown {metrics['max_drawdown']:.2%}, "
+          f"return {metrics['total_return_pct']:.2f}%")
+    return {'windows': pd.DataFrame(rows), 'equity_curve': equity_curve, 'metrics': metrics}
+
+if __name__ == "__main__":
+    from trading_system.nifty50 import NIFTY_50_SYMBOLS
+
+    grid = parameter_grid(
+        ewma_span=(24, 36, 48),
+        annual_risk_target=(0.10, 0.20),
+        sl_multiplier=(1.0, 1.5, 2.5),
+        tp_multiplier=(2.0, 3.0, 4.0)
+    )
+    result = run_walk_forward(NIFTY_50_SYMBOLS, "2022-01-01", "2024-12-31", grid=grid,
+                              mode=os.getenv("WALK_FORWARD_MODE", "rolling"),
+                              max_workers=int(os.getenv("BACKTEST_WORKERS", 0)) or None)
+    result['windows'].to_csv("walk_forward_windows.csv", index=False)
+    result['equity_curve'].rename('equity').to_csv("walk_forward_equity.csv")
+    print(result['windows'].to_string())